@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos fluxos de agendamento - AgendaMonter
+Uso: python benchmarks/booking_flows.py [--users 500] [--rooms 6] [--years 1] [--iterations 20]
+                                        [--baseline benchmarks/baseline.json] [--save-baseline]
+
+Cria uma base sintética (N usuários, as 4 salas padrão mais M extras e Y anos
+de séries recorrentes semanais) em um SQLite temporário (ou em --database-url)
+e percorre, pelo test client do Flask, login, dashboard, calendário,
+verificação de disponibilidade, criação (simples e recorrente), edição e
+cancelamento.
+
+Para cada fluxo reporta latência (p50/p95/p99), consultas por requisição e o
+pico de memória alocada. Também confere o teto de consultas dos endpoints
+mais acessados (QUERY_BUDGETS) e termina com código 1 se algum passar dele.
+Com --baseline, compara com um resultado salvo por --save-baseline e termina
+com código 1 se algum fluxo regredir; sem --baseline, usa
+benchmarks/baseline.json e avisa se ele não existir.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+PASSWORD = 'bench-senha'
+
+
+def configure_environment(database_url):
+    """Precisa rodar antes de importar src.main (a configuração é lida ao importar)"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('FLASK_ENV', 'development')
+    os.environ['SCHEDULER_ENABLED'] = 'false'
+    os.environ['RATE_LIMIT_ENABLED'] = 'false'
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    # Um só processo: a releitura periódica das versões de cache só somaria ruído à contagem
+    os.environ.setdefault('CACHE_VERSION_TTL', '3600')
+
+
+def seed(app, users, extra_rooms, years, seed_value):
+    """
+    Cria usuários, salas e séries recorrentes semanais com inserções em lote
+
+    Returns:
+        dict: IDs e nomes usados pelos fluxos
+    """
+    from sqlalchemy import insert
+    from src.database import db
+    from src.models.user import User, Room
+    from src.models.meeting import Meeting
+    from src.utils.password_utils import hash_password
+    from src.utils.timezone_utils import get_brazil_now
+
+    rng = random.Random(seed_value)
+    with app.app_context():
+        # Um único hash para todos: o custo do scrypt não faz parte da base
+        password_hash = hash_password(PASSWORD)
+        db.session.execute(insert(User), [
+            {'username': f'bench_{i:05d}', 'email': f'bench_{i:05d}@example.com',
+             'password_hash': password_hash, 'is_admin': False}
+            for i in range(users)
+        ])
+        db.session.execute(insert(Room), [
+            {'name': f'Sala Bench {i}', 'description': 'Sala sintética', 'capacity': 10}
+            for i in range(extra_rooms)
+        ])
+        db.session.commit()
+
+        usernames = [name for (name,) in db.session.query(User.username).filter(User.username.like('bench_%'))]
+        user_ids = dict(db.session.query(User.username, User.id).filter(User.username.like('bench_%')))
+        room_ids = [room_id for (room_id,) in db.session.query(Room.id).order_by(Room.id)]
+
+        # Uma série semanal por sala e horário comercial, de hoje até `years` anos
+        today = get_brazil_now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        weeks = max(1, int(52 * years))
+        children = []
+        for room_id in room_ids:
+            for hour in range(8, 18, 2):
+                weekday = rng.randrange(5)
+                start = today + timedelta(days=(weekday - today.weekday()) % 7, hours=hour)
+                participants = rng.sample(usernames, min(5, len(usernames)))
+                parent = Meeting(
+                    title=f'Série {room_id}-{hour}', start_datetime=start, end_datetime=start + timedelta(hours=1),
+                    room_id=room_id, created_by=user_ids[participants[0]], participants=', '.join(participants),
+                    is_recurring=True, recurrence_type='weekly', recurrence_end=start + timedelta(weeks=weeks),
+                    created_at=get_brazil_now()
+                )
+                db.session.add(parent)
+                db.session.flush()
+                for week in range(1, weeks):
+                    occurrence = start + timedelta(weeks=week)
+                    children.append({
+                        'title': parent.title, 'start_datetime': occurrence,
+                        'end_datetime': occurrence + timedelta(hours=1), 'room_id': room_id,
+                        'created_by': parent.created_by, 'participants': parent.participants,
+                        'parent_meeting_id': parent.id, 'is_recurring': False, 'created_at': parent.created_at
+                    })
+        if children:
+            db.session.execute(insert(Meeting), children)
+        db.session.commit()
+
+        return {
+            'username': usernames[0],
+            'participant': usernames[1],
+            'participant_ids': [user_ids[name] for name in usernames[1:4]],
+            'room_id': room_ids[-1],
+            # Depois do fim das séries: os fluxos de escrita não conflitam com a base
+            'free_day': today + timedelta(weeks=weeks + 2),
+            'meetings': len(children) + len(room_ids) * 5,
+        }
+
+
+class Runner:
+    """Executa uma requisição medindo latência e número de consultas"""
+
+    def __init__(self, client):
+        self.client = client
+        self.results = {}
+
+    def request(self, flow, method, url, **kwargs):
+        from src.utils.query_utils import count_queries
+
+        with count_queries() as stats:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, **kwargs)
+            elapsed = time.perf_counter() - started
+
+        if response.status_code >= 400:
+            raise RuntimeError(f'{flow}: {method.upper()} {url} retornou {response.status_code}')
+        entry = self.results.setdefault(flow, {'latencies': [], 'queries': []})
+        entry['latencies'].append(elapsed)
+        entry['queries'].append(stats.count)
+        return response
+
+
+def run_flows(app, runner, data, iteration):
+    """Um ciclo completo dos fluxos; cada iteração usa um dia livre diferente"""
+    from src.models.meeting import Meeting
+
+    day = data['free_day'] + timedelta(days=iteration)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    date = day.strftime('%Y-%m-%d')
+    form = {
+        'title': f'Bench {iteration}', 'description': 'benchmark',
+        'start_datetime': f'{date}T10:00', 'end_datetime': f'{date}T11:00',
+        'room_id': str(data['room_id']), 'participants': [str(i) for i in data['participant_ids']],
+    }
+
+    runner.request('login', 'post', '/auth/login', data={'username': data['username'], 'password': PASSWORD})
+    runner.request('dashboard', 'get', '/meetings/dashboard')
+    runner.request('calendar', 'get', '/meetings/calendar')
+    runner.request('check_availability', 'get', '/meetings/api/check_availability', query_string={
+        'room_id': data['room_id'], 'start_datetime': form['start_datetime'], 'end_datetime': form['end_datetime']
+    })
+    runner.request('create_meeting', 'post', '/meetings/create', data=form)
+
+    recurring_day = (day + timedelta(days=1)).strftime('%Y-%m-%d')
+    runner.request('create_recurring', 'post', '/meetings/create', data={
+        **form, 'title': f'Bench recorrente {iteration}',
+        'start_datetime': f'{recurring_day}T14:00', 'end_datetime': f'{recurring_day}T15:00',
+        'is_recurring': 'y', 'recurrence_type': 'weekly',
+        'recurrence_end': (day + timedelta(weeks=8)).strftime('%Y-%m-%d'),
+    })
+
+    with app.app_context():
+        meeting_id = Meeting.query.filter_by(title=f'Bench {iteration}').first().id
+    runner.request('edit_meeting', 'post', f'/meetings/edit/{meeting_id}', data={
+        **form, 'title': f'Bench {iteration} editada', 'start_datetime': f'{date}T11:00', 'end_datetime': f'{date}T12:00',
+        'edit_all_recurring': 'this_only'
+    })
+    runner.request('cancel_meeting', 'post', f'/meetings/cancel_meeting/{meeting_id}')
+    runner.request('logout', 'get', '/auth/logout')
+
+
+# Teto de consultas por requisição nos endpoints mais acessados; não depende do
+# tamanho da base, então passar dele indica N+1 ou consulta nova no caminho quente
+QUERY_BUDGETS = {
+    '/meetings/dashboard': 8,
+    '/meetings/calendar': 2,
+    '/meetings/my_meetings': 2,
+    '/notifications/api/notifications': 3,
+    '/notifications/api/notifications/unread-count': 2,
+    '/api/v1/meetings': 2,
+}
+
+
+def check_query_budgets(app, data):
+    """
+    Confere QUERY_BUDGETS com assert_max_queries, já com os caches aquecidos
+
+    Roda depois dos fluxos, como um participante das reuniões criadas: assim
+    as listas e notificações têm vários itens e um N+1 aparece.
+
+    Returns:
+        list: Mensagens dos endpoints que passaram do teto
+    """
+    from src.utils.query_utils import assert_max_queries
+
+    client = app.test_client()
+    client.post('/auth/login', data={'username': data['participant'], 'password': PASSWORD})
+    failures = []
+    for url, budget in QUERY_BUDGETS.items():
+        client.get(url)
+        try:
+            with assert_max_queries(budget, duplicate_threshold=3):
+                response = client.get(url)
+        except AssertionError as e:
+            failures.append(f"{url}: {e}")
+            continue
+        if response.status_code >= 400:
+            failures.append(f"{url}: retornou {response.status_code}")
+    return failures
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(results, memory):
+    summary = {}
+    for flow, entry in results.items():
+        latencies = entry['latencies']
+        summary[flow] = {
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries': max(entry['queries']),
+            'peak_kib': memory.get(flow),
+        }
+    return summary
+
+
+def measure_memory(app, data, iteration):
+    """Uma passada extra sob tracemalloc (fora da medição de latência) com o pico por fluxo"""
+    peaks = {}
+
+    class MemoryRunner(Runner):
+        def request(self, flow, method, url, **kwargs):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            response = super().request(flow, method, url, **kwargs)
+            peaks[flow] = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+            return response
+
+    tracemalloc.start()
+    try:
+        run_flows(app, MemoryRunner(app.test_client()), data, iteration)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def compare(summary, baseline, tolerance, floor_ms):
+    """
+    Lista as regressões em relação à base salva
+
+    Latência regride quando o p95 passa da base em mais de `tolerance` (e de
+    `floor_ms`, para ignorar ruído em fluxos muito rápidos). Consultas
+    regridem com qualquer aumento, pois o número é determinístico.
+    """
+    regressions = []
+    for flow, current in summary.items():
+        base = baseline.get(flow)
+        if not base:
+            continue
+        limit = max(base['p95_ms'] * (1 + tolerance), base['p95_ms'] + floor_ms)
+        if current['p95_ms'] > limit:
+            regressions.append(f"{flow}: p95 {current['p95_ms']}ms > {base['p95_ms']}ms")
+        if current['queries'] > base['queries']:
+            regressions.append(f"{flow}: {current['queries']} consultas > {base['queries']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--rooms', type=int, default=6, help='salas além das 4 padrão')
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='padrão: SQLite temporário')
+    parser.add_argument('--baseline', help=f'padrão: {os.path.relpath(DEFAULT_BASELINE)}')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='aumento tolerado do p95 (0.25 = 25%%)')
+    parser.add_argument('--floor-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    baseline_path = args.baseline or DEFAULT_BASELINE
+    if args.baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f'base de comparação não encontrada: {args.baseline}')
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mktemp(suffix='.db', prefix='agendamonter-bench-')}"
+    configure_environment(database_url)
+
+    from src.main import app, mail, ensure_database_initialized
+    ensure_database_initialized()
+    app.config['WTF_CSRF_ENABLED'] = False
+    mail.state.suppress = True
+
+    started = time.perf_counter()
+    data = seed(app, args.users, args.rooms, args.years, args.seed)
+    print(f"Base: {args.users} usuários, {4 + args.rooms} salas, {data['meetings']} reuniões "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    runner = Runner(app.test_client())
+    # Primeira passada aquece caches e não entra na medição
+    run_flows(app, Runner(app.test_client()), data, 0)
+    for iteration in range(1, args.iterations + 1):
+        run_flows(app, runner, data, iteration)
+    memory = measure_memory(app, data, args.iterations + 1)
+
+    summary = summarize(runner.results, memory)
+    print(f"\n{'fluxo':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'consultas':>10} {'pico KiB':>10}")
+    for flow, values in summary.items():
+        print(f"{flow:<20} {values['p50_ms']:>8} {values['p95_ms']:>8} {values['p99_ms']:>8} "
+              f"{values['queries']:>10} {values['peak_kib']:>10}")
+    print(f"\nRSS máximo do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+    budget_failures = check_query_budgets(app, data)
+    if budget_failures:
+        print("\nEndpoints acima do teto de consultas (QUERY_BUDGETS):")
+        for failure in budget_failures:
+            print(f"  - {failure}")
+        return 1
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Base de comparação salva em {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"\nAVISO: {baseline_path} não existe; nada foi comparado (gere com --save-baseline)")
+        return 0
+    with open(baseline_path) as f:
+        regressions = compare(summary, json.load(f), args.tolerance, args.floor_ms)
+    if regressions:
+        print("\nRegressões em relação a " + baseline_path + ":")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print(f"\nSem regressões em relação a {baseline_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput de login por custo de hash de senha - AgendaMonter
+Uso: python benchmarks/password_hashing.py [--seconds 3] [--threads 1 2 4] [--methods ...]
+
+Mede quantas verificações de senha por segundo cada configuração de
+PASSWORD_HASH_METHOD sustenta, sequencialmente e no pool de threads.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    'scrypt:32768:8:1',   # padrão do Werkzeug
+    'scrypt:16384:8:1',
+    'scrypt:8192:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:100000',
+]
+
+
+def measure(password_hash, seconds, threads):
+    """Executa verificações por `seconds` segundos e retorna (total, latência média em ms)"""
+    deadline = time.perf_counter() + seconds
+    latencies = []
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            check_password_hash(password_hash, 'senha-de-teste')
+            latencies.append(time.perf_counter() - started)
+            count += 1
+        return count
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(lambda _: worker(), range(threads)))
+
+    average_ms = (sum(latencies) / len(latencies) * 1000) if latencies else 0
+    return total, average_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    args = parser.parse_args()
+
+    print(f"{'método':<24} {'threads':>7} {'logins/s':>10} {'latência ms':>12}")
+    for method in args.methods:
+        password_hash = generate_password_hash('senha-de-teste', method=method)
+        for threads in args.threads:
+            total, average_ms = measure(password_hash, args.seconds, threads)
+            print(f"{method:<24} {threads:>7} {total / args.seconds:>10.1f} {average_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
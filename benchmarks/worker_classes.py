@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark das classes de worker do gunicorn - AgendaMonter
+Uso: python benchmarks/worker_classes.py [--classes sync gthread gevent] [--clients 16] [--seconds 15]
+                                         [--smtp-delay 2] [--mail-ratio 0.05] [--workers 2] [--threads 4]
+
+Sobe o app com gunicorn.conf.py uma vez para cada classe de worker e aplica a
+mesma carga: clientes logados abrindo dashboard, calendário e verificação de
+disponibilidade, e uma fração de pedidos de redefinição de senha, que enviam
+e-mail por um servidor SMTP local que demora --smtp-delay segundos para
+aceitar cada mensagem (o caso de um SMTP lento na hora do envio).
+
+Para cada classe reporta requisições por segundo, latência das leituras
+(p50/p95/p99), latência dos envios de e-mail e erros. Classes cujo pacote não
+está instalado (gevent) são puladas.
+"""
+import argparse
+import http.cookiejar
+import os
+import random
+import re
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from benchmarks.booking_flows import PASSWORD, configure_environment, percentile, seed
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+class SlowSMTPHandler(socketserver.StreamRequestHandler):
+    """SMTP mínimo que aceita qualquer mensagem, demorando `delay` segundos em cada uma"""
+    delay = 0
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 bench ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-bench')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                self.reply('235 ok')
+            elif command == 'DATA':
+                self.reply('354 fim com <CRLF>.<CRLF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(self.delay)
+                self.reply('250 ok')
+            elif command == 'QUIT':
+                self.reply('221 tchau')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class ThreadingSMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_smtp(delay):
+    handler = type('Handler', (SlowSMTPHandler,), {'delay': delay})
+    server = ThreadingSMTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def class_available(worker_class):
+    if worker_class != 'gevent':
+        return True
+    try:
+        import gevent  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def start_gunicorn(worker_class, args, environment, port):
+    env = {
+        **environment,
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'WEB_CONCURRENCY': str(args.workers),
+        'GUNICORN_THREADS': str(args.threads),
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_MAX_REQUESTS': '0',
+    }
+    log = open(os.path.join(tempfile.gettempdir(), f'agendamonter-bench-{worker_class}.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'src.main:app'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn ({worker_class}) terminou ao iniciar; veja {log.name}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/auth/login', timeout=2).read()
+            return process, log
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError(f'gunicorn ({worker_class}) não respondeu em 60s; veja {log.name}')
+
+
+class Client:
+    """Sessão HTTP com cookies e token CSRF, como um navegador"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def get(self, path):
+        with self.opener.open(self.base_url + path, timeout=self.timeout) as response:
+            return response.read().decode()
+
+    def post_form(self, path, data):
+        token = CSRF_PATTERN.search(self.get(path))
+        payload = urllib.parse.urlencode({**data, 'csrf_token': token.group(1) if token else ''}).encode()
+        started = time.perf_counter()
+        with self.opener.open(self.base_url + path, data=payload, timeout=self.timeout) as response:
+            response.read()
+        return time.perf_counter() - started
+
+
+def run_load(base_url, args, data):
+    """Executa a carga por --seconds segundos e devolve as latências por tipo"""
+    results = {'read': [], 'email': [], 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    day = data['free_day'].strftime('%Y-%m-%d')
+    reads = [
+        '/meetings/dashboard',
+        '/meetings/calendar',
+        f"/meetings/api/check_availability?room_id={data['room_id']}"
+        f"&start_datetime={day}T10:00&end_datetime={day}T11:00",
+    ]
+
+    def client_loop(index):
+        rng = random.Random(index)
+        user = Client(base_url, args.request_timeout)
+        user.post_form('/auth/login', {'username': data['username'], 'password': PASSWORD})
+        while time.perf_counter() < deadline:
+            kind = 'email' if rng.random() < args.mail_ratio else 'read'
+            try:
+                if kind == 'email':
+                    elapsed = Client(base_url, args.request_timeout).post_form(
+                        '/auth/forgot_password', {'email': f"{data['username']}@example.com"}
+                    )
+                else:
+                    started = time.perf_counter()
+                    user.get(rng.choice(reads))
+                    elapsed = time.perf_counter() - started
+            except Exception:
+                with lock:
+                    results['errors'] += 1
+                continue
+            with lock:
+                results[kind].append(elapsed)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def ms(values, fraction):
+    return f'{percentile(values, fraction) * 1000:.0f}ms' if values else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='threads por worker no gthread')
+    parser.add_argument('--clients', type=int, default=16, help='clientes simultâneos')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--smtp-delay', type=float, default=2.0)
+    parser.add_argument('--mail-ratio', type=float, default=0.05, help='fração das requisições que envia e-mail')
+    parser.add_argument('--request-timeout', type=float, default=30)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--years', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='padrão: SQLite temporário')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mktemp(suffix='.db', prefix='agendamonter-bench-')}"
+    configure_environment(database_url)
+    from src.main import app, ensure_database_initialized
+    ensure_database_initialized()
+    data = seed(app, args.users, 2, args.years, args.seed)
+
+    smtp = start_smtp(args.smtp_delay)
+    environment = {
+        **os.environ,
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(smtp.server_address[1]),
+        'MAIL_USE_TLS': 'false',
+    }
+    environment.pop('FLASK_ENV', None)  # produção, como no Render
+
+    print(f"{args.clients} clientes, {args.workers} worker(s), {args.seconds:.0f}s por classe, "
+          f"{args.mail_ratio:.0%} de envios com SMTP de {args.smtp_delay:.1f}s\n")
+    print(f"{'classe':<8} {'req/s':>8} {'leitura p50':>12} {'p95':>8} {'p99':>8} {'e-mail p50':>11} {'erros':>6}")
+    for worker_class in args.classes:
+        if not class_available(worker_class):
+            print(f"{worker_class:<8} pulada: pacote não instalado (pip install gevent psycogreen)")
+            continue
+        port = free_port()
+        process, log = start_gunicorn(worker_class, args, environment, port)
+        try:
+            results = run_load(f'http://127.0.0.1:{port}', args, data)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            log.close()
+        reads, emails = results['read'], results['email']
+        print(f"{worker_class:<8} {(len(reads) + len(emails)) / args.seconds:>8.1f} "
+              f"{ms(reads, 0.50):>12} {ms(reads, 0.95):>8} {ms(reads, 0.99):>8} {ms(emails, 0.50):>11} "
+              f"{results['errors']:>6}")
+
+    smtp.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
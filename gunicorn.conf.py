@@ -0,0 +1,103 @@
+"""
+Configuração do gunicorn - AgendaMonter
+Uso: gunicorn -c gunicorn.conf.py src.main:app
+
+Tudo vem de variáveis de ambiente, com padrões pensados para uma instância
+pequena (512 MB):
+
+    GUNICORN_WORKER_CLASS        sync, gthread (padrão) ou gevent
+    WEB_CONCURRENCY              número de workers (padrão: 2; sync usa 2 x CPUs + 1, até 4)
+    GUNICORN_THREADS             threads por worker no gthread (padrão: 4)
+    GUNICORN_WORKER_CONNECTIONS  requisições simultâneas por worker no gevent (padrão: 100)
+    GUNICORN_PRELOAD             importa o app antes do fork (padrão: true, exceto gevent)
+    GUNICORN_MAX_REQUESTS        recicla o worker após N requisições (padrão: 1000; 0 desativa)
+    GUNICORN_MAX_REQUESTS_JITTER variação aleatória de max_requests (padrão: 10% dele)
+    GUNICORN_TIMEOUT             segundos sem resposta até o worker ser reiniciado (padrão: 120)
+
+Com sync, um envio SMTP lento ocupa o worker inteiro; gthread e gevent
+continuam atendendo outras requisições enquanto isso. O gevent precisa de
+`pip install gevent psycogreen`: o psycogreen torna o psycopg2 cooperativo
+(sem ele, cada consulta ao PostgreSQL trava todas as requisições do worker).
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    return value.lower() in ['true', 'on', '1'] if value else default
+
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'gthread'
+if worker_class not in ('sync', 'gthread', 'gevent'):
+    raise RuntimeError(f'GUNICORN_WORKER_CLASS inválido: {worker_class} (use sync, gthread ou gevent)')
+
+if worker_class == 'sync':
+    workers = _env_int('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4))
+else:
+    workers = _env_int('WEB_CONCURRENCY', 2)
+threads = _env_int('GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', 100)
+
+preload_app = _env_bool('GUNICORN_PRELOAD', worker_class != 'gevent')
+if worker_class == 'gevent' and preload_app:
+    # O app vai ser importado aqui no master: o patch precisa vir antes
+    from gevent import monkey
+    monkey.patch_all()
+
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT') or 8000}"
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('psycogreen não instalado: consultas ao PostgreSQL vão bloquear o worker gevent')
+        else:
+            patch_psycopg()
+
+    if preload_app:
+        # O engine foi criado no master; o worker não deve reaproveitar conexões dele
+        from src.main import app
+        from src.database import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Banco e agendador antes da primeira requisição, em cada worker
+    from src.main import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    from src.scheduler import stop_scheduler
+    from src.utils.logging_utils import stop_logging
+    from src.utils.metrics_utils import flush
+    stop_scheduler()
+    # Últimos números do worker, somados pelo master em child_exit
+    flush()
+    # O worker sai com os._exit, sem atexit: esvazia a fila de logs aqui
+    stop_logging()
+
+
+def child_exit(server, worker):
+    # Roda no master, antes que o pid do worker possa ser reaproveitado
+    from src.config import Config
+    if Config.METRICS_DIR:
+        from src.utils.metrics_utils import retire_worker
+        retire_worker(Config.METRICS_DIR, worker.pid)
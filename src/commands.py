@@ -0,0 +1,61 @@
+"""
+Comandos de linha de comando - AgendaMonter
+
+Uso: flask --app src.main <comando> --help
+"""
+from flask.cli import with_appcontext
+from src.database import db
+from src.database.routing import REPLICA_BIND
+from src.models.user import User
+from src.utils.import_utils import import_meetings
+import click
+import json
+import sqlite3
+
+
+@click.command('import-meetings')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--creator', default='Monter', show_default=True,
+              help='Usuário atribuído às reuniões sem criador no arquivo')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ics']),
+              help='Formato do arquivo (padrão: pela extensão)')
+@click.option('--dry-run', is_flag=True, help='Valida e verifica conflitos sem gravar nada')
+@click.option('--no-notify', is_flag=True, help='Não envia o resumo por e-mail aos participantes')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Reuniões por INSERT')
+@with_appcontext
+def import_meetings_command(path, creator, file_format, dry_run, no_notify, chunk_size):
+    """Importa reuniões em lote de um arquivo CSV ou ICS"""
+    user = User.query.filter((User.username == creator) | (User.email == creator)).first()
+    if user is None:
+        raise click.UsageError(f'Usuário "{creator}" não encontrado')
+    file_format = file_format or ('ics' if path.lower().endswith('.ics') else 'csv')
+
+    with open(path, encoding='utf-8-sig', newline='' if file_format == 'csv' else None) as stream:
+        report = import_meetings(stream, file_format, user, chunk_size=chunk_size,
+                                 notify=not no_notify, dry_run=dry_run)
+
+    click.echo(json.dumps(report, ensure_ascii=False, indent=2))
+    if report['rejeitadas'] and not report['aceitas']:
+        raise SystemExit(1)
+
+
+@click.command('sync-replica')
+@with_appcontext
+def sync_replica_command():
+    """Copia o banco principal para a réplica (teste local da réplica com dois arquivos SQLite)"""
+    replica = db.engines.get(REPLICA_BIND)
+    if replica is None:
+        raise click.UsageError('REPLICA_DATABASE_URL não configurada')
+    primary = db.engines[None]
+    if primary.url.get_backend_name() != 'sqlite' or replica.url.get_backend_name() != 'sqlite':
+        raise click.UsageError('Só para SQLite; no PostgreSQL use a replicação do próprio banco')
+
+    replica.dispose()
+    source = sqlite3.connect(primary.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    click.echo(f'Réplica atualizada: {replica.url.database}')
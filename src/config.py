@@ -31,8 +31,114 @@ class Config:
     
     SQLALCHEMY_DATABASE_URI = database_url
     logger.info(f"📌 String de conexão: {SQLALCHEMY_DATABASE_URI}")
+
+    # Réplica de leitura (opcional): painel, calendário, notificações e estatísticas leem
+    # dela; sem a variável, tudo fica no banco principal
+    replica_url = os.environ.get("REPLICA_DATABASE_URL")
+    if replica_url and replica_url.startswith("postgres://"):
+        replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+    SQLALCHEMY_BINDS = {"replica": replica_url} if replica_url else {}
+    # Segundos em que quem acabou de gravar continua lendo do principal (atraso da réplica)
+    REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS") or 10)
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Acima deste número de usuários os formulários de reunião deixam de listar
+    # todos os participantes e passam a usar a busca /meetings/api/users/search
+    PARTICIPANT_CHOICES_LIMIT = int(os.environ.get("PARTICIPANT_CHOICES_LIMIT") or 200)
+
+    # Cache do usuário da sessão (Flask-Login): 'cache', 'cookie' ou 'db'
+    USER_LOADER_MODE = os.environ.get("USER_LOADER_MODE") or "cache"
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL") or 60)
+    USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE") or 1024)
+    USER_SNAPSHOT_MAX_AGE = int(os.environ.get("USER_SNAPSHOT_MAX_AGE") or 300)
+    # Intervalo máximo, em segundos, até um worker perceber alterações de usuários
+    # e salas feitas em outro (inclusive permissões revogadas)
+    CACHE_VERSION_TTL = int(os.environ.get("CACHE_VERSION_TTL") or 5)
+
+    # Hash de senhas: método no formato do Werkzeug (ex: "scrypt:16384:8:1" ou
+    # "pbkdf2:sha256:600000"). Hashes antigos são regenerados no próximo login.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD") or "scrypt:32768:8:1"
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS") or 2)
+    PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE") or 8)
+    PASSWORD_VERIFY_TIMEOUT = int(os.environ.get("PASSWORD_VERIFY_TIMEOUT") or 10)
+
+    # Quantos proxies reversos na frente do app acrescentam X-Forwarded-For (1 no
+    # Render). Com 0 o cabeçalho é ignorado: o cliente poderia forjá-lo
+    PROXY_FIX_X_FOR = int(os.environ.get("PROXY_FIX_X_FOR") or 0)
+
+    # Rate limiting de login e recuperação de senha: "tentativas/segundos"
+    # RATE_LIMIT_BACKEND="database" compartilha os contadores entre workers
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() in ["true", "on", "1"]
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND") or "memory"
+    RATE_LIMIT_LOGIN_IP = os.environ.get("RATE_LIMIT_LOGIN_IP") or "30/300"
+    RATE_LIMIT_LOGIN_KEY = os.environ.get("RATE_LIMIT_LOGIN_KEY") or "10/300"
+    RATE_LIMIT_FORGOT_PASSWORD_IP = os.environ.get("RATE_LIMIT_FORGOT_PASSWORD_IP") or "10/3600"
+    RATE_LIMIT_FORGOT_PASSWORD_KEY = os.environ.get("RATE_LIMIT_FORGOT_PASSWORD_KEY") or "3/3600"
+
+    # Agendador de tarefas periódicas (src/scheduler.py) - intervalos em segundos
+    SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() in ["true", "on", "1"]
+    SCHEDULER_TICK = int(os.environ.get("SCHEDULER_TICK") or 60)
+    SCHEDULER_LOCK_TIMEOUT = int(os.environ.get("SCHEDULER_LOCK_TIMEOUT") or 900)
+    SCHEDULER_BATCH_SIZE = int(os.environ.get("SCHEDULER_BATCH_SIZE") or 500)
+    SCHEDULER_MAX_BATCHES = int(os.environ.get("SCHEDULER_MAX_BATCHES") or 20)
+    EXPIRED_MEETINGS_INTERVAL = int(os.environ.get("EXPIRED_MEETINGS_INTERVAL") or 3600)
+    EXPIRED_MEETINGS_RETENTION_DAYS = int(os.environ.get("EXPIRED_MEETINGS_RETENTION_DAYS") or 30)
+    # "archive" move para meeting_archive; "delete" remove definitivamente
+    EXPIRED_MEETINGS_ACTION = os.environ.get("EXPIRED_MEETINGS_ACTION") or "archive"
+    NOTIFICATION_PRUNE_INTERVAL = int(os.environ.get("NOTIFICATION_PRUNE_INTERVAL") or 86400)
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get("NOTIFICATION_RETENTION_DAYS") or 90)
+    # Retenção de notificações lidas por tipo ("tipo=dias,..."); os demais usam a padrão
+    NOTIFICATION_RETENTION_BY_TYPE = os.environ.get("NOTIFICATION_RETENTION_BY_TYPE") or "meeting_reminder=2,meeting_updated=30"
+    # Tipos em que só a notificação mais recente por usuário e reunião é mantida
+    NOTIFICATION_COMPACT_TYPES = os.environ.get("NOTIFICATION_COMPACT_TYPES") or "meeting_updated"
+    # Paginação de /notifications/api/notifications (tamanho padrão e máximo da página)
+    NOTIFICATION_PAGE_SIZE = int(os.environ.get("NOTIFICATION_PAGE_SIZE") or 10)
+    NOTIFICATION_PAGE_SIZE_MAX = int(os.environ.get("NOTIFICATION_PAGE_SIZE_MAX") or 100)
+    # Paginação de /api/v1/meetings
+    API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE") or 50)
+    API_PAGE_SIZE_MAX = int(os.environ.get("API_PAGE_SIZE_MAX") or 200)
+    STATISTICS_ROLLUP_INTERVAL = int(os.environ.get("STATISTICS_ROLLUP_INTERVAL") or 900)
+    RATE_LIMIT_PRUNE_INTERVAL = int(os.environ.get("RATE_LIMIT_PRUNE_INTERVAL") or 3600)
+
+    # Feeds ICS: janela do feed completo e retenção dos registros de alteração (tokens de sincronização)
+    ICS_PAST_DAYS = int(os.environ.get("ICS_PAST_DAYS") or 30)
+    ICS_FUTURE_DAYS = int(os.environ.get("ICS_FUTURE_DAYS") or 365)
+    ICS_CHANGE_RETENTION_DAYS = int(os.environ.get("ICS_CHANGE_RETENTION_DAYS") or 30)
+    MEETING_CHANGES_PRUNE_INTERVAL = int(os.environ.get("MEETING_CHANGES_PRUNE_INTERVAL") or 86400)
+
+    # Mapas de bits de disponibilidade de salas e pessoas: tamanho da faixa em minutos (divisor de 1440)
+    AVAILABILITY_SLOT_MINUTES = int(os.environ.get("AVAILABILITY_SLOT_MINUTES") or 15)
+
+    # Importação em lote (/admin/import e "flask import-meetings"): reuniões gravadas por INSERT
+    IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE") or 500)
+
+    # Lembretes "a reunião começa em N minutos" (REMINDER_INTERVAL=0 desativa)
+    REMINDER_INTERVAL = int(os.environ.get("REMINDER_INTERVAL") or 60)
+    REMINDER_LEAD_MINUTES = int(os.environ.get("REMINDER_LEAD_MINUTES") or 15)
+    REMINDER_WINDOW_MINUTES = int(os.environ.get("REMINDER_WINDOW_MINUTES") or 60)
+    REMINDER_RELOAD_SECONDS = int(os.environ.get("REMINDER_RELOAD_SECONDS") or 300)
+    REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE") or 50)
+    
+    # Contagem de consultas por requisição (cabeçalho Server-Timing e aviso de N+1 no log)
+    QUERY_PROFILING = os.environ.get("QUERY_PROFILING", "true").lower() in ["true", "on", "1"]
+    QUERY_SERVER_TIMING = os.environ.get("QUERY_SERVER_TIMING", "true").lower() in ["true", "on", "1"]
+    QUERY_COUNT_WARN = int(os.environ.get("QUERY_COUNT_WARN") or 30)
+    QUERY_DUPLICATE_WARN = int(os.environ.get("QUERY_DUPLICATE_WARN") or 5)
+    
+    # Logging: nível, formato ("json" ou "text") e fração dos eventos DEBUG repetidos mantidos
+    LOG_LEVEL = (os.environ.get("LOG_LEVEL") or "INFO").upper()
+    LOG_FORMAT = os.environ.get("LOG_FORMAT") or "json"
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE") or 0.1)
+    
+    # Métricas em /metrics (formato Prometheus). Com vários workers do gunicorn,
+    # METRICS_DIR aponta para um diretório local onde cada worker grava seus números
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ["true", "on", "1"]
+    METRICS_DIR = os.environ.get("METRICS_DIR")
+    METRICS_FLUSH_INTERVAL = int(os.environ.get("METRICS_FLUSH_INTERVAL") or 10)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    # No Render o /metrics é público: sem METRICS_TOKEN ele fica bloqueado
+    METRICS_REQUIRE_TOKEN = os.environ.get("METRICS_REQUIRE_TOKEN", "true" if os.getenv("RENDER") else "false").lower() in ["true", "on", "1"]
     
     # Configuração do Flask-Mail
     MAIL_SERVER = os.environ.get("MAIL_SERVER") or "smtp.gmail.com"
@@ -59,12 +165,11 @@ class Config:
 class ProductionConfig(Config):
     """Configurações para produção"""
     DEBUG = False
-    # Força verificação da conexão ao iniciar
-    Config.check_db_connection()
 
 class DevelopmentConfig(Config):
     """Configurações para desenvolvimento"""
     DEBUG = True
+    LOG_FORMAT = os.environ.get("LOG_FORMAT") or "text"
 
 config = {
     "development": DevelopmentConfig,
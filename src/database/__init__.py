@@ -1,3 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from src.database.routing import RoutingSession, mark_write, read_replica, use_primary
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _session_flushed(session, flush_context):
+    mark_write(session)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _session_bulk_written(orm_execute_state):
+    # INSERT/UPDATE/DELETE em lote não passam pelo flush
+    if not orm_execute_state.is_select:
+        mark_write(orm_execute_state.session)
@@ -0,0 +1,76 @@
+"""
+Roteamento de leituras para a réplica - AgendaMonter
+
+Com REPLICA_DATABASE_URL configurada, a réplica vira o bind 'replica' e as
+rotas marcadas com @read_replica fazem os SELECTs nela. Todo o resto
+continua no primário:
+- rotas sem o decorador
+- INSERT/UPDATE/DELETE e SELECT ... FOR UPDATE
+- leituras feitas depois de uma gravação na mesma requisição
+- trechos dentro de use_primary() (caches compartilhados entre requisições)
+- as requisições de um usuário logo depois de ele gravar algo, por
+  REPLICA_STICKY_SECONDS (o atraso da réplica não esconde o que ele acabou
+  de criar ou editar)
+
+Sem réplica configurada o decorador não muda nada.
+"""
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from functools import wraps
+import time
+
+REPLICA_BIND = 'replica'
+# Chave na sessão do Flask com o instante até o qual o usuário lê do primário
+STICKY_SESSION_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """Sessão que manda as leituras das rotas marcadas para a réplica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._replica_allowed(clause):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_allowed(self, clause):
+        if clause is None or not getattr(clause, 'is_select', False):
+            return False
+        if getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        if not has_request_context() or not g.get('_read_replica') or g.get('_primary_depth'):
+            return False
+        if self.info.get('replica_wrote') or self.new or self.dirty or self.deleted:
+            return False
+        return flask_session.get(STICKY_SESSION_KEY, 0) <= time.time()
+
+
+def mark_write(session):
+    """Depois de gravar: o resto da requisição e as próximas do usuário leem do primário"""
+    session.info['replica_wrote'] = True
+    if has_request_context() and REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        flask_session[STICKY_SESSION_KEY] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+
+def read_replica(f):
+    """Marca uma rota somente leitura: os SELECTs dela podem ir para a réplica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@contextmanager
+def use_primary():
+    """Força o primário no trecho, mesmo dentro de uma rota @read_replica"""
+    if not has_request_context():
+        yield
+        return
+    g._primary_depth = g.get('_primary_depth', 0) + 1
+    try:
+        yield
+    finally:
+        g._primary_depth -= 1
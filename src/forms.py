@@ -1,10 +1,21 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, BooleanField, SubmitField, SelectMultipleField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Optional
 from wtforms.fields import DateField, DateTimeLocalField
 from datetime import datetime
-from src.models.user import User, Room
+from flask import current_app
+from flask_login import current_user
+from src.models.user import User
 from src.utils.timezone_utils import get_brazil_now, is_in_past
+from src.utils.cache_utils import (
+    get_room_capacities,
+    get_room_choices,
+    get_user_choices,
+    get_user_choices_for_ids,
+    get_user_count,
+    resolve_participant_ids
+)
 
 # --- Login ---
 class LoginForm(FlaskForm):
@@ -55,10 +66,25 @@ class MeetingForm(FlaskForm):
 
     submit = SubmitField('Agendar Reunião')
 
+    # ID do organizador para a conferência de capacidade (padrão: usuário logado)
+    organizer_id = None
+
     def __init__(self, *args, **kwargs):
         super(MeetingForm, self).__init__(*args, **kwargs)
-        self.room_id.choices = [(r.id, r.name) for r in Room.query.filter_by(is_active=True).all()]
-        self.participants.choices = [(u.id, u.username) for u in User.query.all()]
+        self.room_id.choices = get_room_choices()
+        self.load_participant_choices()
+
+    def load_participant_choices(self):
+        """Lista todos os usuários em diretórios pequenos; nos grandes, só os IDs selecionados"""
+        if get_user_count() <= current_app.config.get('PARTICIPANT_CHOICES_LIMIT', 200):
+            self.participants.choices = get_user_choices()
+        else:
+            # Valida apenas os IDs enviados; os demais chegam pela busca de participantes
+            self.participants.choices = get_user_choices_for_ids(self.participants.data or [])
+
+    @property
+    def uses_participant_search(self):
+        return get_user_count() > current_app.config.get('PARTICIPANT_CHOICES_LIMIT', 200)
 
     def validate_end_datetime(self, end_datetime):
         if self.start_datetime.data and end_datetime.data:
@@ -67,6 +93,14 @@ class MeetingForm(FlaskForm):
             if end_datetime.data.date() != self.start_datetime.data.date():
                 raise ValidationError('A reunião deve começar e terminar no mesmo dia.')
 
+    def validate_room_id(self, room_id):
+        capacity = get_room_capacities().get(room_id.data)
+        # Na edição o organizador é o criador da reunião, não quem edita
+        organizer_id = self.organizer_id or current_user.id
+        headcount = len(set(self.participants.data or []) | {organizer_id})
+        if capacity and headcount > capacity:
+            raise ValidationError(f'A sala comporta {capacity} pessoa(s); a reunião tem {headcount} com o organizador.')
+
     def validate_start_datetime(self, start_datetime):
         if start_datetime.data and is_in_past(start_datetime.data):
             raise ValidationError('A data e hora de início não pode ser no passado.')
@@ -91,14 +125,10 @@ class EditMeetingForm(MeetingForm):
     def __init__(self, *args, **kwargs):
         meeting = kwargs.pop('obj', None)
         super(EditMeetingForm, self).__init__(*args, **kwargs)
-        if meeting and meeting.participants:
-            participant_names = [name.strip() for name in meeting.participants.split(',')]
-            participant_ids = []
-            for name in participant_names:
-                user = User.query.filter_by(username=name).first()
-                if user:
-                    participant_ids.append(user.id)
-            self.participants.data = participant_ids
+        self.organizer_id = meeting.created_by if meeting else None
+        if meeting and meeting.participants and not self.is_submitted():
+            self.participants.data = resolve_participant_ids(meeting.get_participants_list())
+            self.load_participant_choices()
 
 
 # --- Trocar Senha ---
@@ -124,3 +154,14 @@ class ResetPasswordForm(FlaskForm):
     new_password2 = PasswordField('Confirmar Nova Senha', validators=[DataRequired(), EqualTo('new_password')])
     submit = SubmitField('Redefinir Senha')
 
+
+
+
+# --- Importar Reuniões ---
+class ImportMeetingsForm(FlaskForm):
+    file = FileField('Arquivo (CSV ou ICS)', validators=[
+        FileRequired(), FileAllowed(['csv', 'ics'], 'Envie um arquivo .csv ou .ics')
+    ])
+    dry_run = BooleanField('Apenas simular (não grava nada)')
+    notify = BooleanField('Enviar resumo por e-mail aos participantes', default=True)
+    submit = SubmitField('Importar')
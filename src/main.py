@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 
@@ -9,17 +10,33 @@ from flask_login import LoginManager
 from flask_mail import Mail
 from flask_cors import CORS
 from flask_migrate import Migrate
+from sqlalchemy.schema import CreateIndex
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from src.models.user import User, Room
 from src.models.notification import Notification
+from src.models.rate_limit import RateLimitCounter
+from src.models.scheduler import SchedulerJob
+from src.models.statistics import MeetingStatsRollup
+from src.models.archive import MeetingArchive, NotificationArchive
+from src.models.reminder import MeetingReminder
+from src.models.calendar_change import MeetingChange
+from src.models.cache_version import CacheVersion
 from src.routes.auth import auth_bp
 from src.routes.meetings import meetings_bp
 from src.routes.admin import admin_bp
 from src.routes.notifications import notifications_bp
+from src.routes.feeds import feeds_bp
+from src.routes.api import api_bp
+from src.commands import import_meetings_command, sync_replica_command
 from src.config import config
 from src.database import db
 from src.models.meeting import Meeting
 from src.utils.timezone_utils import format_datetime_display, to_brazil_timezone
+from src.utils.cache_utils import load_session_user, invalidate_user, ensure_cache_versions
+from src.utils.query_utils import init_query_profiler
+from src.utils.metrics_utils import init_metrics
+from src.utils.logging_utils import configure_logging
 
 print("##### APLICAÇÃO INICIADA - LOG DE TESTE #####")
 
@@ -28,12 +45,19 @@ app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'sta
 # Configuração baseada no ambiente
 config_name = os.environ.get('FLASK_ENV') or 'default'
 app.config.from_object(config[config_name])
+configure_logging(app)
+
+# IP real do cliente a partir do X-Forwarded-For, só para os proxies configurados
+if app.config.get('PROXY_FIX_X_FOR'):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
 # Inicializações
 db.init_app(app)
 migrate = Migrate(app, db)
 CORS(app)  # Configuração CORS
 mail = Mail(app)  # Inicializar Flask-Mail
+init_query_profiler(app)  # Contagem de consultas por requisição
+init_metrics(app)  # Endpoint /metrics
 
 # Configuração do Flask-Login
 login_manager = LoginManager()
@@ -55,7 +79,7 @@ def to_brazil_tz_filter(dt):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    return load_session_user(int(user_id))
 
 # =============================================
 # NOVO ENDPOINT SEGURO PARA RESET DE ADMIN
@@ -82,6 +106,7 @@ def emergency_reset():
             if existing_admin:
                 db.session.delete(existing_admin)
                 db.session.commit()
+                invalidate_user(existing_admin.id)
 
             # Cria novo admin com segurança reforçada
             new_admin = User(
@@ -118,11 +143,36 @@ app.register_blueprint(auth_bp, url_prefix='/auth')
 app.register_blueprint(meetings_bp, url_prefix='/meetings')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 app.register_blueprint(notifications_bp, url_prefix='/notifications')
+app.register_blueprint(feeds_bp, url_prefix='/feeds')
+app.register_blueprint(api_bp, url_prefix='/api/v1')
+
+# Comandos de linha de comando (flask --app src.main <comando>)
+app.cli.add_command(import_meetings_command)
+app.cli.add_command(sync_replica_command)
+
+def ensure_indexes():
+    """
+    Cria os índices declarados nos modelos que ainda não existem no banco
+
+    O create_all só cria índices junto com tabelas novas; em bancos já
+    existentes, os índices acrescentados depois são criados aqui com
+    CREATE INDEX IF NOT EXISTS, seguro com vários workers iniciando juntos.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+            except Exception as e:
+                app.logger.error(f"Erro ao criar o índice {index.name}: {str(e)}")
+
 
 def init_database():
     """Inicializa o banco de dados com dados padrão"""
     with app.app_context():
         db.create_all()
+        ensure_indexes()
+        ensure_cache_versions()
 
         # Criar usuário padrão se não existir
         if not User.query.filter_by(username='Monter').first():
@@ -177,20 +227,38 @@ def ensure_database_initialized():
     except Exception as e:
         print(f"❌ Erro na inicialização do banco: {str(e)}")
 
-# Executa a inicialização SEMPRE que o módulo for importado
-ensure_database_initialized()
+# Nada de banco ao importar: com preload_app o módulo é importado no master do
+# gunicorn, antes do fork, e conexões abertas ali seriam herdadas pelos workers.
+# O gunicorn.conf.py chama init_worker em cada worker; fora dele, a primeira
+# requisição do processo faz o mesmo.
+_worker_initialized = False
+_worker_init_lock = threading.Lock()
+
+
+def init_worker():
+    """Prepara o processo para atender requisições: banco e agendador (uma vez por processo)"""
+    global _worker_initialized
+    with _worker_init_lock:
+        if _worker_initialized:
+            return
+        _worker_initialized = True
+        ensure_database_initialized()
+
+        # Um agendador por worker; as tarefas usam trava no banco para rodar em apenas um deles
+        if app.config.get('SCHEDULER_ENABLED') and not app.config.get('TESTING'):
+            from src.scheduler import start_scheduler
+            start_scheduler(app)
+
+
+@app.before_request
+def _init_worker_on_first_request():
+    if not _worker_initialized:
+        init_worker()
 
 # Executa apenas localmente
 if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
 
-    # Inicia o scheduler somente depois do app estar pronto
-    try:
-        from src.scheduler import start_scheduler
-        with app.app_context():
-            start_scheduler()
-    except ImportError:
-        print("⚠️ Scheduler não encontrado - continuando sem agendamento")
-
+    init_worker()
     app.run(debug=True, host="0.0.0.0", port=8080)
\ No newline at end of file
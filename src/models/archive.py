@@ -0,0 +1,85 @@
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from src.database import db
+from src.models.meeting import MeetingDisplayMixin
+
+
+class MeetingArchive(MeetingDisplayMixin, db.Model):
+    """
+    Reuniões antigas movidas da tabela meeting pelo agendador
+
+    Mantém os mesmos IDs e colunas de Meeting, sem chaves estrangeiras, para
+    que a tabela quente continue pequena e o arquivo não bloqueie exclusões.
+    """
+    __tablename__ = "meeting_archive"
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(80), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    start_datetime = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    end_datetime = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    created_by = db.Column(db.Integer, nullable=False, index=True)
+    room_id = db.Column(db.Integer, nullable=False)
+    parent_meeting_id = db.Column(db.Integer, nullable=True)
+    participants = db.Column(db.Text)
+    is_recurring = db.Column(db.Boolean, default=False)
+    recurrence_type = db.Column(db.String(50))
+    recurrence_end = db.Column(db.DateTime(timezone=True))
+    created_at = db.Column(db.DateTime(timezone=True))
+    archived_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    room = relationship("Room", primaryjoin="foreign(MeetingArchive.room_id) == Room.id", viewonly=True)
+    creator = relationship("User", primaryjoin="foreign(MeetingArchive.created_by) == User.id", viewonly=True)
+
+    is_archived = True
+    # Ocorrências arquivadas não são editáveis nem agrupadas na listagem
+    child_meetings = ()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'start_datetime': self.start_datetime.isoformat() if self.start_datetime else None,
+            'end_datetime': self.end_datetime.isoformat() if self.end_datetime else None,
+            'participants': self.participants,
+            'room_id': self.room_id,
+            'room_name': self.room.name if self.room else None,
+            'created_by': self.created_by,
+            'creator_name': self.creator.username if self.creator else None,
+            'is_recurring': self.is_recurring,
+            'recurrence_type': self.recurrence_type,
+            'recurrence_end': self.recurrence_end.isoformat() if self.recurrence_end else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived': True
+        }
+
+    def __repr__(self):
+        return f'<MeetingArchive {self.title}>'
+
+
+class NotificationArchive(db.Model):
+    """Notificações das reuniões arquivadas"""
+    __tablename__ = 'notification_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    meeting_id = db.Column(db.Integer, nullable=False, index=True)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    notification_type = db.Column(db.String(50), nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<NotificationArchive {self.title}>'
+
+
+# Colunas copiadas de meeting/notifications para o arquivo, na mesma ordem
+MEETING_ARCHIVE_COLUMNS = [
+    'id', 'title', 'description', 'start_datetime', 'end_datetime', 'created_by',
+    'room_id', 'parent_meeting_id', 'participants', 'is_recurring', 'recurrence_type',
+    'recurrence_end', 'created_at'
+]
+NOTIFICATION_ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'meeting_id', 'title', 'message', 'notification_type', 'is_read', 'created_at'
+]
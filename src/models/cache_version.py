@@ -0,0 +1,12 @@
+from src.database import db
+
+
+class CacheVersion(db.Model):
+    """Versão de cada conjunto em cache (usuários, salas), compartilhada entre workers do gunicorn"""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
@@ -0,0 +1,29 @@
+from datetime import datetime
+from src.database import db
+
+
+class MeetingChange(db.Model):
+    """
+    Registro de alterações em reuniões, usado como token de sincronização dos feeds ICS
+
+    O id é crescente: um cliente que sincronizou até o id N recebe apenas as
+    séries alteradas depois dele. Os campos de escopo (sala, criador,
+    participantes, inclusive os valores anteriores a uma edição) permitem
+    filtrar as alterações de cada feed sem consultar a reunião, que pode já
+    ter sido excluída.
+    """
+    __tablename__ = 'meeting_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    meeting_id = db.Column(db.Integer, nullable=False)
+    # Reunião principal da série (ou a própria reunião, se avulsa)
+    series_id = db.Column(db.Integer, nullable=False)
+    room_id = db.Column(db.Integer)
+    previous_room_id = db.Column(db.Integer)
+    created_by = db.Column(db.Integer)
+    participants = db.Column(db.Text)
+    action = db.Column(db.String(10), nullable=False)  # 'upsert' ou 'delete'
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<MeetingChange {self.action} {self.meeting_id}>'
@@ -4,16 +4,59 @@ from sqlalchemy.sql import func
 from src.database import db
 from src.utils.timezone_utils import to_brazil_timezone, format_datetime_display
 
+class MeetingDisplayMixin:
+    """Propriedades de exibição compartilhadas por Meeting e MeetingArchive"""
+
+    def get_participants_list(self):
+        if self.participants:
+            return [p.strip() for p in self.participants.split(',') if p.strip()]
+        return []
+
+    @property
+    def start_datetime_brazil(self):
+        """Retorna data/hora de início no timezone do Brasil"""
+        return to_brazil_timezone(self.start_datetime)
+
+    @property
+    def end_datetime_brazil(self):
+        """Retorna data/hora de fim no timezone do Brasil"""
+        return to_brazil_timezone(self.end_datetime)
+
+    @property
+    def created_at_brazil(self):
+        """Retorna data/hora de criação no timezone do Brasil"""
+        return to_brazil_timezone(self.created_at)
+
+    @property
+    def start_display(self):
+        """Retorna data/hora de início formatada para exibição"""
+        return format_datetime_display(self.start_datetime)
+
+    @property
+    def end_display(self):
+        """Retorna data/hora de fim formatada para exibição"""
+        return format_datetime_display(self.end_datetime)
+
+    @property
+    def created_display(self):
+        """Retorna data/hora de criação formatada para exibição"""
+        return format_datetime_display(self.created_at)
+
+
 # Classe Meeting
-class Meeting(db.Model):
+class Meeting(MeetingDisplayMixin, db.Model):
     __tablename__ = "meeting"
+    __table_args__ = (
+        # Agenda de uma sala: disponibilidade e realocação quando a sala fecha
+        db.Index('ix_meeting_room_start', 'room_id', 'start_datetime'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(80), nullable=False)
     description = db.Column(db.Text, nullable=True)
 
     # Campos de data/hora com timezone para trabalhar em UTC
-    start_datetime = db.Column(db.DateTime(timezone=True), nullable=False)
+    start_datetime = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
     end_datetime = db.Column(db.DateTime(timezone=True), nullable=False)
 
     # Foreign keys
@@ -59,40 +102,7 @@ class Meeting(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
-    def get_participants_list(self):
-        if self.participants:
-            return [p.strip() for p in self.participants.split(',') if p.strip()]
-        return []
-
-    @property
-    def start_datetime_brazil(self):
-        """Retorna data/hora de início no timezone do Brasil"""
-        return to_brazil_timezone(self.start_datetime)
-
-    @property
-    def end_datetime_brazil(self):
-        """Retorna data/hora de fim no timezone do Brasil"""
-        return to_brazil_timezone(self.end_datetime)
-
-    @property
-    def created_at_brazil(self):
-        """Retorna data/hora de criação no timezone do Brasil"""
-        return to_brazil_timezone(self.created_at)
-
-    @property
-    def start_display(self):
-        """Retorna data/hora de início formatada para exibição"""
-        return format_datetime_display(self.start_datetime)
-
-    @property
-    def end_display(self):
-        """Retorna data/hora de fim formatada para exibição"""
-        return format_datetime_display(self.end_datetime)
-
-    @property
-    def created_display(self):
-        """Retorna data/hora de criação formatada para exibição"""
-        return format_datetime_display(self.created_at)
+    is_archived = False
 
     def __repr__(self):
         return f'<Meeting {self.title}>'
\ No newline at end of file
@@ -5,6 +5,16 @@ from src.database import db
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # get_user_notifications: filtro por usuário, ordenado por data
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        # get_unread_count: índice parcial só com as não lidas, pequeno o bastante para ficar em cache
+        db.Index(
+            'ix_notifications_user_unread', 'user_id',
+            postgresql_where=db.text('is_read = false'),
+            sqlite_where=db.text('is_read = 0')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,13 @@
+from src.database import db
+
+
+class RateLimitCounter(db.Model):
+    """Contador compartilhado entre workers para o rate limiting (backend 'database')"""
+    __tablename__ = 'rate_limit_counters'
+
+    key = db.Column(db.String(255), primary_key=True)
+    window = db.Column(db.Integer, primary_key=True)  # timestamp de início da janela
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RateLimitCounter {self.key}@{self.window}={self.count}>'
@@ -0,0 +1,18 @@
+from datetime import datetime
+from src.database import db
+
+
+class MeetingReminder(db.Model):
+    """Registro dos lembretes já disparados, para não repetir após reinícios"""
+    __tablename__ = 'meeting_reminders'
+    __table_args__ = (
+        db.UniqueConstraint('meeting_id', 'lead_minutes', name='uq_meeting_reminder'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    meeting_id = db.Column(db.Integer, db.ForeignKey('meeting.id', ondelete='CASCADE'), nullable=False)
+    lead_minutes = db.Column(db.Integer, nullable=False)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MeetingReminder reunião={self.meeting_id} {self.lead_minutes}min>'
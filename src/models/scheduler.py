@@ -0,0 +1,24 @@
+from src.database import db
+
+
+class SchedulerJob(db.Model):
+    """Estado de cada tarefa agendada, usado como trava entre workers do gunicorn"""
+    __tablename__ = 'scheduler_jobs'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    last_run_at = db.Column(db.DateTime)
+    last_result = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'locked_until': self.locked_until.isoformat() if self.locked_until else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_result': self.last_result
+        }
+
+    def __repr__(self):
+        return f'<SchedulerJob {self.name}>'
@@ -0,0 +1,14 @@
+from src.database import db
+
+
+class MeetingStatsRollup(db.Model):
+    """Contagem de reuniões pré-agregada por mês, sala e criador para a página de estatísticas"""
+    __tablename__ = 'meeting_stats_rollup'
+
+    month = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    room_id = db.Column(db.Integer, primary_key=True)
+    created_by = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<MeetingStatsRollup {self.month} sala={self.room_id} criador={self.created_by}: {self.count}>'
@@ -1,5 +1,5 @@
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from datetime import datetime
 from src.database import db
 
@@ -14,10 +14,15 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from src.utils.password_utils import hash_password
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        from src.utils.password_utils import needs_rehash
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
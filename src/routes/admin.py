@@ -1,10 +1,23 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, Response, stream_with_context, abort
 from flask_login import login_required, current_user
 from src.models.user import db, User, Room
+from src.database import read_replica
 from src.models.meeting import Meeting
+from src.models.statistics import MeetingStatsRollup
+from src.utils.maintenance_utils import month_expression
+from src.utils.history_utils import meetings_source, meeting_history, parse_date_range
 
-from src.forms import CreateUserForm
+from src.forms import CreateUserForm, ImportMeetingsForm
+from src.utils.import_utils import import_meetings as run_import
+from src.utils.reassignment_utils import plan_reassignment, apply_reassignment
+from src.utils.batch_utils import BatchError
+from src.utils.timezone_utils import get_brazil_now
+from src.utils.cache_utils import invalidate_user, get_user_cache_stats, get_room_choices, get_user_choices
+from src.utils.export_utils import (
+    MEETING_COLUMNS, STATISTICS_COLUMNS, meeting_export_rows, statistics_export_rows, iter_csv, iter_xlsx
+)
 from functools import wraps
+import io
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -52,6 +65,7 @@ def delete_user(user_id):
     username = user_to_delete.username
     db.session.delete(user_to_delete)
     db.session.commit()
+    invalidate_user(user_id)
     
     flash(f'Usuário {username} excluído com sucesso!', 'success')
     return redirect(url_for('admin.users'))
@@ -75,6 +89,7 @@ def toggle_admin(user_id):
     
     user.is_admin = not user.is_admin
     db.session.commit()
+    invalidate_user(user.id)
     
     status = 'administrador' if user.is_admin else 'usuário comum'
     flash(f'Usuário {user.username} agora é {status}.', 'success')
@@ -88,17 +103,53 @@ def rooms():
     all_rooms = Room.query.order_by(Room.name).all()
     return render_template('admin/rooms.html', rooms=all_rooms)
 
+@admin_bp.route('/rooms/<int:room_id>/reassign', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def reassign_room(room_id):
+    """Pré-visualiza (GET) e aplica (POST) a realocação das reuniões futuras de uma sala"""
+    room = Room.query.get_or_404(room_id)
+    args = request.form if request.method == 'POST' else request.args
+    start, end = parse_date_range(args)
+
+    if request.method == 'POST':
+        try:
+            plan, moved = apply_reassignment(room.id, current_user, start, end, notify=args.get('notify') == 'y')
+        except BatchError as e:
+            db.session.rollback()
+            flash(f'Nenhuma reunião foi movida: {e}', 'danger')
+            return redirect(url_for('admin.reassign_room', room_id=room.id,
+                                    inicio=args.get('inicio', ''), fim=args.get('fim', '')))
+        pending = len(plan) - moved
+        flash(f'{moved} reunião(ões) realocadas.' + (f' {pending} continuam na sala sem alternativa.' if pending else ''),
+              'success' if not pending else 'warning')
+        return redirect(url_for('admin.reassign_room', room_id=room.id,
+                                inicio=args.get('inicio', ''), fim=args.get('fim', '')))
+
+    plan = plan_reassignment(room.id, start, end)
+    return render_template('admin/reassign.html', room=room, plan=plan,
+                           assigned=sum(1 for item in plan if item['room'] is not None),
+                           filter_start=args.get('inicio', ''), filter_end=args.get('fim', ''))
+
 @admin_bp.route('/meetings')
 @login_required
 @admin_required
 def meetings():
     """Lista todas as reuniões do sistema"""
-    all_meetings = Meeting.query.order_by(Meeting.start_datetime.desc()).all()
-    return render_template('admin/meetings.html', meetings=all_meetings)
+    start, end = parse_date_range(request.args)
+    room_id = request.args.get('sala', type=int)
+    created_by = request.args.get('criador', type=int)
+    all_meetings = meeting_history(start=start, end=end, room_id=room_id, created_by=created_by)
+    return render_template('admin/meetings.html', meetings=all_meetings,
+                           filter_start=request.args.get('inicio', ''),
+                           filter_end=request.args.get('fim', ''),
+                           filter_room=room_id, filter_creator=created_by,
+                           rooms=get_room_choices(), users=get_user_choices())
 
 @admin_bp.route('/statistics')
 @login_required
 @admin_required
+@read_replica
 def statistics():
     """Exibe estatísticas do sistema"""
     from datetime import datetime, timedelta
@@ -106,32 +157,62 @@ def statistics():
     
     # Estatísticas gerais
     total_users = User.query.count()
-    total_meetings = Meeting.query.count()
     total_rooms = Room.query.filter_by(is_active=True).count()
-    
-    # Reuniões por mês (últimos 6 meses)
     six_months_ago = datetime.now() - timedelta(days=180)
-    meetings_by_month = db.session.query(
-        func.strftime('%Y-%m', Meeting.start_datetime).label('month'),
-        func.count(Meeting.id).label('count')
-    ).filter(
-        Meeting.start_datetime >= six_months_ago
-    ).group_by(
-        func.strftime('%Y-%m', Meeting.start_datetime)
-    ).all()
 
-    
-    # Salas mais utilizadas
-    rooms_usage = db.session.query(
-        Room.name,
-        func.count(Meeting.id).label('count')
-    ).join(Meeting).group_by(Room.name).order_by(func.count(Meeting.id).desc()).all()
-    
-    # Usuários mais ativos (que mais criam reuniões)
-    active_users = db.session.query(
-        User.username,
-        func.count(Meeting.id).label('count')
-    ).join(Meeting).group_by(User.username).order_by(func.count(Meeting.id).desc()).limit(5).all()
+    # Usa o rollup pré-agregado pelo agendador quando disponível
+    if db.session.query(MeetingStatsRollup.month).first() is not None:
+        total_meetings = db.session.query(func.coalesce(func.sum(MeetingStatsRollup.count), 0)).scalar()
+
+        meetings_by_month = db.session.query(
+            MeetingStatsRollup.month.label('month'),
+            func.sum(MeetingStatsRollup.count).label('count')
+        ).filter(
+            MeetingStatsRollup.month >= six_months_ago.strftime('%Y-%m')
+        ).group_by(MeetingStatsRollup.month).order_by(MeetingStatsRollup.month).all()
+
+        rooms_usage = db.session.query(
+            Room.name,
+            func.sum(MeetingStatsRollup.count).label('count')
+        ).join(MeetingStatsRollup, MeetingStatsRollup.room_id == Room.id).group_by(
+            Room.name
+        ).order_by(func.sum(MeetingStatsRollup.count).desc()).all()
+
+        active_users = db.session.query(
+            User.username,
+            func.sum(MeetingStatsRollup.count).label('count')
+        ).join(MeetingStatsRollup, MeetingStatsRollup.created_by == User.id).group_by(
+            User.username
+        ).order_by(func.sum(MeetingStatsRollup.count).desc()).limit(5).all()
+    else:
+        # Totais de todo o período incluem o arquivo; o recorte de 6 meses só
+        # consulta o arquivo se o período o alcançar
+        all_meetings = meetings_source()
+        total_meetings = db.session.query(func.count(all_meetings.c.id)).scalar()
+
+        # Reuniões por mês (últimos 6 meses)
+        recent = meetings_source(since=six_months_ago)
+        month = month_expression(recent.c.start_datetime)
+        meetings_by_month = db.session.query(
+            month.label('month'),
+            func.count(recent.c.id).label('count')
+        ).group_by(month).order_by(month).all()
+
+        # Salas mais utilizadas
+        rooms_usage = db.session.query(
+            Room.name,
+            func.count(all_meetings.c.id).label('count')
+        ).join(all_meetings, all_meetings.c.room_id == Room.id).group_by(
+            Room.name
+        ).order_by(func.count(all_meetings.c.id).desc()).all()
+
+        # Usuários mais ativos (que mais criam reuniões)
+        active_users = db.session.query(
+            User.username,
+            func.count(all_meetings.c.id).label('count')
+        ).join(all_meetings, all_meetings.c.created_by == User.id).group_by(
+            User.username
+        ).order_by(func.count(all_meetings.c.id).desc()).limit(5).all()
     
     return render_template('admin/statistics.html',
                          total_users=total_users,
@@ -162,3 +243,90 @@ def user_info_api(user_id):
     
     return jsonify(user_data)
 
+@admin_bp.route('/api/cache_stats')
+@login_required
+@admin_required
+def cache_stats_api():
+    """API com os contadores do cache de usuários da sessão"""
+    return jsonify({'user_cache': get_user_cache_stats()})
+
+def _import_upload(file, dry_run, notify):
+    """Importa o arquivo enviado sem carregá-lo inteiro na memória"""
+    file_format = 'ics' if file.filename.lower().endswith('.ics') else 'csv'
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='' if file_format == 'csv' else None)
+    return run_import(
+        stream, file_format, current_user,
+        chunk_size=current_app.config.get('IMPORT_CHUNK_SIZE', 500),
+        notify=notify, dry_run=dry_run
+    )
+
+@admin_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_meetings():
+    """Importação em lote de reuniões a partir de CSV ou ICS"""
+    form = ImportMeetingsForm()
+    report = None
+    if form.validate_on_submit():
+        report = _import_upload(form.file.data, form.dry_run.data, form.notify.data)
+        if report['simulacao']:
+            flash(f"Simulação: {report['aceitas']} reunião(ões) seriam importadas, {report['rejeitadas']} rejeitadas.", 'info')
+        else:
+            flash(f"{report['aceitas']} reunião(ões) importadas, {report['rejeitadas']} rejeitadas.", 'success')
+    return render_template('admin/import.html', form=form, report=report)
+
+@admin_bp.route('/api/import', methods=['POST'])
+@login_required
+@admin_required
+def import_meetings_api():
+    """API de importação: multipart com o campo 'file'; dry_run e notify opcionais"""
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'Envie o arquivo no campo "file"'}), 400
+    if not file.filename.lower().endswith(('.csv', '.ics')):
+        return jsonify({'error': 'Formato não suportado; envie .csv ou .ics'}), 400
+    dry_run = request.form.get('dry_run', 'false').lower() in ('1', 'true', 'yes')
+    notify = request.form.get('notify', 'true').lower() in ('1', 'true', 'yes')
+    return jsonify(_import_upload(file, dry_run, notify))
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def _export_response(name, header, rows, file_format, sheet_name):
+    """Resposta em fluxo: as linhas são lidas e escritas enquanto o arquivo é baixado"""
+    if file_format not in EXPORT_MIMETYPES:
+        abort(404)
+    chunks = iter_csv(header, rows) if file_format == 'csv' else iter_xlsx(header, rows, sheet_name)
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[file_format])
+    filename = f'{name}-{get_brazil_now():%Y%m%d-%H%M}.{file_format}'
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def _export_filters():
+    start, end = parse_date_range(request.args)
+    return {
+        'start': start,
+        'end': end,
+        'room_id': request.args.get('sala', type=int),
+        'created_by': request.args.get('criador', type=int),
+    }
+
+@admin_bp.route('/export/meetings.<file_format>')
+@login_required
+@admin_required
+def export_meetings(file_format):
+    """Exporta as reuniões (filtros: inicio, fim, sala, criador) em CSV ou XLSX"""
+    rows = meeting_export_rows(**_export_filters())
+    return _export_response('reunioes', MEETING_COLUMNS, rows, file_format, 'Reuniões')
+
+@admin_bp.route('/export/statistics.<file_format>')
+@login_required
+@admin_required
+@read_replica
+def export_statistics(file_format):
+    """Exporta a contagem de reuniões por mês, sala e criador em CSV ou XLSX"""
+    rows = statistics_export_rows(**_export_filters())
+    return _export_response('estatisticas', STATISTICS_COLUMNS, rows, file_format, 'Estatísticas')
@@ -0,0 +1,150 @@
+from flask import Blueprint, request, current_app, Response
+from flask_login import current_user
+from functools import wraps
+from src.database import db
+from src.models.meeting import Meeting
+from src.models.user import User, Room
+from src.utils.api_utils import (
+    MEETING_FIELDS, MEETING_DEFAULT_FIELDS, MEETING_JOINS,
+    ROOM_FIELDS, ROOM_DEFAULT_FIELDS, USER_FIELDS, USER_DEFAULT_FIELDS,
+    parse_fields, build_select, serialize_rows, encode_cursor, meetings_after, dumps
+)
+from src.utils.history_utils import parse_date_range
+
+api_bp = Blueprint('api_v1', __name__)
+
+
+class ApiError(Exception):
+    """Erro devolvido ao cliente como {"error": mensagem}"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_bp.errorhandler(ApiError)
+def handle_api_error(error):
+    return json_response({'error': error.message}, error.status)
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def api_login_required(f):
+    """Como login_required, mas responde 401 em JSON em vez de redirecionar para o login"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise ApiError('Autenticação necessária', 401)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _fields(available, default):
+    try:
+        return parse_fields(request.args.get('fields'), available, default, current_user.is_admin)
+    except ValueError as e:
+        raise ApiError(str(e))
+
+
+def _one(statement, fields, names):
+    row = db.session.execute(statement).first()
+    if row is None:
+        raise ApiError('Não encontrado', 404)
+    return json_response(serialize_rows(fields, names, [row])[0])
+
+
+@api_bp.route('/meetings')
+@api_login_required
+def list_meetings():
+    """
+    Lista reuniões por data de início, paginadas por cursor
+
+    Parâmetros: fields, inicio, fim (AAAA-MM-DD), room_id, created_by, limit, cursor
+    """
+    names = _fields(MEETING_FIELDS, MEETING_DEFAULT_FIELDS)
+    default_limit = current_app.config.get('API_PAGE_SIZE', 50)
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), current_app.config.get('API_PAGE_SIZE_MAX', 200)))
+
+    # Início e id entram no SELECT para montar o próximo cursor, mesmo que não tenham sido pedidos
+    statement = build_select(
+        MEETING_FIELDS, names, Meeting, MEETING_JOINS,
+        extra=(Meeting.start_datetime.label('_cursor_start'), Meeting.id.label('_cursor_id'))
+    )
+    start, end = parse_date_range(request.args)
+    if start is not None:
+        statement = statement.where(Meeting.start_datetime >= start)
+    if end is not None:
+        statement = statement.where(Meeting.start_datetime < end)
+    room_id = request.args.get('room_id', type=int)
+    if room_id is not None:
+        statement = statement.where(Meeting.room_id == room_id)
+    created_by = request.args.get('created_by', type=int)
+    if created_by is not None:
+        statement = statement.where(Meeting.created_by == created_by)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            statement = meetings_after(statement, cursor)
+        except ValueError as e:
+            raise ApiError(str(e))
+
+    rows = db.session.execute(
+        statement.order_by(Meeting.start_datetime, Meeting.id).limit(limit + 1)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._cursor_start, rows[-1]._cursor_id)
+
+    return json_response({'data': serialize_rows(MEETING_FIELDS, names, rows), 'next_cursor': next_cursor})
+
+
+@api_bp.route('/meetings/<int:meeting_id>')
+@api_login_required
+def get_meeting(meeting_id):
+    names = _fields(MEETING_FIELDS, MEETING_DEFAULT_FIELDS)
+    statement = build_select(MEETING_FIELDS, names, Meeting, MEETING_JOINS).where(Meeting.id == meeting_id)
+    return _one(statement, MEETING_FIELDS, names)
+
+
+@api_bp.route('/rooms')
+@api_login_required
+def list_rooms():
+    """Lista as salas ativas (administradores podem pedir todas com ?all=true)"""
+    names = _fields(ROOM_FIELDS, ROOM_DEFAULT_FIELDS)
+    statement = build_select(ROOM_FIELDS, names, Room).order_by(Room.name)
+    if not (current_user.is_admin and request.args.get('all', 'false').lower() == 'true'):
+        statement = statement.where(Room.is_active.is_(True))
+    rows = db.session.execute(statement).all()
+    return json_response({'data': serialize_rows(ROOM_FIELDS, names, rows)})
+
+
+@api_bp.route('/rooms/<int:room_id>')
+@api_login_required
+def get_room(room_id):
+    names = _fields(ROOM_FIELDS, ROOM_DEFAULT_FIELDS)
+    return _one(build_select(ROOM_FIELDS, names, Room).where(Room.id == room_id), ROOM_FIELDS, names)
+
+
+@api_bp.route('/users')
+@api_login_required
+def list_users():
+    """Lista os usuários; e-mail e demais dados cadastrais só para administradores"""
+    names = _fields(USER_FIELDS, USER_DEFAULT_FIELDS)
+    rows = db.session.execute(build_select(USER_FIELDS, names, User).order_by(User.username)).all()
+    return json_response({'data': serialize_rows(USER_FIELDS, names, rows)})
+
+
+@api_bp.route('/users/<int:user_id>')
+@api_login_required
+def get_user(user_id):
+    # O próprio usuário pode ver os seus dados cadastrais
+    try:
+        names = parse_fields(request.args.get('fields'), USER_FIELDS, USER_DEFAULT_FIELDS,
+                             current_user.is_admin or current_user.id == user_id)
+    except ValueError as e:
+        raise ApiError(str(e))
+    return _one(build_select(USER_FIELDS, names, User).where(User.id == user_id), USER_FIELDS, names)
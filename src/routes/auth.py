@@ -2,10 +2,14 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, login_required, current_user
 from src.models.user import db, User
 from src.forms import LoginForm, CreateUserForm, ChangePasswordForm, ForgotPasswordForm, ResetPasswordForm
+from src.utils.cache_utils import invalidate_user, remember_user_snapshot
+from src.utils.password_utils import verify_password, PasswordHasherBusy
+from src.utils.rate_limit_utils import rate_limit, reset_rate_limit
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('login', key_field='username', template='auth/login.html', form_class=LoginForm)
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('meetings.dashboard'))
@@ -13,8 +17,20 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            password_ok = user is not None and verify_password(user.password_hash, form.password.data)
+        except PasswordHasherBusy:
+            flash('Servidor ocupado. Tente novamente em alguns segundos.', 'error')
+            return render_template('auth/login.html', form=form), 503
+
+        if password_ok:
+            # Regenera o hash se os parâmetros configurados mudaram
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user, remember=form.remember_me.data)
+            remember_user_snapshot(user)
+            reset_rate_limit('login', form.username.data)
             next_page = request.args.get('next')
             if not next_page or not next_page.startswith('/'):
                 next_page = url_for('meetings.dashboard')
@@ -62,6 +78,7 @@ def change_password():
         if current_user.check_password(form.current_password.data):
             current_user.set_password(form.new_password.data)
             db.session.commit()
+            invalidate_user(current_user.id)
             flash('Senha alterada com sucesso!', 'success')
             return redirect(url_for('meetings.dashboard'))
         else:
@@ -77,6 +94,7 @@ def current_user_api():
 
 
 @auth_bp.route('/forgot_password', methods=['GET', 'POST'])
+@rate_limit('forgot_password', key_field='email', template='auth/forgot_password.html', form_class=ForgotPasswordForm)
 def forgot_password():
     if current_user.is_authenticated:
         return redirect(url_for('meetings.dashboard'))
@@ -105,6 +123,7 @@ def reset_password(token):
     if form.validate_on_submit():
         user.set_password(form.new_password.data)
         db.session.commit()
+        invalidate_user(user.id)
         flash('Sua senha foi redefinida com sucesso!', 'success')
         return redirect(url_for('auth.login'))
     return render_template('auth/reset_password.html', form=form)
@@ -0,0 +1,61 @@
+from flask import Blueprint, request, current_app, Response, abort
+from src.models.user import User, Room
+from src.utils.ics_utils import FeedScope, build_feed, build_incremental_feed, latest_change_id, verify_feed_token
+from src.utils.timezone_utils import get_brazil_now
+
+feeds_bp = Blueprint('feeds', __name__)
+
+
+def _feed_user(token):
+    user_id = verify_feed_token(token)
+    user = User.query.get(user_id) if user_id else None
+    if user is None:
+        abort(404)
+    return user
+
+
+def _feed_response(scope, name):
+    """
+    Responde o feed ICS com ETag
+
+    O ETag combina escopo, token de sincronização e dia (a janela do feed anda
+    uma vez por dia); se nada mudou, o feed nem é montado e a resposta é 304.
+    """
+    since = request.args.get('sync_token', type=int)
+    etag = f'{scope.key}-{latest_change_id()}-{since if since is not None else "full"}-{get_brazil_now():%Y%m%d}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    body = None
+    if since is not None:
+        body = build_incremental_feed(scope, name, since)
+    full = body is None
+    if full:
+        body = build_feed(
+            scope, name,
+            past_days=current_app.config.get('ICS_PAST_DAYS', 30),
+            future_days=current_app.config.get('ICS_FUTURE_DAYS', 365)
+        )
+
+    response = Response(body, mimetype='text/calendar')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    response.headers['X-Sync-Full'] = '1' if full else '0'
+    return response
+
+
+@feeds_bp.route('/<token>/meetings.ics')
+def user_feed(token):
+    """Feed com as reuniões criadas pelo usuário ou das quais ele participa"""
+    user = _feed_user(token)
+    return _feed_response(FeedScope(user=user), f'Reuniões de {user.username}')
+
+
+@feeds_bp.route('/<token>/rooms/<int:room_id>.ics')
+def room_feed(token, room_id):
+    """Feed com as reuniões de uma sala"""
+    _feed_user(token)
+    room = Room.query.get_or_404(room_id)
+    return _feed_response(FeedScope(room_id=room.id), f'Sala {room.name}')
@@ -12,20 +12,39 @@ from src.utils.timezone_utils import (
     ensure_timezone_aware
 )
 from src.models.user import db, Room, User
+from src.database import read_replica
 from src.models.meeting import Meeting
 from src.models.notification import Notification
 from src.forms import MeetingForm, EditMeetingForm
+from src.utils.cache_utils import get_user_choices_for_ids, resolve_participant_names
+from src.utils.search_utils import search_users
+from src.utils.maintenance_utils import purge_expired_meetings
+from src.utils.history_utils import meeting_history, parse_date_range
+from src.utils.reminder_utils import reminder_engine
+from src.utils.ics_utils import get_feed_token
+from src.utils.metrics_utils import CONFLICT_CHECKS, RECURRENCES_CREATED
+from src.utils.batch_utils import BatchError, apply_batch, parse_batch_payload
+from src.utils.availability_utils import availability, suggest_rooms
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from zoneinfo import ZoneInfo
 import pytz
 import json
+import logging
 
 meetings_bp = Blueprint("meetings", __name__)
+logger = logging.getLogger(__name__)
 
 
 def check_room_availability(room_id, start_datetime, end_datetime, exclude_meeting_id=None):
-    print(f"🔍 Checando sala {room_id} de {start_datetime} até {end_datetime}")
+    # Argumentos em vez de f-string: com DEBUG desligado nada é formatado
+    logger.debug("Checando sala %s de %s até %s", room_id, start_datetime, end_datetime)
+    # Sala livre no mapa de bits dispensa a consulta; ocupada, a consulta traz os conflitos
+    if availability.free_rooms(start_datetime, end_datetime, [room_id]):
+        CONFLICT_CHECKS.inc(kind='room', result='free')
+        return True, []
+
     query = Meeting.query.filter(
         Meeting.room_id == room_id,
         Meeting.start_datetime < end_datetime,
@@ -35,8 +54,9 @@ def check_room_availability(room_id, start_datetime, end_datetime, exclude_meeti
         query = query.filter(Meeting.id != exclude_meeting_id)
 
     conflicts = query.all()
+    CONFLICT_CHECKS.inc(kind='room', result='conflict' if conflicts else 'free')
     for conflict in conflicts:
-        print(f"⚠️ Conflito com {conflict.title} de {conflict.start_datetime} até {conflict.end_datetime}")
+        logger.debug("Conflito com %s de %s até %s", conflict.title, conflict.start_datetime, conflict.end_datetime)
 
     return len(conflicts) == 0, conflicts
 
@@ -47,7 +67,7 @@ def create_recurring_meetings(base_meeting, fixed_start_time, fixed_end_time):
         return []
 
     if not base_meeting.recurrence_end:
-        print("⚠️ Erro: recurrence_end está vazio para uma reunião recorrente.")
+        logger.warning("recurrence_end está vazio para uma reunião recorrente", extra={'meeting_id': base_meeting.id})
         return []
 
     created_meetings = []
@@ -79,7 +99,7 @@ def create_recurring_meetings(base_meeting, fixed_start_time, fixed_end_time):
                 datetime.min.time()
             ))
     except Exception as e:
-        print(f"❌ Erro ao processar data de fim da recorrência: {e}")
+        logger.error(f"Erro ao processar data de fim da recorrência: {e}")
         return []
 
     max_iterations = 100
@@ -134,11 +154,11 @@ def create_recurring_meetings(base_meeting, fixed_start_time, fixed_end_time):
                 created_meetings.append(new_meeting)
 
         except Exception as e:
-            print(f"❌ Erro ao criar reunião recorrente para {current_date}: {e}")
+            logger.error(f"Erro ao criar reunião recorrente para {current_date}: {e}")
             continue
 
-    print(f"📅 Criando reuniões recorrentes...")
-    print(f"✅ Processadas {iteration_count} iterações, criadas {len(created_meetings)} reuniões")
+    logger.debug("Processadas %s iterações, criadas %s reuniões recorrentes", iteration_count, len(created_meetings))
+    RECURRENCES_CREATED.inc(len(created_meetings))
     return created_meetings
 # --- FIM DA FUNÇÃO CORRIGIDA ---
 
@@ -161,6 +181,7 @@ def format_datetime_brazil(dt):
 
 @meetings_bp.route('/dashboard')
 @login_required
+@read_replica
 def dashboard():
     now_brazil = get_brazil_now()
 
@@ -238,11 +259,7 @@ def create_meeting():
             created_at=get_brazil_now()
         )
 
-        participant_names = []
-        for participant_id in form.participants.data:
-            participant = User.query.get(participant_id)
-            if participant:
-                participant_names.append(participant.username)
+        participant_names = resolve_participant_names(form.participants.data)
 
         new_meeting.participants = ", ".join(participant_names) if participant_names else None
 
@@ -250,6 +267,7 @@ def create_meeting():
         db.session.commit()
 
         all_meetings = [new_meeting]
+        reminder_engine.invalidate()
 
         if new_meeting.is_recurring:
             try:
@@ -257,17 +275,16 @@ def create_meeting():
                 if recurring_meetings:
                     db.session.commit()
                     all_meetings.extend(recurring_meetings)
-                    print(f"✅ Criadas {len(recurring_meetings)} reuniões recorrentes")
+                    logger.info(f"Criadas {len(recurring_meetings)} reuniões recorrentes", extra={'meeting_id': new_meeting.id})
             except Exception as e:
-                print(f"❌ Erro ao criar reuniões recorrentes: {e}")
+                logger.error(f"Erro ao criar reuniões recorrentes: {e}")
                 db.session.rollback()
                 db.session.commit()
 
         if participant_names:
             participant_emails = []
-            for participant_id in form.participants.data:
-                participant = User.query.get(participant_id)
-                if participant and participant.email:
+            for participant in User.query.filter(User.id.in_(form.participants.data)).all():
+                if participant.email:
                     participant_emails.append(participant.email)
 
             if participant_emails:
@@ -310,24 +327,27 @@ Sistema de Reuniões - Monter Elétrica
                         custom_message=message_body
                     )
                     create_meeting_notifications(new_meeting, 'created', participants_only=True)
-                    print(f"✅ E-mail enviado para a reunião principal e notificações criadas.")
+                    logger.info("E-mail enviado para a reunião principal e notificações criadas", extra={'meeting_id': new_meeting.id})
                 except Exception as e:
-                    print(f"❌ Erro ao enviar e-mails ou criar notificações: {e}")
+                    logger.error(f"Erro ao enviar e-mails ou criar notificações: {e}")
 
         flash("Reunião agendada com sucesso!", "success")
         return redirect(url_for("meetings.dashboard"))
 
-    users = User.query.all()
-    rooms = Room.query.all()
-    return render_template('meetings/create.html', user=user, rooms=rooms, form=form)
+    return render_template('meetings/create.html', user=user, form=form)
 
 
 @meetings_bp.route('/my_meetings')
 @login_required
 def my_meetings():
-    my_meetings = Meeting.query.filter_by(
-        created_by=current_user.id
-    ).order_by(Meeting.created_at.desc(), Meeting.id.desc()).all()
+    start, end = parse_date_range(request.args)
+    if start or end:
+        # Histórico por período: o arquivo só é consultado se o período o alcançar
+        my_meetings = meeting_history(start=start, end=end, created_by=current_user.id)
+    else:
+        my_meetings = Meeting.query.filter_by(
+            created_by=current_user.id
+        ).order_by(Meeting.created_at.desc(), Meeting.id.desc()).all()
 
     current_time = get_brazil_now()
 
@@ -340,14 +360,20 @@ def my_meetings():
     return render_template(
         'meetings/my_meetings.html',
         meetings=my_meetings,
-        current_time=current_time
+        current_time=current_time,
+        filter_start=request.args.get('inicio', ''),
+        filter_end=request.args.get('fim', ''),
+        feed_url=url_for('feeds.user_feed', token=get_feed_token(current_user), _external=True)
     )
 
 
 @meetings_bp.route('/calendar')
 @login_required
+@read_replica
 def calendar():
-    meetings = Meeting.query.order_by(Meeting.start_datetime).all()
+    meetings = Meeting.query.options(
+        joinedload(Meeting.room), joinedload(Meeting.creator)
+    ).order_by(Meeting.start_datetime).all()
     calendar_events = [{
         'id': m.id,
         'title': m.title,
@@ -409,6 +435,7 @@ def edit_meeting(meeting_id):
 
         db.session.add(meeting)
         db.session.commit()
+        reminder_engine.invalidate()
 
         # Lógica para lidar com reuniões recorrentes
         if meeting.is_recurring or meeting.parent_meeting_id:
@@ -436,15 +463,12 @@ def edit_meeting(meeting_id):
                 if recurring_meetings:
                     db.session.add_all(recurring_meetings)
                     db.session.commit()
-                    print(f"✅ Atualizadas {len(recurring_meetings)} reuniões recorrentes.")
+                    logger.info(f"Atualizadas {len(recurring_meetings)} reuniões recorrentes", extra={'meeting_id': meeting.id})
 
         flash("Reunião atualizada com sucesso!", "success")
         return redirect(url_for("meetings.dashboard"))
 
-    users = User.query.all()
-    rooms = Room.query.all()
-    form.participants.data = [user.id for user in meeting.participants_list]
-    return render_template("meetings/edit.html", form=form, meeting=meeting, users=users, rooms=rooms)
+    return render_template("meetings/edit.html", form=form, meeting=meeting)
 
 
 @meetings_bp.route("/cancel_meeting/<int:meeting_id>", methods=["POST"])
@@ -473,7 +497,7 @@ def cancel_meeting(meeting_id):
             ).delete(synchronize_session=False)
             db.session.commit()
             # Deletar a própria reunião pai se for o caso
-            if parent_meeting.id == meeting.id:
+            if parent_meeting.id == meeting_id:
                 db.session.delete(parent_meeting)
                 db.session.commit()
 
@@ -529,6 +553,85 @@ def check_availability():
         return jsonify({'available': False, 'error': str(e)})
 
 
+@meetings_bp.route('/api/suggest_rooms')
+@login_required
+def suggest_rooms_api():
+    """
+    Sugere salas livres no horário, da que melhor comporta o grupo para a maior
+
+    Parâmetros: start_datetime, end_datetime e participants (IDs separados por
+    vírgula; o organizador é somado) ou headcount (número de pessoas).
+    """
+    start_dt = parse_datetime_from_input(request.args.get('start_datetime'))
+    end_dt = parse_datetime_from_input(request.args.get('end_datetime'))
+    if not start_dt or not end_dt or end_dt <= start_dt:
+        return jsonify({'error': 'Informe start_datetime e end_datetime válidos'}), 400
+
+    headcount = request.args.get('headcount', type=int)
+    if headcount is None:
+        participant_ids = {int(value) for value in request.args.get('participants', '').split(',') if value.strip().isdigit()}
+        headcount = len(participant_ids | {current_user.id})
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 20)
+
+    return jsonify({'headcount': headcount, 'rooms': suggest_rooms(start_dt, end_dt, max(headcount, 1), limit=limit)})
+
+
+@meetings_bp.route('/api/batch', methods=['POST'])
+@login_required
+def batch_operations():
+    """
+    Cria, move e cancela várias reuniões numa única transação
+
+    Corpo: {"operations": [{"op": "create"|"move"|"cancel", ...}], "dry_run": false}.
+    Se qualquer operação for inválida ou conflitar, nada é gravado e a resposta
+    traz os erros por operação.
+    """
+    try:
+        operations, dry_run = parse_batch_payload(request.get_json(silent=True))
+    except BatchError as e:
+        return jsonify({'success': False, 'errors': e.errors}), 400
+    try:
+        results = apply_batch(operations, current_user, dry_run=dry_run)
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'errors': e.errors}), 409
+    return jsonify({'success': True, 'dry_run': dry_run, 'results': results})
+
+
+@meetings_bp.route('/api/update_datetime/<int:meeting_id>', methods=['POST'])
+@login_required
+def update_datetime(meeting_id):
+    """Reagenda uma reunião (arrastar e soltar no calendário)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        operations, _ = parse_batch_payload({'operations': [{
+            'op': 'move', 'id': meeting_id,
+            'start_datetime': data.get('start_datetime'), 'end_datetime': data.get('end_datetime'),
+        }]})
+        apply_batch(operations, current_user)
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': e.errors[0]['error']})
+    return jsonify({'success': True})
+
+
+@meetings_bp.route('/api/users/search')
+@login_required
+def search_users_api():
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    if not query:
+        return jsonify({'users': [], 'next_offset': None})
+
+    users, next_offset = search_users(query, limit=limit, offset=offset)
+    return jsonify({
+        'users': [{'id': user_id, 'username': username} for user_id, username in users],
+        'next_offset': next_offset
+    })
+
+
 @meetings_bp.route('/cancel_recurrence/<int:meeting_id>', methods=['POST'])
 @login_required
 def cancel_recurrence(meeting_id):
@@ -551,27 +654,32 @@ def cancel_recurrence(meeting_id):
 
 
 def check_user_availability(user_ids, start_datetime, end_datetime, exclude_meeting_id=None):
-    print(f"🔍 Checando disponibilidade para usuários {user_ids} de {start_datetime} até {end_datetime}")
+    logger.debug("Checando disponibilidade para usuários %s de %s até %s", user_ids, start_datetime, end_datetime)
     conflicting_users = []
-    for user_id in user_ids:
-        user = User.query.get(user_id)
-        if not user:
+    # Só os usuários pedidos, com uma consulta IN: o diretório inteiro não é necessário
+    usernames = dict(get_user_choices_for_ids(list(set(user_ids))))
+    people = [(user_id, usernames[user_id]) for user_id in user_ids if user_id in usernames]
+    # Só quem aparece ocupado no mapa de bits precisa da consulta de sobreposição
+    free = set(availability.free_users(start_datetime, end_datetime, [username for _, username in people]))
+    for user_id, username in people:
+        if username in free:
             continue
 
         query = Meeting.query.filter(
             Meeting.start_datetime < end_datetime,
             Meeting.end_datetime > start_datetime,
-            (Meeting.created_by == user.id) | (Meeting.participants.like(f'%{user.username}%'))
+            (Meeting.created_by == user_id) | (Meeting.participants.like(f'%{username}%'))
         )
         if exclude_meeting_id:
             query = query.filter(Meeting.id != exclude_meeting_id)
 
         conflicts = query.all()
         if conflicts:
-            conflicting_users.append(user.username)
+            conflicting_users.append(username)
             for conflict in conflicts:
-                print(f"⚠️ Conflito para o usuário {user.username} com a reunião {conflict.title} de {conflict.start_datetime} até {conflict.end_datetime}")
+                logger.debug("Conflito para o usuário %s com a reunião %s de %s até %s", username, conflict.title, conflict.start_datetime, conflict.end_datetime)
 
+    CONFLICT_CHECKS.inc(kind='user', result='conflict' if conflicting_users else 'free')
     return len(conflicting_users) == 0, conflicting_users
 
 
@@ -582,15 +690,7 @@ def delete_expired_meetings():
         flash("Você não tem permissão para realizar esta ação.", "danger")
         return redirect(url_for("meetings.dashboard"))
 
-    now_brazil = get_brazil_now()
-    expired_meetings = Meeting.query.filter(Meeting.end_datetime < now_brazil).all()
-    deleted_count = 0
-
-    for meeting in expired_meetings:
-        db.session.delete(meeting)
-        deleted_count += 1
-
-    db.session.commit()
+    deleted_count = purge_expired_meetings(before=get_brazil_now())
     flash(f"{deleted_count} reuniões expiradas foram deletadas com sucesso.", "success")
     return redirect(url_for("meetings.dashboard"))
 
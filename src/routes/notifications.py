@@ -1,23 +1,62 @@
-from flask import Blueprint, render_template, jsonify, request
+import json
+from flask import Blueprint, render_template, jsonify, request, current_app, Response
 from flask_login import login_required, current_user
-from src.utils.notification_utils import get_user_notifications, mark_notification_as_read, get_unread_count
+from src.database import read_replica
+from src.utils.notification_utils import (
+    get_notifications_page,
+    mark_notification_as_read,
+    mark_notifications_as_read,
+    parse_bulk_read_payload,
+    get_unread_count
+)
 
 notifications_bp = Blueprint('notifications', __name__)
 
+def _stream_notifications(notifications, next_cursor, unread_count):
+    """Serializa a página item a item em vez de montar a lista inteira em memória"""
+    yield '{"notifications": ['
+    for index, notification in enumerate(notifications):
+        if index:
+            yield ', '
+        yield json.dumps(notification.to_dict(), ensure_ascii=False)
+    yield f'], "next_cursor": {json.dumps(next_cursor)}, "unread_count": {unread_count}}}'
+
 @notifications_bp.route('/api/notifications')
 @login_required
+@read_replica
 def api_notifications():
-    """API para buscar notificações do usuário"""
-    unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-    limit = int(request.args.get('limit', 10))
-    
-    notifications = get_user_notifications(current_user.id, unread_only=unread_only, limit=limit)
+    """API para buscar notificações do usuário, paginada por cursor"""
+    default_limit = current_app.config.get('NOTIFICATION_PAGE_SIZE', 10)
+    max_limit = current_app.config.get('NOTIFICATION_PAGE_SIZE_MAX', 100)
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        limit = default_limit
+    limit = max(1, min(limit, max_limit))
+
+    is_read = None
+    read = request.args.get('read', '').lower()
+    if read in ('true', 'false'):
+        is_read = read == 'true'
+    if request.args.get('unread_only', 'false').lower() == 'true':
+        is_read = False
+
+    try:
+        notifications, next_cursor = get_notifications_page(
+            current_user.id,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            notification_type=request.args.get('type') or None,
+            is_read=is_read
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     unread_count = get_unread_count(current_user.id)
-    
-    return jsonify({
-        'notifications': [notification.to_dict() for notification in notifications],
-        'unread_count': unread_count
-    })
+    return Response(
+        _stream_notifications(notifications, next_cursor, unread_count),
+        mimetype='application/json'
+    )
 
 @notifications_bp.route('/api/notifications/<int:notification_id>/read', methods=['POST'])
 @login_required
@@ -37,8 +76,34 @@ def mark_as_read(notification_id):
             'error': 'Notificação não encontrada'
         }), 404
 
+@notifications_bp.route('/api/notifications/read', methods=['POST'])
+@login_required
+def mark_many_as_read():
+    """API para marcar várias notificações como lidas (por IDs ou até uma data)"""
+    ids, before, error = parse_bulk_read_payload(request.get_json(silent=True))
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+
+    result = mark_notifications_as_read(current_user.id, notification_ids=ids, before=before)
+    if result is None:
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao marcar notificações como lidas'
+        }), 500
+
+    updated, unread_count = result
+    return jsonify({
+        'success': True,
+        'updated': updated,
+        'unread_count': unread_count
+    })
+
 @notifications_bp.route('/api/notifications/unread-count')
 @login_required
+@read_replica
 def api_unread_count():
     """API para buscar contagem de notificações não lidas"""
     unread_count = get_unread_count(current_user.id)
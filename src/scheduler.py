@@ -0,0 +1,246 @@
+"""
+Agendador de tarefas periódicas - AgendaMonter
+
+Roda em uma thread daemon dentro de cada worker do gunicorn. Antes de executar
+uma tarefa, o worker reserva a linha correspondente em scheduler_jobs com um
+UPDATE condicional; assim cada tarefa roda em apenas um worker por intervalo,
+tanto no SQLite quanto no PostgreSQL.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import update, insert, or_, and_
+from sqlalchemy.exc import IntegrityError
+from src.database import db
+from src.models.scheduler import SchedulerJob
+from src.utils.maintenance_utils import (
+    archive_expired_meetings,
+    compact_notifications,
+    parse_retention_map,
+    purge_expired_meetings,
+    prune_meeting_changes,
+    prune_read_notifications,
+    prune_rate_limit_counters,
+    refresh_statistics_rollup
+)
+from src.utils.reminder_utils import reminder_engine
+from src.utils.timezone_utils import get_brazil_now
+import logging
+import os
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# nome -> (função, chave de configuração do intervalo em segundos, intervalo padrão)
+JOBS = {}
+
+_thread = None
+_stop_event = threading.Event()
+
+
+def _owner():
+    # Calculado a cada uso: com preload_app o módulo é importado no master, antes do fork
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def register_job(name, interval_key, default_interval):
+    """
+    Registra uma função como tarefa periódica
+
+    Args:
+        name (str): Nome único da tarefa
+        interval_key (str): Chave de configuração com o intervalo em segundos
+        default_interval (int): Intervalo usado se a chave não existir
+    """
+    def decorator(f):
+        JOBS[name] = (f, interval_key, default_interval)
+        return f
+    return decorator
+
+
+def acquire_job(name, interval, lease):
+    """
+    Reserva uma tarefa para este worker se ela estiver vencida e livre
+
+    O início da execução fica em last_run_at: o intervalo conta de início a
+    início, sem somar a duração da tarefa nem o tick do agendador.
+
+    Args:
+        name (str): Nome da tarefa
+        interval (int): Intervalo mínimo entre execuções, em segundos
+        lease (int): Tempo máximo de posse da trava, em segundos
+
+    Returns:
+        bool: True se este worker deve executar a tarefa agora
+    """
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        result = conn.execute(
+            update(SchedulerJob).where(
+                SchedulerJob.name == name,
+                or_(SchedulerJob.locked_until == None, SchedulerJob.locked_until < now),
+                or_(SchedulerJob.last_run_at == None, SchedulerJob.last_run_at <= now - timedelta(seconds=interval))
+            ).values(owner=_owner(), locked_until=now + timedelta(seconds=lease), last_run_at=now)
+        )
+        if result.rowcount:
+            return True
+
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(SchedulerJob).values(
+                    name=name, owner=_owner(), locked_until=now + timedelta(seconds=lease), last_run_at=now
+                ))
+            return True
+        except IntegrityError:
+            # Já existe: está travada por outro worker ou ainda não venceu
+            return False
+
+
+def release_job(name, result):
+    """Libera a trava e registra o resultado da execução"""
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(SchedulerJob).where(
+                and_(SchedulerJob.name == name, SchedulerJob.owner == _owner())
+            ).values(locked_until=None, last_result=str(result)[:500])
+        )
+
+
+def run_pending(app):
+    """
+    Executa, no contexto da aplicação, todas as tarefas vencidas
+
+    Args:
+        app: Aplicação Flask
+
+    Returns:
+        dict: Resultado de cada tarefa executada por este worker
+    """
+    results = {}
+    with app.app_context():
+        lease = app.config.get('SCHEDULER_LOCK_TIMEOUT', 900)
+        for name, (job, interval_key, default_interval) in JOBS.items():
+            interval = app.config.get(interval_key, default_interval)
+            if not interval:
+                continue
+            try:
+                if not acquire_job(name, interval, lease):
+                    continue
+            except Exception as e:
+                logger.error(f"Erro ao reservar tarefa {name}: {str(e)}")
+                continue
+
+            started = time.perf_counter()
+            try:
+                result = job(app)
+                logger.info(f"Tarefa {name} concluída em {time.perf_counter() - started:.2f}s: {result}")
+            except Exception as e:
+                db.session.rollback()
+                result = f"erro: {str(e)}"
+                logger.error(f"Erro na tarefa {name}: {str(e)}")
+            finally:
+                db.session.remove()
+
+            try:
+                release_job(name, result)
+            except Exception as e:
+                logger.error(f"Erro ao liberar tarefa {name}: {str(e)}")
+            results[name] = result
+    return results
+
+
+def _loop(app):
+    tick = app.config.get('SCHEDULER_TICK', 60)
+    while not _stop_event.wait(tick):
+        try:
+            run_pending(app)
+        except Exception as e:
+            logger.error(f"Erro no agendador: {str(e)}")
+
+
+def start_scheduler(app=None):
+    """
+    Inicia a thread do agendador (uma vez por processo)
+
+    Args:
+        app (optional): Aplicação Flask; usa current_app se omitida
+    """
+    global _thread
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+
+    if _thread is not None and _thread.is_alive():
+        return _thread
+
+    _stop_event.clear()
+    _thread = threading.Thread(target=_loop, args=(app,), name='agendamonter-scheduler', daemon=True)
+    _thread.start()
+    logger.info(f"Agendador iniciado ({_owner()}) com tarefas: {', '.join(JOBS)}")
+    return _thread
+
+
+def stop_scheduler():
+    """Sinaliza a thread do agendador para encerrar"""
+    _stop_event.set()
+
+
+# =============================================
+# TAREFAS
+# =============================================
+@register_job('expire_meetings', 'EXPIRED_MEETINGS_INTERVAL', 3600)
+def expire_meetings_job(app):
+    cutoff = get_brazil_now() - timedelta(days=app.config.get('EXPIRED_MEETINGS_RETENTION_DAYS', 30))
+    expire = purge_expired_meetings
+    if app.config.get('EXPIRED_MEETINGS_ACTION', 'archive') == 'archive':
+        expire = archive_expired_meetings
+    return expire(
+        before=cutoff,
+        batch_size=app.config.get('SCHEDULER_BATCH_SIZE', 500),
+        max_batches=app.config.get('SCHEDULER_MAX_BATCHES', 20)
+    )
+
+
+@register_job('prune_notifications', 'NOTIFICATION_PRUNE_INTERVAL', 86400)
+def prune_notifications_job(app):
+    batch_size = app.config.get('SCHEDULER_BATCH_SIZE', 500)
+    compact_types = [t.strip() for t in app.config.get('NOTIFICATION_COMPACT_TYPES', '').split(',') if t.strip()]
+    older_than_days = app.config.get('NOTIFICATION_RETENTION_DAYS', 90)
+    retention_by_type = parse_retention_map(app.config.get('NOTIFICATION_RETENTION_BY_TYPE'))
+    compacted = compact_notifications(
+        compact_types,
+        batch_size=batch_size,
+        older_than_days=older_than_days,
+        retention_by_type=retention_by_type
+    )
+    pruned = prune_read_notifications(
+        older_than_days=older_than_days,
+        batch_size=batch_size,
+        retention_by_type=retention_by_type
+    )
+    return {'compacted': compacted, 'pruned': pruned}
+
+
+@register_job('refresh_statistics_rollup', 'STATISTICS_ROLLUP_INTERVAL', 900)
+def refresh_statistics_rollup_job(app):
+    return refresh_statistics_rollup()
+
+
+@register_job('prune_rate_limit_counters', 'RATE_LIMIT_PRUNE_INTERVAL', 3600)
+def prune_rate_limit_counters_job(app):
+    return prune_rate_limit_counters()
+
+
+@register_job('prune_meeting_changes', 'MEETING_CHANGES_PRUNE_INTERVAL', 86400)
+def prune_meeting_changes_job(app):
+    return prune_meeting_changes(app.config.get('ICS_CHANGE_RETENTION_DAYS', 30))
+
+
+@register_job('send_reminders', 'REMINDER_INTERVAL', 60)
+def send_reminders_job(app):
+    return reminder_engine.run(
+        lead_minutes=app.config.get('REMINDER_LEAD_MINUTES', 15),
+        window_minutes=app.config.get('REMINDER_WINDOW_MINUTES', 60),
+        reload_seconds=app.config.get('REMINDER_RELOAD_SECONDS', 300),
+        batch_size=app.config.get('REMINDER_BATCH_SIZE', 50)
+    )
@@ -0,0 +1,200 @@
+"""
+Utilitários da API JSON versionada (/api/v1) - AgendaMonter
+
+Cada recurso declara os campos que pode devolver: a expressão SQL de cada um
+e, se for o caso, o relacionamento que precisa de JOIN. A consulta seleciona
+apenas as colunas pedidas em ?fields= e faz só os JOINs que esses campos
+exigem; as linhas saem do banco como tuplas, sem montar objetos do ORM nem
+disparar carregamentos preguiçosos.
+"""
+from datetime import datetime
+from sqlalchemy import select, and_, or_
+from sqlalchemy.orm import aliased
+from src.models.meeting import Meeting
+from src.models.user import User, Room
+from src.utils.timezone_utils import to_brazil_timezone, ensure_timezone_aware
+import base64
+import json
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, usa o json da biblioteca padrão
+    orjson = None
+
+
+def dumps(data):
+    """
+    Serializa para JSON (bytes), com orjson quando instalado
+
+    Datetimes saem em ISO 8601 com o fuso de Brasília.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} não é serializável')
+
+
+def _brazil(dt):
+    return to_brazil_timezone(ensure_timezone_aware(dt)) if dt else None
+
+
+def _from_utc(dt):
+    # created_at é gravado pelo banco/utcnow: sem timezone, está em UTC
+    return to_brazil_timezone(dt)
+
+
+def _participants(value):
+    return [p.strip() for p in value.split(',') if p.strip()] if value else []
+
+
+class Field:
+    """Campo exposto pela API: expressão SQL, JOIN necessário e conversão do valor"""
+
+    def __init__(self, column, join=None, convert=None, admin_only=False):
+        self.column = column
+        self.join = join
+        self.convert = convert
+        self.admin_only = admin_only
+
+
+_MeetingRoom = aliased(Room, name='meeting_room')
+_MeetingCreator = aliased(User, name='meeting_creator')
+
+MEETING_JOINS = {
+    'room': (_MeetingRoom, _MeetingRoom.id == Meeting.room_id),
+    'creator': (_MeetingCreator, _MeetingCreator.id == Meeting.created_by),
+}
+MEETING_FIELDS = {
+    'id': Field(Meeting.id),
+    'title': Field(Meeting.title),
+    'description': Field(Meeting.description),
+    'start_datetime': Field(Meeting.start_datetime, convert=_brazil),
+    'end_datetime': Field(Meeting.end_datetime, convert=_brazil),
+    'room_id': Field(Meeting.room_id),
+    'room_name': Field(_MeetingRoom.name, join='room'),
+    'created_by': Field(Meeting.created_by),
+    'creator_name': Field(_MeetingCreator.username, join='creator'),
+    'participants': Field(Meeting.participants, convert=_participants),
+    'is_recurring': Field(Meeting.is_recurring),
+    'recurrence_type': Field(Meeting.recurrence_type),
+    'recurrence_end': Field(Meeting.recurrence_end, convert=_brazil),
+    'parent_meeting_id': Field(Meeting.parent_meeting_id),
+    'created_at': Field(Meeting.created_at, convert=_from_utc),
+}
+MEETING_DEFAULT_FIELDS = ('id', 'title', 'start_datetime', 'end_datetime', 'room_id', 'room_name')
+
+ROOM_FIELDS = {
+    'id': Field(Room.id),
+    'name': Field(Room.name),
+    'description': Field(Room.description),
+    'capacity': Field(Room.capacity),
+    'is_active': Field(Room.is_active),
+}
+ROOM_DEFAULT_FIELDS = ('id', 'name', 'capacity')
+
+USER_FIELDS = {
+    'id': Field(User.id),
+    'username': Field(User.username),
+    'email': Field(User.email, admin_only=True),
+    'is_admin': Field(User.is_admin, admin_only=True),
+    'created_at': Field(User.created_at, convert=_from_utc, admin_only=True),
+}
+USER_DEFAULT_FIELDS = ('id', 'username')
+
+
+def parse_fields(raw, available, default, is_admin=False):
+    """
+    Interpreta ?fields=a,b,c
+
+    Args:
+        raw (str ou None): Valor do parâmetro
+        available (dict): Campos do recurso
+        default (tuple): Campos usados quando o parâmetro não vem
+        is_admin (bool): Se o usuário pode pedir campos restritos
+
+    Returns:
+        list: Nomes dos campos, sem repetição, na ordem pedida
+
+    Raises:
+        ValueError: Campo desconhecido ou restrito
+    """
+    if not raw:
+        names = list(default)
+    else:
+        names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f'Campos desconhecidos: {", ".join(unknown)}')
+    if not is_admin:
+        restricted = [name for name in names if available[name].admin_only]
+        if restricted:
+            raise ValueError(f'Campos restritos a administradores: {", ".join(restricted)}')
+    return names or list(default)
+
+
+def build_select(fields, names, base, joins=None, extra=()):
+    """
+    Monta o SELECT com apenas as colunas e os JOINs exigidos pelos campos
+
+    Args:
+        fields (dict): Campos do recurso
+        names (list): Campos pedidos
+        base: Modelo principal (FROM)
+        joins (dict, optional): Nome do JOIN -> (alvo, condição)
+        extra (tuple): Colunas adicionais usadas internamente (ex.: paginação)
+
+    Returns:
+        Select
+    """
+    statement = select(*(fields[name].column.label(name) for name in names), *extra).select_from(base)
+    for join in dict.fromkeys(fields[name].join for name in names if fields[name].join):
+        target, condition = joins[join]
+        statement = statement.outerjoin(target, condition)
+    return statement
+
+
+def serialize_rows(fields, names, rows):
+    """Converte as tuplas do banco em dicionários só com os campos pedidos"""
+    converters = [(index, name, fields[name].convert) for index, name in enumerate(names)]
+    return [
+        {name: convert(row[index]) if convert else row[index] for index, name, convert in converters}
+        for row in rows
+    ]
+
+
+def encode_cursor(start_datetime, meeting_id):
+    """Cursor opaco (início e id codificados em base64) que aponta para depois de uma reunião"""
+    raw = f"{start_datetime.isoformat()}|{meeting_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor
+
+    Returns:
+        tuple: (start_datetime, id)
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        start, meeting_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start), int(meeting_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def meetings_after(statement, cursor):
+    """Aplica o keyset (start_datetime, id) > cursor ao SELECT de reuniões"""
+    start, meeting_id = decode_cursor(cursor)
+    return statement.where(or_(
+        Meeting.start_datetime > start,
+        and_(Meeting.start_datetime == start, Meeting.id > meeting_id)
+    ))
@@ -0,0 +1,387 @@
+"""
+Disponibilidade de salas e pessoas por mapa de bits diário - AgendaMonter
+
+Cada dia é dividido em faixas de AVAILABILITY_SLOT_MINUTES minutos (15 por
+padrão) e a ocupação de uma sala ou pessoa no dia vira uma sequência de
+bits: o bit i indica que a faixa i tem reunião. "A sala está livre entre 9h
+e 10h?" passa a ser um AND com a máscara do intervalo, e "todos estão livres
+às 14h?" um OR das ocupações (o AND dos horários livres). Um dia inteiro
+(salas e pessoas) é montado com uma consulta e guardado em bytes: 12 bytes
+por sala ou pessoa ocupada no dia, com faixas de 15 minutos.
+
+A validade do cache vem de meeting_changes: toda gravação em reuniões (ORM,
+inserções e exclusões em lote) registra a sala, o criador e os
+participantes afetados, e antes de responder o cache lê as alterações novas
+e marca só essas salas e pessoas para recarga. Isso mantém os workers do
+gunicorn coerentes entre si. Na própria sessão, gravações em reuniões
+forçam uma nova leitura na consulta seguinte e um rollback descarta o cache.
+
+Uma faixa é marcada como ocupada se qualquer parte dela tiver reunião, então
+"livre" é sempre exato e "ocupado" pode ser só arredondamento: quem precisa
+da lista de conflitos confirma com a consulta de sobreposição.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta, time
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from src.database import db, use_primary
+from src.models.calendar_change import MeetingChange
+from src.models.meeting import Meeting
+from src.utils.cache_utils import get_room_capacities, get_room_choices, get_user_choices
+from src.utils.timezone_utils import BRAZIL_TZ, to_brazil_timezone, ensure_timezone_aware
+import logging
+import threading
+
+DEFAULT_SLOT_MINUTES = 15
+# Dias mantidos em cache (LRU)
+MAX_CACHED_DAYS = 400
+# Alterações gravadas há até esse tempo são relidas, para pegar transações que
+# obtiveram o id antes de outra mas fizeram commit depois
+CHANGE_LOOKBACK = timedelta(seconds=120)
+
+ROOMS = 'rooms'
+USERS = 'users'
+
+
+def _local(dt):
+    return to_brazil_timezone(ensure_timezone_aware(dt)).replace(tzinfo=None)
+
+
+def _split(participants):
+    return {p.strip() for p in participants.split(',') if p.strip()} if participants else set()
+
+
+def slot_mask(start, end, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """
+    Máscara das faixas tocadas por [start, end) dentro de um mesmo dia
+
+    Args:
+        start (datetime): Início, horário local sem timezone
+        end (datetime): Fim, horário local sem timezone (pode ser meia-noite do dia seguinte)
+        slot_minutes (int): Tamanho da faixa em minutos
+
+    Returns:
+        int: Bits das faixas ocupadas
+    """
+    day_start = datetime.combine(start.date(), time.min)
+    first = int((start - day_start).total_seconds() // 60) // slot_minutes
+    end_minutes = (end - day_start).total_seconds() / 60
+    last = min(-int(-end_minutes // slot_minutes), 24 * 60 // slot_minutes)  # arredonda para cima
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def split_by_day(start, end):
+    """Divide [start, end) (horário local) em pedaços que não atravessam a meia-noite"""
+    while start < end:
+        midnight = datetime.combine(start.date() + timedelta(days=1), time.min)
+        piece_end = min(end, midnight)
+        yield start.date(), start, piece_end
+        start = piece_end
+
+
+class DayBitmaps:
+    """
+    Ocupação de um dia: para cada índice (salas, pessoas), as máscaras de quem
+    tem reunião, lado a lado em um único bytes
+
+    Quem não aparece no índice está livre o dia todo.
+    """
+    __slots__ = ('width', 'rows', 'data')
+
+    def __init__(self, masks, width):
+        self.width = width
+        self.rows = {}
+        self.data = {}
+        for kind, entity_masks in masks.items():
+            rows = {}
+            chunks = []
+            for row, (key, mask) in enumerate(entity_masks.items()):
+                rows[key] = row
+                chunks.append(mask.to_bytes(width, 'little'))
+            self.rows[kind] = rows
+            self.data[kind] = b''.join(chunks)
+
+    def mask(self, kind, key):
+        row = self.rows[kind].get(key)
+        if row is None:
+            return 0
+        offset = row * self.width
+        return int.from_bytes(self.data[kind][offset:offset + self.width], 'little')
+
+    def busy(self, kind, keys):
+        """OR das máscaras (equivale ao AND dos horários livres)"""
+        combined = 0
+        for key in keys:
+            combined |= self.mask(kind, key)
+        return combined
+
+    def nbytes(self):
+        return sum(len(data) for data in self.data.values())
+
+
+class AvailabilityCache:
+    """Cache dos mapas de bits diários de salas e pessoas"""
+
+    def __init__(self, max_days=MAX_CACHED_DAYS):
+        self.max_days = max_days
+        self.slot_minutes = DEFAULT_SLOT_MINUTES
+        self._days = OrderedDict()  # dia -> DayBitmaps
+        self._stale = {}  # dia -> {ROOMS: salas, USERS: pessoas} a recarregar
+        self._synced_at = None
+        self._seen_changes = {}  # id -> changed_at, dentro de CHANGE_LOOKBACK
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'loads': 0, 'reloads': 0}
+
+    @property
+    def slots_per_day(self):
+        return 24 * 60 // self.slot_minutes
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+            self._stale.clear()
+            self._seen_changes.clear()
+            self._synced_at = None
+
+    def memory_bytes(self):
+        """Bytes ocupados pelos mapas de bits em cache (sem contar os índices)"""
+        with self._lock:
+            return sum(day.nbytes() for day in self._days.values())
+
+    def _configure(self):
+        minutes = current_app.config.get('AVAILABILITY_SLOT_MINUTES', DEFAULT_SLOT_MINUTES)
+        if minutes <= 0 or (24 * 60) % minutes:
+            logging.warning(f"AVAILABILITY_SLOT_MINUTES={minutes} não divide o dia; usando {DEFAULT_SLOT_MINUTES}")
+            minutes = DEFAULT_SLOT_MINUTES
+        if minutes != self.slot_minutes:
+            self.clear()
+            self.slot_minutes = minutes
+
+    def _sync(self):
+        """Marca para recarga o que mudou desde a última verificação (uma vez por requisição)"""
+        # Como o autoflush das consultas: reuniões pendentes na sessão precisam entrar na resposta
+        session = db.session
+        if any(isinstance(obj, Meeting) for obj in (*session.new, *session.dirty, *session.deleted)):
+            session.flush()
+        if has_request_context():
+            if g.get('_availability_synced'):
+                return
+            g._availability_synced = True
+        self._configure()
+
+        now = datetime.utcnow()
+        if self._synced_at is None:
+            with self._lock:
+                self._days.clear()
+                self._stale.clear()
+                self._synced_at = now
+            return
+
+        with use_primary():
+            rows = db.session.execute(select(
+                MeetingChange.id, MeetingChange.changed_at, MeetingChange.room_id,
+                MeetingChange.previous_room_id, MeetingChange.created_by, MeetingChange.participants
+            ).where(MeetingChange.changed_at >= self._synced_at - CHANGE_LOOKBACK)).all()
+        new = [row for row in rows if row.id not in self._seen_changes]
+        usernames = dict(get_user_choices()) if new else {}
+        rooms, people = set(), set()
+        for row in new:
+            rooms.update(room for room in (row.room_id, row.previous_room_id) if room is not None)
+            people.update(_split(row.participants))
+            people.add(usernames.get(row.created_by))
+        people.discard(None)
+
+        with self._lock:
+            if new:
+                for day in self._days:
+                    stale = self._stale.setdefault(day, {ROOMS: set(), USERS: set()})
+                    stale[ROOMS].update(rooms)
+                    stale[USERS].update(people)
+            cutoff = now - CHANGE_LOOKBACK
+            self._seen_changes = {
+                change_id: changed_at
+                for change_id, changed_at in {**self._seen_changes, **{row.id: row.changed_at for row in new}}.items()
+                if changed_at >= cutoff
+            }
+            self._synced_at = now
+
+    def _load(self, day):
+        day_start = BRAZIL_TZ.localize(datetime.combine(day, time.min))
+        day_end = day_start + timedelta(days=1)
+        # Os mapas ficam para as próximas requisições: não podem vir de uma réplica atrasada
+        with use_primary():
+            rows = db.session.execute(
+                select(Meeting.room_id, Meeting.created_by, Meeting.participants,
+                       Meeting.start_datetime, Meeting.end_datetime)
+                .where(Meeting.start_datetime < day_end, Meeting.end_datetime > day_start)
+            ).all()
+
+        usernames = dict(get_user_choices())
+        masks = {ROOMS: {}, USERS: {}}
+        for room_id, created_by, participants, start, end in rows:
+            mask = 0
+            for piece_day, piece_start, piece_end in split_by_day(_local(start), _local(end)):
+                if piece_day == day:
+                    mask |= slot_mask(piece_start, piece_end, self.slot_minutes)
+            if not mask:
+                continue
+            masks[ROOMS][room_id] = masks[ROOMS].get(room_id, 0) | mask
+            people = _split(participants)
+            people.add(usernames.get(created_by))
+            people.discard(None)
+            for person in people:
+                masks[USERS][person] = masks[USERS].get(person, 0) | mask
+        return DayBitmaps(masks, (self.slots_per_day + 7) // 8)
+
+    def day(self, day, kind=None, keys=None):
+        """
+        Mapas de bits de um dia
+
+        Args:
+            day (date): Dia (horário local)
+            kind (str, optional): Índice consultado (ROOMS ou USERS)
+            keys (iterable, optional): Salas ou pessoas consultadas; o dia só é
+                recarregado se alguma delas mudou (padrão: qualquer uma)
+
+        Returns:
+            DayBitmaps
+        """
+        self._sync()
+        with self._lock:
+            bitmaps = self._days.get(day)
+            stale = self._stale.get(day)
+            stale = {ROOMS: set(stale[ROOMS]), USERS: set(stale[USERS])} if stale else None
+            if bitmaps is not None:
+                self._days.move_to_end(day)
+        if bitmaps is not None:
+            if not stale:
+                fresh = True
+            elif kind is None:
+                fresh = not (stale[ROOMS] or stale[USERS])
+            else:
+                fresh = stale[kind].isdisjoint(keys) if keys is not None else not stale[kind]
+            if fresh:
+                self.stats['hits'] += 1
+                return bitmaps
+
+        self.stats['loads' if bitmaps is None else 'reloads'] += 1
+        bitmaps = self._load(day)
+        with self._lock:
+            # Só dá como atualizado o que foi visto antes da leitura (outra alteração pode ter chegado no meio)
+            current = self._stale.get(day)
+            if current and stale:
+                current[ROOMS] -= stale[ROOMS]
+                current[USERS] -= stale[USERS]
+            if not current or not (current[ROOMS] or current[USERS]):
+                self._stale.pop(day, None)
+            self._days[day] = bitmaps
+            self._days.move_to_end(day)
+            while len(self._days) > self.max_days:
+                evicted, _ = self._days.popitem(last=False)
+                self._stale.pop(evicted, None)
+        return bitmaps
+
+    def busy_mask(self, kind, keys, day):
+        """Faixas do dia em que ao menos uma das salas ou pessoas tem reunião"""
+        keys = list(keys)
+        return self.day(day, kind, keys).busy(kind, keys)
+
+    def free(self, kind, keys, start, end):
+        """
+        Filtra as salas ou pessoas sem reunião em nenhuma faixa de [start, end)
+
+        Args:
+            kind (str): ROOMS (IDs de sala) ou USERS (nomes de usuário)
+            keys (iterable): Salas ou pessoas consideradas
+            start (datetime): Início (qualquer timezone)
+            end (datetime): Fim
+
+        Returns:
+            list: As livres, na ordem recebida
+        """
+        free = list(keys)
+        for day, piece_start, piece_end in split_by_day(_local(start), _local(end)):
+            if not free:
+                break
+            bitmaps = self.day(day, kind, free)
+            wanted = slot_mask(piece_start, piece_end, self.slot_minutes)
+            free = [key for key in free if not bitmaps.mask(kind, key) & wanted]
+        return free
+
+    def free_rooms(self, start, end, room_ids):
+        return self.free(ROOMS, room_ids, start, end)
+
+    def free_users(self, start, end, usernames):
+        return self.free(USERS, usernames, start, end)
+
+
+availability = AvailabilityCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _meetings_flushed(session, flush_context):
+    if any(isinstance(obj, Meeting) for obj in (*session.new, *session.dirty, *session.deleted)):
+        _local_write(session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _meetings_bulk_written(orm_execute_state):
+    # INSERT/UPDATE/DELETE em lote não passam pelo flush
+    if not orm_execute_state.is_select and orm_execute_state.bind_mapper is inspect(Meeting):
+        _local_write(orm_execute_state.session)
+
+
+def _local_write(session):
+    """Gravação nesta sessão: a próxima consulta relê meeting_changes"""
+    session.info['availability_dirty'] = True
+    if has_request_context():
+        g.pop('_availability_synced', None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _meetings_committed(session):
+    session.info.pop('availability_dirty', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _meetings_rolled_back(session):
+    # O cache pode ter lido reuniões que não chegaram a ser gravadas
+    if session.info.pop('availability_dirty', None):
+        availability.clear()
+
+
+def suggest_rooms(start, end, headcount, limit=5):
+    """
+    Salas livres no intervalo, da que melhor comporta o grupo para a maior
+
+    Salas livres pequenas demais vêm no fim, marcadas com fits=False, para o
+    formulário poder explicar por que não foram sugeridas.
+
+    Args:
+        start (datetime): Início
+        end (datetime): Fim
+        headcount (int): Número de pessoas (participantes e organizador)
+        limit (int): Máximo de salas adequadas devolvidas
+
+    Returns:
+        list: Dicionários com id, name, capacity e fits
+    """
+    rooms = dict(get_room_choices())
+    capacities = get_room_capacities()
+    free = availability.free_rooms(start, end, rooms)
+
+    fitting = sorted(
+        (room_id for room_id in free if (capacities.get(room_id) or 0) >= headcount),
+        key=lambda room_id: ((capacities.get(room_id) or 0) - headcount, rooms[room_id])
+    )[:limit]
+    too_small = sorted(
+        (room_id for room_id in free if (capacities.get(room_id) or 0) < headcount),
+        key=lambda room_id: -(capacities.get(room_id) or 0)
+    )
+    return [
+        {'id': room_id, 'name': rooms[room_id], 'capacity': capacities.get(room_id), 'fits': room_id in fitting}
+        for room_id in fitting + too_small
+    ]
@@ -0,0 +1,367 @@
+"""
+Operações em lote sobre reuniões (criar, mover, cancelar) - AgendaMonter
+
+Todas as operações de um lote são validadas juntas contra um único retrato
+em memória das reuniões do período afetado: uma consulta carrega as
+reuniões, que são indexadas por sala e por usuário (criador e
+participantes). Cada operação aceita entra no retrato, então duas
+operações do mesmo lote também conflitam entre si. Se qualquer operação
+falhar, nada é gravado; caso contrário tudo vai num único commit e cada
+destinatário recebe um só e-mail com o resumo das mudanças.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert
+from src.database import db
+from src.models.meeting import Meeting
+from src.models.notification import Notification
+from src.models.user import User
+from src.utils.cache_utils import get_room_capacities, get_room_choices, get_user_choices
+from src.utils.email_utils import send_bulk_emails
+from src.utils.metrics_utils import CONFLICT_CHECKS, NOTIFICATIONS_CREATED
+from src.utils.reminder_utils import reminder_engine
+from src.utils.timezone_utils import BRAZIL_TZ, get_brazil_now, to_brazil_timezone, ensure_timezone_aware
+import logging
+
+# Máximo de operações aceitas em uma única requisição
+MAX_BATCH_OPERATIONS = 500
+BATCH_ACTIONS = ('create', 'move', 'cancel')
+
+
+class BatchError(ValueError):
+    """Lote rejeitado; `errors` lista {'index', 'error'} por operação"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f"#{e['index']}: {e['error']}" for e in errors))
+        self.errors = errors
+
+
+def parse_datetime_value(value):
+    """
+    Interpreta um datetime ISO 8601 vindo do cliente
+
+    Aceita o sufixo 'Z' (toISOString do JavaScript); sem fuso, assume o horário do Brasil.
+
+    Raises:
+        ValueError: Se o valor não for um datetime válido
+    """
+    if not isinstance(value, str) or not value:
+        raise ValueError('data/hora ausente')
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return to_brazil_timezone(parsed) if parsed.tzinfo else BRAZIL_TZ.localize(parsed)
+
+
+def _local(dt):
+    """Datetime no horário do Brasil sem timezone, para comparar com o que vem do banco"""
+    return to_brazil_timezone(ensure_timezone_aware(dt)).replace(tzinfo=None)
+
+
+def parse_batch_payload(data):
+    """
+    Valida o formato do corpo JSON: {"operations": [...], "dry_run": false}
+
+    Returns:
+        tuple: (lista de operações normalizadas, dry_run)
+
+    Raises:
+        BatchError: Se alguma operação estiver malformada
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        raise BatchError([{'index': None, 'error': 'Envie {"operations": [...]}'}])
+    raw_operations = data['operations']
+    if not raw_operations:
+        raise BatchError([{'index': None, 'error': 'Nenhuma operação informada'}])
+    if len(raw_operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError([{'index': None, 'error': f'Máximo de {MAX_BATCH_OPERATIONS} operações por lote'}])
+
+    operations, errors = [], []
+    for index, raw in enumerate(raw_operations):
+        try:
+            if not isinstance(raw, dict) or raw.get('op') not in BATCH_ACTIONS:
+                raise ValueError(f'"op" deve ser um de: {", ".join(BATCH_ACTIONS)}')
+            operation = {'index': index, 'op': raw['op']}
+            if raw['op'] in ('move', 'cancel'):
+                operation['id'] = int(raw['id'])
+            if raw['op'] in ('create', 'move'):
+                operation['start'] = parse_datetime_value(raw.get('start_datetime'))
+                operation['end'] = parse_datetime_value(raw.get('end_datetime'))
+                if raw.get('room_id') is not None:
+                    operation['room_id'] = int(raw['room_id'])
+            if raw['op'] == 'create':
+                title = (raw.get('title') or '').strip()
+                if not title:
+                    raise ValueError('título obrigatório')
+                if 'room_id' not in operation:
+                    raise ValueError('room_id obrigatório')
+                operation['title'] = title[:80]
+                operation['description'] = raw.get('description')
+                operation['participants'] = [int(user_id) for user_id in raw.get('participants') or []]
+            operations.append(operation)
+        except (KeyError, TypeError, ValueError) as e:
+            message = 'id obrigatório' if isinstance(e, KeyError) else str(e)
+            errors.append({'index': index, 'error': message})
+    if errors:
+        raise BatchError(errors)
+    return operations, bool(data.get('dry_run'))
+
+
+class BusySnapshot:
+    """Intervalos ocupados por sala e por usuário no período do lote (também usado pela importação)"""
+
+    def __init__(self, start, end, usernames):
+        self.rooms = defaultdict(list)
+        self.users = defaultdict(list)
+        rows = db.session.query(
+            Meeting.id, Meeting.room_id, Meeting.start_datetime, Meeting.end_datetime,
+            Meeting.created_by, Meeting.participants
+        ).filter(Meeting.start_datetime < end, Meeting.end_datetime > start).all()
+        for meeting_id, room_id, meeting_start, meeting_end, created_by, participants in rows:
+            people = {usernames.get(created_by)} | _split(participants)
+            self.add(meeting_id, room_id, _local(meeting_start), _local(meeting_end), people)
+
+    def add(self, meeting_id, room_id, start, end, people):
+        insort(self.rooms[room_id], (start, end, meeting_id))
+        for person in people:
+            if person:
+                insort(self.users[person], (start, end, meeting_id))
+
+    def remove(self, meeting_ids):
+        for intervals in (*self.rooms.values(), *self.users.values()):
+            intervals[:] = [interval for interval in intervals if interval[2] not in meeting_ids]
+
+    @staticmethod
+    def _overlaps(intervals, start, end):
+        # Só os intervalos que começam antes do fim podem sobrepor
+        limit = bisect_left(intervals, (end,))
+        return [interval for interval in intervals[:limit] if interval[1] > start]
+
+    def room_conflicts(self, room_id, start, end):
+        return self._overlaps(self.rooms.get(room_id, []), start, end)
+
+    def busy_people(self, people, start, end):
+        return sorted(person for person in people if self._overlaps(self.users.get(person, []), start, end))
+
+
+def _split(participants):
+    return {p.strip() for p in participants.split(',') if p.strip()} if participants else set()
+
+
+def apply_batch(operations, user, dry_run=False, notify=True):
+    """
+    Valida e aplica um lote de operações em uma única transação
+
+    Args:
+        operations (list): Saída de parse_batch_payload
+        user (User): Usuário que executa o lote
+        dry_run (bool): Apenas valida, sem gravar
+        notify (bool): Envia o resumo por e-mail e cria as notificações
+
+    Returns:
+        list: Resultado por operação ({'index', 'op', 'id'})
+
+    Raises:
+        BatchError: Se qualquer operação for inválida ou conflitar; nada é gravado
+    """
+    usernames = dict(get_user_choices())
+    ids_by_name = {name: user_id for user_id, name in usernames.items()}
+    active_rooms = dict(get_room_choices())
+    capacities = get_room_capacities()
+
+    # Reuniões alvo de move/cancel em uma consulta
+    target_ids = {op['id'] for op in operations if op['op'] != 'create'}
+    targets = {m.id: m for m in Meeting.query.filter(Meeting.id.in_(target_ids)).all()} if target_ids else {}
+    # Excluir a reunião-pai apagaria a série inteira (cascade em child_meetings)
+    series_parents = {
+        parent_id for (parent_id,) in db.session.query(Meeting.parent_meeting_id)
+        .filter(Meeting.parent_meeting_id.in_(target_ids)).distinct()
+    } if target_ids else set()
+
+    errors = []
+    def fail(operation, message):
+        errors.append({'index': operation['index'], 'error': message})
+
+    for operation in operations:
+        if operation['op'] != 'create':
+            meeting = targets.get(operation['id'])
+            if meeting is None:
+                fail(operation, f"Reunião {operation['id']} não encontrada")
+            elif meeting.created_by != user.id and not user.is_admin:
+                fail(operation, f"Sem permissão para alterar a reunião {operation['id']}")
+            elif operation['op'] == 'cancel' and meeting.id in series_parents:
+                fail(operation, f"A reunião {operation['id']} é a primeira de uma série recorrente; "
+                                f"cancele as ocorrências individualmente")
+    touched = [op['id'] for op in operations if op['op'] != 'create']
+    if len(touched) != len(set(touched)):
+        errors.append({'index': None, 'error': 'Cada reunião pode aparecer em apenas uma operação do lote'})
+    if errors:
+        raise BatchError(errors)
+
+    scheduled = [op for op in operations if op['op'] in ('create', 'move')]
+    snapshot = None
+    if scheduled:
+        snapshot = BusySnapshot(
+            min(op['start'] for op in scheduled), max(op['end'] for op in scheduled), usernames
+        )
+        # Reuniões movidas ou canceladas deixam de ocupar o horário antigo
+        snapshot.remove(set(touched))
+
+    now = get_brazil_now()
+    for operation in scheduled:
+        start, end = operation['start'], operation['end']
+        meeting = targets.get(operation.get('id'))
+        room_id = operation.get('room_id', meeting.room_id if meeting else None)
+        if end <= start:
+            fail(operation, 'O término deve ser posterior ao início')
+            continue
+        if start < now:
+            fail(operation, 'A data e hora de início não pode ser no passado')
+            continue
+        if room_id not in active_rooms:
+            fail(operation, f'Sala {room_id} inexistente ou inativa')
+            continue
+
+        if operation['op'] == 'create':
+            unknown = [user_id for user_id in operation['participants'] if user_id not in usernames]
+            if unknown:
+                fail(operation, f'Participantes inexistentes: {unknown}')
+                continue
+            people = {usernames[user_id] for user_id in operation['participants']}
+        else:
+            people = _split(meeting.participants)
+
+        # Capacidade só é conferida ao criar ou trocar de sala
+        organizer = usernames.get(meeting.created_by if meeting else user.id)
+        headcount = len((people | {organizer}) - {None})
+        capacity = capacities.get(room_id)
+        if (meeting is None or meeting.room_id != room_id) and capacity and headcount > capacity:
+            fail(operation, f'A sala {active_rooms[room_id]} comporta {capacity} pessoa(s); a reunião tem {headcount}')
+            continue
+
+        local_start, local_end = _local(start), _local(end)
+        room_conflicts = snapshot.room_conflicts(room_id, local_start, local_end)
+        CONFLICT_CHECKS.inc(kind='room', result='conflict' if room_conflicts else 'free')
+        if room_conflicts:
+            fail(operation, f'A sala {active_rooms[room_id]} não está disponível às {local_start:%d/%m/%Y %H:%M}')
+            continue
+        # Troca só de sala não muda a agenda de ninguém
+        same_time = meeting is not None and (
+            _local(meeting.start_datetime), _local(meeting.end_datetime)
+        ) == (local_start, local_end)
+        busy = [] if same_time else snapshot.busy_people(people, local_start, local_end)
+        if not same_time:
+            CONFLICT_CHECKS.inc(kind='user', result='conflict' if busy else 'free')
+        if busy:
+            fail(operation, f'Participantes com outra reunião no horário: {", ".join(busy)}')
+            continue
+
+        # Reserva o horário para as próximas operações do lote
+        # Reuniões novas ainda não têm id: usam um negativo para não colidir
+        snapshot.add(operation.get('id') or -(operation['index'] + 1), room_id, local_start, local_end,
+                     people | {organizer})
+        operation['room_id'] = room_id
+        operation['people'] = people
+
+    if errors:
+        raise BatchError(errors)
+
+    results = [{'index': op['index'], 'op': op['op'], 'id': op.get('id')} for op in operations]
+    if dry_run:
+        return results
+
+    changes = []  # (ação, reunião, participantes) para as notificações
+    created = {}
+    for operation in operations:
+        if operation['op'] == 'create':
+            meeting = Meeting(
+                title=operation['title'], description=operation['description'],
+                room_id=operation['room_id'], start_datetime=operation['start'], end_datetime=operation['end'],
+                participants=', '.join(sorted(operation['people'])) or None,
+                is_recurring=False, created_by=user.id, created_at=now
+            )
+            db.session.add(meeting)
+            created[operation['index']] = meeting
+            changes.append(('created', meeting, operation['people']))
+        elif operation['op'] == 'move':
+            meeting = targets[operation['id']]
+            meeting.start_datetime = operation['start']
+            meeting.end_datetime = operation['end']
+            meeting.room_id = operation['room_id']
+            changes.append(('updated', meeting, operation['people']))
+        else:
+            meeting = targets[operation['id']]
+            changes.append(('cancelled', meeting, _split(meeting.participants)))
+            db.session.delete(meeting)
+
+    db.session.flush()
+    for result in results:
+        if result['index'] in created:
+            result['id'] = created[result['index']].id
+
+    messages = _build_notifications(changes, user, ids_by_name) if notify else {}
+    db.session.commit()
+    reminder_engine.invalidate()
+    logging.info(f"Lote aplicado por {user.username}: {len(operations)} operação(ões)")
+
+    if messages:
+        _send_digest(messages)
+    return results
+
+
+_NOTIFICATION_TEXT = {
+    'created': ('meeting_created', 'Nova reunião: {title}', 'Você foi convidado para a reunião "{title}" na sala {room} em {when}.'),
+    'updated': ('meeting_updated', 'Reunião atualizada: {title}', 'A reunião "{title}" foi reagendada para {when} na sala {room}.'),
+    'cancelled': (None, None, 'A reunião "{title}" de {when} foi cancelada.'),
+}
+
+
+def _build_notifications(changes, user, ids_by_name):
+    """
+    Cria as notificações no sistema (na mesma transação) e agrupa o resumo por destinatário
+
+    Reuniões canceladas não recebem notificação no sistema: a notificação
+    referencia a reunião, que é excluída.
+
+    Returns:
+        dict: {username: [linhas do resumo]}
+    """
+    room_names = dict(get_room_choices())
+    digest = defaultdict(list)
+    counts = defaultdict(int)
+    rows = []
+    created_at = datetime.utcnow()
+    for action, meeting, people in changes:
+        notification_type, title_template, message_template = _NOTIFICATION_TEXT[action]
+        values = {'title': meeting.title, 'room': room_names.get(meeting.room_id, ''), 'when': f'{_local(meeting.start_datetime):%d/%m/%Y às %H:%M}'}
+        message = message_template.format(**values)
+        for person in people:
+            user_id = ids_by_name.get(person)
+            if user_id is None or user_id == user.id:
+                continue
+            digest[person].append(message)
+            if notification_type:
+                rows.append({
+                    'user_id': user_id, 'meeting_id': meeting.id, 'title': title_template.format(**values),
+                    'message': message, 'notification_type': notification_type,
+                    'is_read': False, 'created_at': created_at,
+                })
+                counts[notification_type] += 1
+    if rows:
+        db.session.execute(insert(Notification), rows)
+    for notification_type, count in counts.items():
+        NOTIFICATIONS_CREATED.inc(count, type=notification_type)
+    return digest
+
+
+def _send_digest(digest):
+    emails = dict(User.query.with_entities(User.username, User.email).filter(User.username.in_(list(digest))).all())
+    messages = []
+    for username, lines in digest.items():
+        if not emails.get(username):
+            continue
+        body = "Houve mudanças nas suas reuniões:\n\n" + "\n".join(f"- {line}" for line in lines)
+        messages.append((
+            f'{len(lines)} alteração(ões) na sua agenda', [emails[username]],
+            f"{body}\n\nSistema de Reuniões - Monter Elétrica"
+        ))
+    return send_bulk_emails(messages)
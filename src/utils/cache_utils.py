@@ -0,0 +1,479 @@
+from collections import OrderedDict
+from flask import current_app, session
+from flask_login import UserMixin
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from src.database import db, use_primary
+from src.models.cache_version import CacheVersion
+from src.models.user import User, Room
+import threading
+import time
+
+# Versões dos conjuntos em cache. A referência fica na tabela cache_versions e é
+# incrementada na mesma transação que altera User/Room: todos os workers
+# enxergam a mudança quando (e só quando) ela é confirmada. Cada processo relê
+# as versões no máximo a cada CACHE_VERSION_TTL segundos, e logo depois de
+# confirmar uma alteração própria.
+VERSION_NAMES = ('users', 'user_count', 'rooms')
+_versions = dict.fromkeys(VERSION_NAMES, 0)
+_versions_checked_at = None
+_choices_cache = {}
+_lock = threading.Lock()
+
+# Campos do User que entram nos caches (opções, lookup e usuário da sessão)
+_USER_CACHED_FIELDS = ('username', 'email', 'is_admin')
+# Marca em session.info: a transação incrementou versões e ainda não confirmou
+_PENDING_KEY = 'cache_versions_pending'
+
+
+def _increment_versions(connection, names):
+    table = CacheVersion.__table__
+    names = sorted(names)
+    result = connection.execute(
+        update(table).where(table.c.name.in_(names)).values(version=table.c.version + 1)
+    )
+    if result.rowcount < len(names):
+        existing = set(connection.execute(select(table.c.name).where(table.c.name.in_(names))).scalars())
+        missing = [name for name in names if name not in existing]
+        connection.execute(insert(table), [{'name': name, 'version': 1} for name in missing])
+
+
+def ensure_cache_versions():
+    """Cria as linhas de cache_versions que faltam (chamada na inicialização do banco)"""
+    table = CacheVersion.__table__
+    with db.engine.begin() as connection:
+        existing = set(connection.execute(select(table.c.name)).scalars())
+        missing = [name for name in VERSION_NAMES if name not in existing]
+        if missing:
+            connection.execute(insert(table), [{'name': name, 'version': 0} for name in missing])
+
+
+def bump_version(name):
+    """
+    Invalida um conjunto em cache em todos os processos incrementando sua versão
+
+    Só é necessária depois de gravações que não passam pela sessão do ORM
+    (INSERT direto no engine, SQL manual); as feitas pela sessão já
+    incrementam as versões na própria transação.
+
+    Args:
+        name (str): Nome do conjunto ('users', 'user_count' ou 'rooms')
+    """
+    global _versions_checked_at
+    with db.engine.begin() as connection:
+        _increment_versions(connection, [name])
+    _versions_checked_at = None
+
+
+def _refresh_versions():
+    global _versions_checked_at
+    now = time.monotonic()
+    checked_at = _versions_checked_at
+    if checked_at is not None and now - checked_at < current_app.config.get('CACHE_VERSION_TTL', 5):
+        return
+    # Versões ainda não confirmadas pela própria transação não valem para os outros
+    if db.session.info.get(_PENDING_KEY):
+        return
+    with use_primary():
+        rows = db.session.execute(select(CacheVersion.name, CacheVersion.version)).all()
+    with _lock:
+        for name, version in rows:
+            if name in _versions and version > _versions[name]:
+                _versions[name] = version
+        _versions_checked_at = now
+
+
+def get_version(name):
+    """Retorna a versão atual de um conjunto em cache"""
+    _refresh_versions()
+    return _versions[name]
+
+
+def _cached(name, loader, key=None):
+    # `key` permite guardar mais de um valor derivado do mesmo conjunto versionado
+    key = key or name
+    _refresh_versions()
+    if db.session.info.get(_PENDING_KEY):
+        # A transação alterou o conjunto e ainda não confirmou: o valor vale só para ela
+        with use_primary():
+            return loader()
+
+    version = _versions[name]
+    entry = _choices_cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    # O valor fica para as próximas requisições: não pode vir de uma réplica atrasada
+    with use_primary():
+        value = loader()
+    with _lock:
+        # Só grava se ninguém invalidou o conjunto enquanto carregávamos
+        if _versions[name] == version:
+            _choices_cache[key] = (version, value)
+    return value
+
+
+def get_room_choices():
+    """
+    Retorna as opções de sala ativas para formulários
+
+    Returns:
+        list: Lista de tuplas (id, nome)
+    """
+    return _cached('rooms', lambda: [
+        (room_id, name) for room_id, name in
+        Room.query.with_entities(Room.id, Room.name).filter_by(is_active=True).order_by(Room.id).all()
+    ])
+
+
+def get_user_choices():
+    """
+    Retorna as opções de usuário para formulários
+
+    Returns:
+        list: Lista de tuplas (id, username)
+    """
+    return _cached('users', lambda: [
+        (user_id, username) for user_id, username in
+        User.query.with_entities(User.id, User.username).order_by(User.id).all()
+    ])
+
+
+def get_room_capacities():
+    """
+    Retorna a capacidade de cada sala ativa
+
+    Returns:
+        dict: {id: capacidade}
+    """
+    return _cached('rooms', lambda: dict(
+        Room.query.with_entities(Room.id, Room.capacity).filter_by(is_active=True).all()
+    ), key='room_capacities')
+
+
+def get_room_lookup():
+    """
+    Retorna o mapa nome da sala (minúsculo) -> id das salas ativas
+
+    Returns:
+        dict: {nome: id}
+    """
+    return _cached('rooms', lambda: {
+        name.strip().lower(): room_id for room_id, name in get_room_choices()
+    }, key='room_lookup')
+
+
+def get_user_lookup():
+    """
+    Retorna o mapa username/e-mail (minúsculos) -> (id, username, e-mail)
+
+    Usado pela importação em lote, que resolve milhares de nomes sem consultar o banco.
+
+    Returns:
+        dict: {username ou e-mail: (id, username, e-mail)}
+    """
+    def load():
+        lookup = {}
+        for user_id, username, email in User.query.with_entities(User.id, User.username, User.email):
+            entry = (user_id, username, email)
+            lookup[username.lower()] = entry
+            if email:
+                lookup[email.lower()] = entry
+        return lookup
+    return _cached('users', load, key='user_lookup')
+
+
+def get_user_count():
+    """Retorna o número de usuários cadastrados (em cache)"""
+    return _cached('user_count', lambda: User.query.count())
+
+
+def get_user_choices_for_ids(user_ids):
+    """
+    Retorna as opções de usuário apenas para os IDs informados
+
+    Args:
+        user_ids (list): Lista de IDs de usuário
+
+    Returns:
+        list: Lista de tuplas (id, username)
+    """
+    if not user_ids:
+        return []
+
+    rows = User.query.with_entities(User.id, User.username).filter(
+        User.id.in_(user_ids)
+    ).order_by(User.id).all()
+    return [(user_id, username) for user_id, username in rows]
+
+
+def resolve_participant_ids(names):
+    """
+    Converte nomes de participantes em IDs de usuário com uma única consulta IN
+
+    Args:
+        names (list): Lista de nomes de usuário
+
+    Returns:
+        list: IDs na mesma ordem dos nomes encontrados
+    """
+    names = [name for name in names if name]
+    if not names:
+        return []
+
+    rows = User.query.with_entities(User.username, User.id).filter(User.username.in_(names)).all()
+    ids_by_name = dict(rows)
+    return [ids_by_name[name] for name in names if name in ids_by_name]
+
+
+def resolve_participant_names(user_ids):
+    """
+    Converte IDs de usuário em nomes com uma única consulta IN
+
+    Args:
+        user_ids (list): Lista de IDs de usuário
+
+    Returns:
+        list: Nomes na mesma ordem dos IDs encontrados
+    """
+    if not user_ids:
+        return []
+
+    rows = User.query.with_entities(User.id, User.username).filter(User.id.in_(user_ids)).all()
+    names_by_id = dict(rows)
+    return [names_by_id[user_id] for user_id in user_ids if user_id in names_by_id]
+
+
+def _changed_versions(session):
+    names = set()
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, User):
+            names.update(('users', 'user_count'))
+        elif isinstance(obj, Room):
+            names.add('rooms')
+    for obj in session.dirty:
+        if isinstance(obj, Room) and session.is_modified(obj):
+            names.add('rooms')
+        elif isinstance(obj, User):
+            # Rehash de senha e afins não invalidam nada
+            attrs = inspect(obj).attrs
+            if any(attrs[field].history.has_changes() for field in _USER_CACHED_FIELDS):
+                names.add('users')
+    return names
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed_versions(session, flush_context):
+    names = _changed_versions(session)
+    if names:
+        _increment_versions(session.connection(), names)
+        session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_bulk_versions(orm_execute_state):
+    # INSERT/UPDATE/DELETE em lote não passam pelo flush
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    entity = orm_execute_state.bind_mapper.class_
+    if entity is User:
+        names = ('users', 'user_count')
+    elif entity is Room:
+        names = ('rooms',)
+    else:
+        return
+    session = orm_execute_state.session
+    _increment_versions(session.connection(), names)
+    session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _versions_committed(session):
+    global _versions_checked_at
+    if session.info.pop(_PENDING_KEY, None):
+        # Este processo enxerga a própria alteração já na próxima leitura
+        _versions_checked_at = None
+
+
+@event.listens_for(Session, 'after_rollback')
+def _versions_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# =============================================
+# CACHE DE USUÁRIOS DA SESSÃO (Flask-Login)
+# =============================================
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+_user_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'cookie_hits': 0}
+
+SNAPSHOT_SESSION_KEY = '_user_snapshot'
+
+
+class SessionUser(UserMixin):
+    """
+    Usuário leve servido como current_user
+
+    Carrega apenas id, username, email e is_admin do cache. Qualquer outro
+    atributo (check_password, set_password, to_dict...) carrega o User do banco
+    sob demanda, uma única vez por requisição.
+    """
+
+    def __init__(self, snapshot):
+        self.id = snapshot['id']
+        self.username = snapshot['username']
+        self.email = snapshot['email']
+        self.is_admin = snapshot['is_admin']
+        self._user = None
+
+    def _get_user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        user = self._get_user()
+        if user is None:
+            raise AttributeError(name)
+        return getattr(user, name)
+
+    def __repr__(self):
+        return f'<SessionUser {self.username}>'
+
+
+def _snapshot_from_user(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'is_admin': user.is_admin
+    }
+
+
+def remember_user_snapshot(user):
+    """
+    Grava o snapshot do usuário na sessão assinada (modo 'cookie')
+
+    Args:
+        user: Objeto User recém-autenticado
+    """
+    if current_app.config.get('USER_LOADER_MODE') == 'cookie':
+        snapshot = _snapshot_from_user(user)
+        snapshot['issued_at'] = int(time.time())
+        snapshot['version'] = get_version('users')
+        session[SNAPSHOT_SESSION_KEY] = snapshot
+
+
+def _load_from_cookie(user_id):
+    snapshot = session.get(SNAPSHOT_SESSION_KEY)
+    if not snapshot or snapshot.get('id') != user_id:
+        return None
+
+    max_age = current_app.config.get('USER_SNAPSHOT_MAX_AGE', 300)
+    if time.time() - snapshot.get('issued_at', 0) > max_age:
+        return None
+    # Algum usuário mudou (em qualquer worker) depois que o snapshot foi emitido
+    if snapshot.get('version') != get_version('users'):
+        return None
+
+    with _user_cache_lock:
+        _user_cache_stats['cookie_hits'] += 1
+    return SessionUser(snapshot)
+
+
+def load_session_user(user_id):
+    """
+    Carrega o usuário da sessão sem ir ao banco sempre que possível
+
+    Modos (config USER_LOADER_MODE):
+        'db': sempre consulta o banco
+        'cache': cache LRU com TTL em memória (padrão)
+        'cookie': snapshot assinado na própria sessão, sem consulta
+
+    Args:
+        user_id (int): ID do usuário
+
+    Returns:
+        SessionUser ou None
+    """
+    mode = current_app.config.get('USER_LOADER_MODE', 'cache')
+    if mode == 'db':
+        return db.session.get(User, user_id)
+
+    if mode == 'cookie':
+        session_user = _load_from_cookie(user_id)
+        if session_user is not None:
+            return session_user
+
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    now = time.monotonic()
+    version = get_version('users')
+
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is not None and entry[1] == version and now - entry[0] < ttl:
+            _user_cache.move_to_end(user_id)
+            _user_cache_stats['hits'] += 1
+            return SessionUser(entry[2])
+        _user_cache_stats['misses'] += 1
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidate_user(user_id)
+        return None
+
+    snapshot = _snapshot_from_user(user)
+    max_size = current_app.config.get('USER_CACHE_SIZE', 1024)
+    with _user_cache_lock:
+        _user_cache[user_id] = (now, version, snapshot)
+        _user_cache.move_to_end(user_id)
+        while len(_user_cache) > max_size:
+            _user_cache.popitem(last=False)
+            _user_cache_stats['evictions'] += 1
+
+    if mode == 'cookie':
+        remember_user_snapshot(user)
+
+    session_user = SessionUser(snapshot)
+    session_user._user = user
+    return session_user
+
+
+def invalidate_user(user_id):
+    """
+    Remove um usuário do cache da sessão deste processo e do navegador atual
+
+    Os demais workers e navegadores descartam o snapshot sozinhos: as entradas
+    do cache e os snapshots do modo 'cookie' guardam a versão 'users', que
+    muda na mesma transação que altera permissões, nome, e-mail ou remove o
+    usuário. Cada worker confere essa versão no banco a cada
+    CACHE_VERSION_TTL segundos, sem consulta por requisição.
+
+    Args:
+        user_id (int): ID do usuário
+    """
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+    try:
+        snapshot = session.get(SNAPSHOT_SESSION_KEY)
+        if snapshot and snapshot.get('id') == user_id:
+            session.pop(SNAPSHOT_SESSION_KEY, None)
+    except RuntimeError:
+        # Fora de um contexto de requisição não há sessão para limpar
+        pass
+
+
+def get_user_cache_stats():
+    """
+    Retorna os contadores do cache de usuários da sessão
+
+    Returns:
+        dict: hits, misses, evictions, cookie_hits e tamanho atual
+    """
+    stats = dict(_user_cache_stats)
+    stats['size'] = len(_user_cache)
+    stats['mode'] = current_app.config.get('USER_LOADER_MODE', 'cache')
+    return stats
@@ -1,9 +1,10 @@
 from flask_mail import Message
 from flask import current_app
 from src.models.user import User
+from src.utils.metrics_utils import EMAILS
 import logging
 
-def send_email(subject, recipients, body, html_body=None):
+def send_email(subject, recipients, body, html_body=None, connection=None):
     """
     Envia e-mail usando Flask-Mail
 
@@ -12,6 +13,7 @@ def send_email(subject, recipients, body, html_body=None):
         recipients (list): Lista de destinatários
         body (str): Corpo do e-mail em texto
         html_body (str, optional): Corpo do e-mail em HTML
+        connection (optional): Conexão SMTP aberta com mail.connect(), para envios em lote
 
     Returns:
         bool: True se enviado com sucesso, False caso contrário
@@ -26,14 +28,43 @@ def send_email(subject, recipients, body, html_body=None):
             html=html_body
         )
 
-        mail.send(msg)
+        (connection or mail).send(msg)
+        EMAILS.inc(status='sent')
         logging.info(f"E-mail enviado com sucesso para {len(recipients)} destinatário(s)")
         return True
 
     except Exception as e:
         logging.error(f"Erro ao enviar e-mail: {str(e)}")
+        EMAILS.inc(status='failed')
         return False
 
+def send_bulk_emails(messages):
+    """
+    Envia vários e-mails reutilizando uma única conexão SMTP
+
+    Args:
+        messages (list): Tuplas (assunto, destinatários, corpo)
+
+    Returns:
+        int: Número de e-mails enviados com sucesso
+    """
+    if not messages:
+        return 0
+
+    sent = 0
+    try:
+        from src.main import mail
+
+        with mail.connect() as connection:
+            for subject, recipients, body in messages:
+                if recipients and send_email(subject, recipients, body, connection=connection):
+                    sent += 1
+    except Exception as e:
+        logging.error(f"Erro ao abrir conexão para envio em lote: {str(e)}")
+
+    logging.info(f"{sent}/{len(messages)} e-mail(s) enviados em lote")
+    return sent
+
 def send_meeting_notification(meeting, action='created', custom_message=None, recipients=None):
     """
     Envia notificação de reunião para os participantes
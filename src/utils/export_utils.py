@@ -0,0 +1,279 @@
+"""
+Exportação de reuniões e estatísticas em CSV e XLSX - AgendaMonter
+
+As linhas são lidas do banco em lotes (yield_per, que no PostgreSQL usa um
+cursor do lado do servidor) e escritas em blocos pela resposta HTTP, então a
+memória usada não depende do número de reuniões exportadas. O XLSX é gerado
+sem dependências: um zip gravado em fluxo, com strings inline na planilha.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, union_all, func, literal
+from src.database import db
+from src.models.meeting import Meeting
+from src.models.archive import MeetingArchive
+from src.models.statistics import MeetingStatsRollup
+from src.models.user import User, Room
+from src.utils.history_utils import reaches_archive, meetings_source
+from src.utils.maintenance_utils import month_expression
+from src.utils.timezone_utils import to_brazil_timezone, ensure_timezone_aware
+from xml.sax.saxutils import escape
+import csv
+import io
+import zipfile
+
+# Linhas lidas do banco por vez e tamanho aproximado de cada bloco enviado
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+MEETING_COLUMNS = ['ID', 'Título', 'Início', 'Término', 'Sala', 'Criador', 'Participantes',
+                   'Recorrente', 'Arquivada', 'Descrição']
+STATISTICS_COLUMNS = ['Mês', 'Sala', 'Criador', 'Reuniões']
+
+
+def _local(dt):
+    """Datetime do banco no horário do Brasil, sem timezone (como a planilha espera)"""
+    return to_brazil_timezone(ensure_timezone_aware(dt)).replace(tzinfo=None) if dt else None
+
+
+def meeting_export_rows(start=None, end=None, room_id=None, created_by=None, include_archive=None):
+    """
+    Gera as reuniões filtradas, da mais antiga para a mais recente, lendo o banco em lotes
+
+    Args:
+        start (datetime, optional): Início do intervalo (por data de início)
+        end (datetime, optional): Fim exclusivo do intervalo
+        room_id (int, optional): Filtra pela sala
+        created_by (int, optional): Filtra pelo criador
+        include_archive (bool, optional): Força incluir/excluir o arquivo
+
+    Yields:
+        list: Valores na ordem de MEETING_COLUMNS
+    """
+    def build(model, archived):
+        query = select(
+            model.id, model.title, model.start_datetime, model.end_datetime, model.room_id,
+            model.created_by, model.participants, model.is_recurring, model.description,
+            literal(archived).label('archived')
+        )
+        if start is not None:
+            query = query.where(model.start_datetime >= start)
+        if end is not None:
+            query = query.where(model.start_datetime < end)
+        if room_id is not None:
+            query = query.where(model.room_id == room_id)
+        if created_by is not None:
+            query = query.where(model.created_by == created_by)
+        return query
+
+    if include_archive is None:
+        include_archive = reaches_archive(start)
+    source = build(Meeting, False)
+    if include_archive:
+        source = union_all(source, build(MeetingArchive, True))
+    source = source.subquery()
+
+    statement = select(
+        source, Room.name.label('room_name'), User.username.label('creator_name')
+    ).outerjoin(Room, Room.id == source.c.room_id).outerjoin(
+        User, User.id == source.c.created_by
+    ).order_by(source.c.start_datetime, source.c.id)
+
+    for row in db.session.execute(statement, execution_options={'yield_per': EXPORT_BATCH_SIZE}):
+        yield [
+            row.id, row.title, _local(row.start_datetime), _local(row.end_datetime),
+            row.room_name or '', row.creator_name or '', row.participants or '',
+            'Sim' if row.is_recurring else 'Não', 'Sim' if row.archived else 'Não',
+            row.description or '',
+        ]
+
+
+def statistics_export_rows(start=None, end=None, room_id=None, created_by=None):
+    """
+    Gera a contagem de reuniões por mês, sala e criador
+
+    Usa o rollup pré-agregado pelo agendador quando ele existe; caso contrário,
+    agrega direto das reuniões (incluindo o arquivo quando o período o alcança).
+
+    Yields:
+        list: Valores na ordem de STATISTICS_COLUMNS
+    """
+    if db.session.query(MeetingStatsRollup.month).first() is not None:
+        source = select(
+            MeetingStatsRollup.month.label('month'), MeetingStatsRollup.room_id,
+            MeetingStatsRollup.created_by, MeetingStatsRollup.count.label('count')
+        )
+        if start is not None:
+            source = source.where(MeetingStatsRollup.month >= start.strftime('%Y-%m'))
+        if end is not None:
+            source = source.where(MeetingStatsRollup.month <= (end - timedelta(microseconds=1)).strftime('%Y-%m'))
+        source = source.subquery()
+    else:
+        meetings = meetings_source(since=start)
+        month = month_expression(meetings.c.start_datetime)
+        source = select(
+            month.label('month'), meetings.c.room_id, meetings.c.created_by,
+            func.count(meetings.c.id).label('count')
+        ).group_by(month, meetings.c.room_id, meetings.c.created_by)
+        if end is not None:
+            source = source.where(meetings.c.start_datetime < end)
+        source = source.subquery()
+
+    statement = select(
+        source.c.month, Room.name, User.username, source.c.count
+    ).outerjoin(Room, Room.id == source.c.room_id).outerjoin(
+        User, User.id == source.c.created_by
+    ).order_by(source.c.month, Room.name, User.username)
+    if room_id is not None:
+        statement = statement.where(source.c.room_id == room_id)
+    if created_by is not None:
+        statement = statement.where(source.c.created_by == created_by)
+
+    for month, room_name, username, count in db.session.execute(
+        statement, execution_options={'yield_per': EXPORT_BATCH_SIZE}
+    ):
+        yield [month, room_name or '', username or '', int(count or 0)]
+
+
+# =============================================
+# CSV
+# =============================================
+def iter_csv(header, rows):
+    """
+    Serializa as linhas em CSV (separado por ponto e vírgula, como o Excel em português espera)
+
+    Yields:
+        str: Blocos de até EXPORT_CHUNK_BYTES aproximadamente
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    # BOM para o Excel reconhecer o UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([
+            value.strftime('%d/%m/%Y %H:%M') if isinstance(value, datetime) else value
+            for value in row
+        ])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# =============================================
+# XLSX
+# =============================================
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 1: negrito (cabeçalho); estilo 2: data e hora
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino não pesquisável do zip: acumula os bytes até o gerador os enviar"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # O zipfile consulta a posição para montar o diretório central
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _xlsx_cell(value, style_header=False):
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, datetime):
+        serial = (value - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c s="2"><v>{serial:.8f}</v></c>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    style = ' s="1"' if style_header else ''
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def iter_xlsx(header, rows, sheet_name='Dados'):
+    """
+    Serializa as linhas numa planilha XLSX gravada em fluxo
+
+    Yields:
+        bytes: Blocos do arquivo zip
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        archive.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', _XLSX_STYLES)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                '<row>' + ''.join(_xlsx_cell(value, style_header=True) for value in header) + '</row>'
+            ).encode('utf-8'))
+            for row in rows:
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode('utf-8'))
+                if sink.size >= EXPORT_CHUNK_BYTES:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from heapq import merge
+from sqlalchemy import select, union_all, func
+from src.database import db
+from src.models.meeting import Meeting
+from src.models.archive import MeetingArchive
+from src.utils.timezone_utils import make_timezone_aware, BRAZIL_TZ
+
+
+def get_archive_horizon():
+    """
+    Retorna o fim da reunião arquivada mais recente
+
+    Tudo que termina depois disso está, com certeza, na tabela quente.
+    Consulta barata: MAX sobre coluna indexada.
+
+    Returns:
+        datetime ou None se o arquivo estiver vazio
+    """
+    return db.session.query(func.max(MeetingArchive.end_datetime)).scalar()
+
+
+def reaches_archive(since):
+    """
+    Verifica se um intervalo que começa em `since` alcança o arquivo
+
+    Args:
+        since (datetime ou None): Início do intervalo; None significa sem limite
+
+    Returns:
+        bool: True se o arquivo precisa ser consultado
+    """
+    horizon = get_archive_horizon()
+    if horizon is None:
+        return False
+    if since is None:
+        return True
+
+    # O SQLite devolve datetimes naive; o PostgreSQL, com timezone
+    if horizon.tzinfo is None and since.tzinfo is not None:
+        since = since.replace(tzinfo=None)
+    elif horizon.tzinfo is not None and since.tzinfo is None:
+        since = make_timezone_aware(since)
+    return since <= horizon
+
+
+def meetings_source(since=None, include_archive=None):
+    """
+    Retorna um subquery (id, start_datetime, room_id, created_by) de reuniões
+
+    Une a tabela quente com o arquivo apenas quando o intervalo pedido
+    alcança o arquivo (ou quando `include_archive` força a decisão).
+
+    Args:
+        since (datetime, optional): Início do intervalo consultado
+        include_archive (bool, optional): Força incluir/excluir o arquivo
+
+    Returns:
+        Subquery com as colunas id, start_datetime, room_id e created_by
+    """
+    hot = select(Meeting.id, Meeting.start_datetime, Meeting.room_id, Meeting.created_by)
+    if since is not None:
+        hot = hot.where(Meeting.start_datetime >= since)
+
+    if include_archive is None:
+        include_archive = reaches_archive(since)
+    if not include_archive:
+        return hot.subquery()
+
+    cold = select(MeetingArchive.id, MeetingArchive.start_datetime, MeetingArchive.room_id, MeetingArchive.created_by)
+    if since is not None:
+        cold = cold.where(MeetingArchive.start_datetime >= since)
+    return union_all(hot, cold).subquery()
+
+
+def meeting_history(start=None, end=None, created_by=None, include_archive=None, room_id=None):
+    """
+    Lista reuniões de um intervalo, da mais recente para a mais antiga
+
+    A tabela de arquivo só é consultada quando `start` alcança o arquivo.
+
+    Args:
+        start (datetime, optional): Início do intervalo (por data de início)
+        end (datetime, optional): Fim do intervalo
+        created_by (int, optional): Filtra pelo criador
+        include_archive (bool, optional): Força incluir/excluir o arquivo
+        room_id (int, optional): Filtra pela sala
+
+    Returns:
+        list: Objetos Meeting e MeetingArchive
+    """
+    def build(model):
+        query = model.query
+        if start is not None:
+            query = query.filter(model.start_datetime >= start)
+        if end is not None:
+            query = query.filter(model.start_datetime < end)
+        if created_by is not None:
+            query = query.filter(model.created_by == created_by)
+        if room_id is not None:
+            query = query.filter(model.room_id == room_id)
+        return query.order_by(model.start_datetime.desc(), model.id.desc())
+
+    hot = build(Meeting).all()
+    if include_archive is None:
+        include_archive = start is not None and reaches_archive(start)
+    if not include_archive:
+        return hot
+
+    cold = build(MeetingArchive).all()
+    # Arquivo e tabela quente já vêm ordenados: basta intercalar
+    return list(merge(hot, cold, key=lambda m: (m.start_datetime.replace(tzinfo=None), m.id), reverse=True))
+
+
+def parse_date_range(args):
+    """
+    Lê os parâmetros 'inicio' e 'fim' (AAAA-MM-DD) da query string
+
+    Args:
+        args: request.args
+
+    Returns:
+        tuple: (início, fim exclusivo) como datetimes no timezone do Brasil, ou None
+    """
+    def parse(name):
+        value = args.get(name)
+        if not value:
+            return None
+        try:
+            return BRAZIL_TZ.localize(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            return None
+
+    start = parse('inicio')
+    end = parse('fim')
+    if end is not None:
+        end += timedelta(days=1)
+    return start, end
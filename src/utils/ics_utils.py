@@ -0,0 +1,458 @@
+"""
+Feeds iCalendar (ICS) por usuário e por sala - AgendaMonter
+
+Cada série recorrente vira um único VEVENT com RRULE; ocorrências que não
+foram criadas (conflito de sala, cancelamento) viram EXDATE e ocorrências
+editadas individualmente viram VEVENTs com RECURRENCE-ID.
+
+Toda alteração em reuniões é registrada em meeting_changes (eventos do ORM e
+exclusões em lote). O maior id dessa tabela é o token de sincronização: com
+?sync_token=N o feed traz só as séries alteradas depois de N (mais uma margem
+de CHANGE_LOOKBACK antes dele), e reuniões excluídas aparecem com
+STATUS:CANCELLED.
+"""
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from itsdangerous import URLSafeSerializer, BadData
+from flask import current_app
+from sqlalchemy import event, insert, select, func, literal, inspect
+from sqlalchemy.orm import Session, joinedload
+from src.database import db
+from src.models.calendar_change import MeetingChange
+from src.models.meeting import Meeting
+from src.utils.availability_utils import CHANGE_LOOKBACK
+from src.utils.timezone_utils import ensure_timezone_aware, to_brazil_timezone, get_brazil_now, BRAZIL_TZ
+import pytz
+
+PRODID = '-//Monter Eletrica//AgendaMonter//PT-BR'
+TZID = 'America/Sao_Paulo'
+# O Brasil não tem horário de verão desde 2019
+VTIMEZONE = [
+    'BEGIN:VTIMEZONE', f'TZID:{TZID}',
+    'BEGIN:STANDARD', 'DTSTART:19700101T000000', 'TZOFFSETFROM:-0300', 'TZOFFSETTO:-0300', 'TZNAME:-03',
+    'END:STANDARD', 'END:VTIMEZONE',
+]
+RRULES = {
+    # create_recurring_meetings pula sábados e domingos nas diárias
+    'daily': 'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR',
+    'weekly': 'FREQ=WEEKLY',
+    'monthly': 'FREQ=MONTHLY',
+}
+# Mesmo limite de create_recurring_meetings
+MAX_RECURRENCE_ITERATIONS = 100
+
+
+# =============================================
+# REGISTRO DE ALTERAÇÕES
+# =============================================
+def _log_change(connection, target, action):
+    values = {
+        'meeting_id': target.id,
+        'series_id': target.parent_meeting_id or target.id,
+        'room_id': target.room_id,
+        'created_by': target.created_by,
+        'participants': target.participants,
+        'action': action,
+        'changed_at': datetime.utcnow(),
+    }
+    if action == 'upsert':
+        state = inspect(target)
+        # Participantes e sala anteriores: quem saiu da reunião também precisa do cancelamento
+        removed = [p for p in state.attrs.participants.history.deleted if p]
+        if removed:
+            values['participants'] = ', '.join(removed + [target.participants or ''])
+        previous_rooms = state.attrs.room_id.history.deleted
+        if previous_rooms:
+            values['previous_room_id'] = previous_rooms[0]
+    connection.execute(insert(MeetingChange.__table__).values(**values))
+
+
+@event.listens_for(Meeting, 'after_insert')
+@event.listens_for(Meeting, 'after_update')
+def _meeting_saved(mapper, connection, target):
+    _log_change(connection, target, 'upsert')
+
+
+@event.listens_for(Meeting, 'after_delete')
+def _meeting_deleted(mapper, connection, target):
+    _log_change(connection, target, 'delete')
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _meeting_bulk_deleted(orm_execute_state):
+    """Exclusões em lote (query.delete / delete(Meeting)) não disparam after_delete"""
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is not inspect(Meeting):
+        return
+    if not orm_execute_state.execution_options.get('log_meeting_changes', True):
+        return
+    whereclause = orm_execute_state.statement.whereclause
+    rows = select(
+        Meeting.id, func.coalesce(Meeting.parent_meeting_id, Meeting.id), Meeting.room_id,
+        Meeting.created_by, Meeting.participants, literal('delete'), literal(datetime.utcnow())
+    )
+    if whereclause is not None:
+        rows = rows.where(whereclause)
+    orm_execute_state.session.connection().execute(
+        insert(MeetingChange.__table__).from_select(
+            ['meeting_id', 'series_id', 'room_id', 'created_by', 'participants', 'action', 'changed_at'], rows
+        )
+    )
+
+
+def log_inserted_meetings(meetings):
+    """
+    Registra reuniões inseridas com insert() em lote, que não dispara os eventos do ORM
+
+    Args:
+        meetings (list): Dicionários com id, room_id, created_by, participants e parent_meeting_id opcional
+    """
+    if not meetings:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(MeetingChange.__table__), [{
+        'meeting_id': m['id'],
+        'series_id': m.get('parent_meeting_id') or m['id'],
+        'room_id': m['room_id'],
+        'created_by': m['created_by'],
+        'participants': m.get('participants'),
+        'action': 'upsert',
+        'changed_at': now,
+    } for m in meetings])
+
+
+def latest_change_id():
+    """Token de sincronização atual (0 se nada foi registrado)"""
+    return db.session.query(func.max(MeetingChange.id)).scalar() or 0
+
+
+def oldest_change_id():
+    return db.session.query(func.min(MeetingChange.id)).scalar() or 0
+
+
+# =============================================
+# TOKENS DE ASSINATURA
+# =============================================
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='ics-feed')
+
+
+def get_feed_token(user):
+    """Token permanente que identifica o usuário na URL do feed (clientes de calendário não têm sessão)"""
+    return _serializer().dumps({'user_id': user.id})
+
+
+def verify_feed_token(token):
+    """
+    Returns:
+        int ou None: ID do usuário do token
+    """
+    try:
+        return _serializer().loads(token)['user_id']
+    except (BadData, KeyError, TypeError):
+        return None
+
+
+# =============================================
+# ESCOPO DOS FEEDS
+# =============================================
+class FeedScope:
+    """Reuniões de um usuário (criador ou participante) ou de uma sala"""
+
+    def __init__(self, user=None, room_id=None):
+        self.user = user
+        self.room_id = room_id
+
+    @property
+    def key(self):
+        return f'user-{self.user.id}' if self.user else f'room-{self.room_id}'
+
+    def condition(self):
+        if self.user:
+            # LIKE é só o pré-filtro indexável; matches() confere o nome exato
+            return (Meeting.created_by == self.user.id) | Meeting.participants.like(f'%{self.user.username}%')
+        return Meeting.room_id == self.room_id
+
+    def matches(self, room_id, created_by, participants, previous_room_id=None):
+        if self.user:
+            names = [p.strip() for p in (participants or '').split(',')]
+            return created_by == self.user.id or self.user.username in names
+        return self.room_id in (room_id, previous_room_id)
+
+    def matches_meeting(self, meeting):
+        return self.matches(meeting.room_id, meeting.created_by, meeting.participants)
+
+
+# =============================================
+# GERAÇÃO DO ICS
+# =============================================
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Quebra linhas com mais de 75 octetos (RFC 5545, 3.1)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Não corta no meio de um caractere UTF-8
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def _local(dt):
+    return to_brazil_timezone(ensure_timezone_aware(dt))
+
+
+def _local_stamp(dt):
+    return _local(dt).strftime('%Y%m%dT%H%M%S')
+
+
+def _utc_stamp(dt):
+    return dt.astimezone(pytz.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def expected_occurrence_dates(parent):
+    """
+    Datas das ocorrências que create_recurring_meetings gera para a série
+
+    Returns:
+        list: Datas (date) após a primeira ocorrência, no timezone do Brasil
+    """
+    if not parent.recurrence_end:
+        return []
+    current = _local(parent.start_datetime).date()
+    end = _local(parent.recurrence_end).date() if isinstance(parent.recurrence_end, datetime) else parent.recurrence_end
+
+    dates = []
+    for _ in range(MAX_RECURRENCE_ITERATIONS):
+        if parent.recurrence_type == 'daily':
+            current += timedelta(days=1)
+        elif parent.recurrence_type == 'weekly':
+            current += timedelta(weeks=1)
+        elif parent.recurrence_type == 'monthly':
+            current += relativedelta(months=1)
+        else:
+            break
+        if current > end:
+            break
+        if parent.recurrence_type == 'daily' and current.weekday() >= 5:
+            continue
+        dates.append(current)
+    return dates
+
+
+def _uses_rrule(parent):
+    if not parent.is_recurring or parent.recurrence_type not in RRULES:
+        return False
+    # relativedelta antecipa o dia 31 para o 28 e o RRULE pularia o mês: lista as ocorrências
+    return not (parent.recurrence_type == 'monthly' and _local(parent.start_datetime).day > 28)
+
+
+def _same_as_parent(child, parent):
+    return (
+        _local(child.start_datetime).time() == _local(parent.start_datetime).time()
+        and _local(child.end_datetime).time() == _local(parent.end_datetime).time()
+        and (child.title, child.description, child.room_id, child.participants)
+        == (parent.title, parent.description, parent.room_id, parent.participants)
+    )
+
+
+def _vevent(uid, meeting, stamp, extra=()):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;TZID={TZID}:{_local_stamp(meeting.start_datetime)}',
+        f'DTEND;TZID={TZID}:{_local_stamp(meeting.end_datetime)}',
+        *extra,
+        f'SUMMARY:{_escape(meeting.title)}',
+    ]
+    if meeting.room:
+        lines.append(f'LOCATION:{_escape(meeting.room.name)}')
+    description = meeting.description or ''
+    if meeting.participants:
+        description = f'{description}\n\nParticipantes: {meeting.participants}'.strip()
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    if meeting.creator:
+        lines.append(f'ORGANIZER;CN={_escape(meeting.creator.username)}:mailto:{meeting.creator.email}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _cancelled(uid, stamp):
+    return ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{stamp}', 'STATUS:CANCELLED', 'END:VEVENT']
+
+
+def _uid(meeting_id):
+    return f'meeting-{meeting_id}@agendamonter'
+
+
+def archive_cutoff():
+    """
+    Data até a qual ocorrências encerradas podem ter saído da tabela quente
+
+    O agendador arquiva (ou remove) reuniões mais antigas que
+    EXPIRED_MEETINGS_RETENTION_DAYS; a falta delas não é cancelamento.
+    """
+    days = current_app.config.get('EXPIRED_MEETINGS_RETENTION_DAYS', 30)
+    return (get_brazil_now() - timedelta(days=days)).date()
+
+
+def series_events(parent, children, stamp, archived_before=None):
+    """
+    VEVENTs de uma série (ou de uma reunião avulsa, com children vazio)
+
+    Args:
+        parent (Meeting ou None): Reunião principal; None se foi excluída e restaram ocorrências
+        children (list): Ocorrências da série
+        stamp (str): DTSTAMP
+        archived_before (date, optional): Ocorrências ausentes até esta data foram
+            arquivadas, não canceladas, e não viram EXDATE
+
+    Returns:
+        list: Linhas do ICS
+    """
+    if parent is None or not _uses_rrule(parent):
+        lines = []
+        for meeting in ([parent] if parent else []) + list(children):
+            lines += _vevent(_uid(meeting.id), meeting, stamp)
+        return lines
+
+    expected = expected_occurrence_dates(parent)
+    if not expected:
+        return _vevent(_uid(parent.id), parent, stamp)
+
+    by_date = {_local(child.start_datetime).date(): child for child in children}
+    parent_time = _local(parent.start_datetime).timetz()
+    until = BRAZIL_TZ.localize(datetime.combine(expected[-1], datetime.max.time().replace(microsecond=0)))
+
+    extra = [f'RRULE:{RRULES[parent.recurrence_type]};UNTIL={_utc_stamp(until)}']
+    missing = [
+        day for day in expected
+        if day not in by_date and (archived_before is None or day > archived_before)
+    ]
+    if missing:
+        stamps = ','.join(f"{day.strftime('%Y%m%d')}T{parent_time.strftime('%H%M%S')}" for day in missing)
+        extra.append(f'EXDATE;TZID={TZID}:{stamps}')
+    lines = _vevent(_uid(parent.id), parent, stamp, extra)
+
+    expected_set = set(expected)
+    for day, child in sorted(by_date.items()):
+        if day not in expected_set:
+            lines += _vevent(_uid(child.id), child, stamp)
+        elif not _same_as_parent(child, parent):
+            recurrence_id = f"{day.strftime('%Y%m%d')}T{parent_time.strftime('%H%M%S')}"
+            lines += _vevent(_uid(parent.id), child, stamp, [f'RECURRENCE-ID;TZID={TZID}:{recurrence_id}'])
+    return lines
+
+
+def _load_series(series_ids):
+    """Reuniões principais e ocorrências das séries, com sala e criador já carregados"""
+    if not series_ids:
+        return {}, {}
+    options = (joinedload(Meeting.room), joinedload(Meeting.creator))
+    parents = {
+        m.id: m for m in Meeting.query.options(*options).filter(Meeting.id.in_(series_ids))
+    }
+    children = {}
+    for child in Meeting.query.options(*options).filter(Meeting.parent_meeting_id.in_(series_ids)).order_by(Meeting.start_datetime):
+        children.setdefault(child.parent_meeting_id, []).append(child)
+    return parents, children
+
+
+def _calendar(name, events, sync_token):
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}', f'X-WR-TIMEZONE:{TZID}', f'X-AGENDAMONTER-SYNC-TOKEN:{sync_token}',
+        *VTIMEZONE, *events, 'END:VCALENDAR',
+    ]
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def build_feed(scope, name, past_days=30, future_days=365):
+    """
+    Feed completo: séries com alguma ocorrência na janela [hoje - past_days, hoje + future_days)
+
+    Returns:
+        str: Conteúdo ICS
+    """
+    sync_token = latest_change_id()
+    now = get_brazil_now()
+    rows = db.session.execute(
+        select(Meeting.id, Meeting.parent_meeting_id, Meeting.room_id, Meeting.created_by, Meeting.participants).where(
+            Meeting.start_datetime >= now - timedelta(days=past_days),
+            Meeting.start_datetime < now + timedelta(days=future_days),
+            scope.condition()
+        )
+    ).all()
+    series_ids = {
+        parent_id or meeting_id
+        for meeting_id, parent_id, room_id, created_by, participants in rows
+        if scope.matches(room_id, created_by, participants)
+    }
+
+    parents, children = _load_series(series_ids)
+    stamp = _utc_stamp(datetime.now(pytz.utc))
+    archived_before = archive_cutoff()
+    events = []
+    for series_id in sorted(series_ids):
+        events += series_events(parents.get(series_id), children.get(series_id, []), stamp, archived_before)
+    return _calendar(name, events, sync_token)
+
+
+def build_incremental_feed(scope, name, since):
+    """
+    Só as séries alteradas depois do token `since`, com cancelamentos
+
+    Returns:
+        str ou None: Conteúdo ICS; None se o token é antigo demais (registros já
+        removidos) e o cliente precisa do feed completo
+    """
+    if since < oldest_change_id() - 1:
+        return None
+
+    sync_token = latest_change_id()
+    # No PostgreSQL os ids saem na ordem do INSERT, não do commit: uma transação
+    # mais lenta pode confirmar um id menor que o token já entregue. Relê as
+    # alterações registradas até CHANGE_LOOKBACK antes do token; séries
+    # repetidas são enviadas uma vez só e reenviá-las não muda nada no cliente.
+    window = MeetingChange.id > since
+    token_change = db.session.get(MeetingChange, since) if since else None
+    if token_change is not None:
+        window = window | (MeetingChange.changed_at >= token_change.changed_at - CHANGE_LOOKBACK)
+    changes = MeetingChange.query.filter(window, MeetingChange.id <= sync_token).all()
+    relevant = [
+        c for c in changes if scope.matches(c.room_id, c.created_by, c.participants, c.previous_room_id)
+    ]
+    series_ids = {c.series_id for c in relevant}
+    parents, children = _load_series(series_ids)
+
+    stamp = _utc_stamp(datetime.now(pytz.utc))
+    archived_before = archive_cutoff()
+    events = []
+    for series_id in sorted(series_ids):
+        parent = parents.get(series_id)
+        remaining = children.get(series_id, [])
+        if parent is not None and not scope.matches_meeting(parent) and not any(scope.matches_meeting(c) for c in remaining):
+            parent, remaining = None, []
+        if parent is None:
+            events += _cancelled(_uid(series_id), stamp)
+        if parent is not None or remaining:
+            events += series_events(parent, remaining, stamp, archived_before)
+
+    # Ocorrências excluídas de séries listadas individualmente (ex: mensal no dia 31)
+    deleted_ids = sorted({
+        change.meeting_id for change in relevant
+        if change.action == 'delete' and change.meeting_id != change.series_id
+    })
+    for meeting_id in deleted_ids:
+        events += _cancelled(_uid(meeting_id), stamp)
+    return _calendar(name, events, sync_token)
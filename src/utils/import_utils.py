@@ -0,0 +1,453 @@
+"""
+Importação em lote de reuniões a partir de CSV ou ICS - AgendaMonter
+
+O arquivo é lido linha a linha e as reuniões válidas são acumuladas em lotes.
+Para cada lote, as reuniões existentes no período do lote são carregadas com
+uma única consulta e os conflitos de sala e de participantes são verificados
+em memória (listas ordenadas por sala e por usuário, com bisect). As aceitas
+são inseridas com um INSERT em lote; os e-mails são enviados no fim, um resumo
+por destinatário.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from dateutil.rrule import rrulestr
+from sqlalchemy import insert
+from src.database import db
+from src.models.meeting import Meeting
+from src.utils.batch_utils import BusySnapshot
+from src.utils.cache_utils import get_room_capacities, get_room_choices, get_room_lookup, get_user_lookup
+from src.utils.email_utils import send_bulk_emails
+from src.utils.ics_utils import log_inserted_meetings
+from src.utils.reminder_utils import reminder_engine
+from src.utils.timezone_utils import BRAZIL_TZ, get_brazil_now, to_brazil_timezone, ensure_timezone_aware
+import csv
+import itertools
+import logging
+import pytz
+
+# Cabeçalhos aceitos no CSV (minúsculos, sem acento) -> campo
+CSV_COLUMNS = {
+    'titulo': 'title', 'title': 'title', 'assunto': 'title',
+    'descricao': 'description', 'description': 'description',
+    'inicio': 'start', 'start': 'start', 'start_datetime': 'start',
+    'fim': 'end', 'termino': 'end', 'end': 'end', 'end_datetime': 'end',
+    'data': 'date', 'date': 'date',
+    'hora_inicio': 'start_time', 'start_time': 'start_time',
+    'hora_fim': 'end_time', 'end_time': 'end_time',
+    'sala': 'room', 'room': 'room', 'local': 'room', 'location': 'room',
+    'participantes': 'participants', 'participants': 'participants',
+    'criador': 'creator', 'organizador': 'creator', 'creator': 'creator', 'organizer': 'creator',
+}
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S',
+                    '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S')
+# Limite de ocorrências geradas a partir de um RRULE sem fim definido
+MAX_RRULE_OCCURRENCES = 200
+
+
+class ImportRowError(ValueError):
+    """Linha inválida; a mensagem vai para o relatório"""
+
+
+def _normalize_header(name):
+    table = str.maketrans('áàâãéêíóôõúç', 'aaaaeeiooouc')
+    return (name or '').strip().lower().translate(table).replace(' ', '_')
+
+
+def _parse_datetime(value):
+    value = (value or '').strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return BRAZIL_TZ.localize(datetime.strptime(value, fmt))
+        except ValueError:
+            continue
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ImportRowError(f'Data/hora inválida: "{value}"')
+    return to_brazil_timezone(parsed) if parsed.tzinfo else BRAZIL_TZ.localize(parsed)
+
+
+def _split_names(value):
+    return [name.strip() for name in (value or '').replace(';', ',').split(',') if name.strip()]
+
+
+# =============================================
+# LEITORES
+# =============================================
+def iter_csv_records(stream):
+    """
+    Lê um CSV (separado por vírgula ou ponto e vírgula) registro a registro
+
+    Yields:
+        tuple: (número da linha, dicionário com os campos normalizados)
+    """
+    first = stream.readline()
+    if not first:
+        return
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    reader = csv.reader(itertools.chain([first], stream), delimiter=delimiter)
+    header = [CSV_COLUMNS.get(_normalize_header(h)) for h in next(reader)]
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        fields = {key: value.strip() for key, value in zip(header, row) if key}
+        record = {
+            'title': fields.get('title'),
+            'description': fields.get('description'),
+            'room': fields.get('room'),
+            'participants': _split_names(fields.get('participants')),
+            'creator': fields.get('creator'),
+        }
+        try:
+            if fields.get('date'):
+                record['start'] = _parse_datetime(f"{fields['date']} {fields.get('start_time', '')}")
+                record['end'] = _parse_datetime(f"{fields['date']} {fields.get('end_time', '')}")
+            else:
+                record['start'] = _parse_datetime(fields.get('start'))
+                record['end'] = _parse_datetime(fields.get('end'))
+        except ImportRowError as e:
+            record['error'] = str(e)
+        yield reader.line_num, record
+
+
+def _unfold(lines):
+    """Junta as linhas continuadas do ICS (RFC 5545, 3.1), mantendo o número da primeira"""
+    current, number = None, 0
+    for index, raw in enumerate(lines, start=1):
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield number, current
+        current, number = line, index
+    if current is not None:
+        yield number, current
+
+
+def _split_property(line):
+    """'NOME;PARAM=V:valor' -> (NOME, {PARAM: V}, valor), respeitando aspas nos parâmetros"""
+    quoted = False
+    for index, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        return line.upper(), {}, ''
+    name, *params = head.split(';')
+    parsed = {}
+    for param in params:
+        key, _, param_value = param.partition('=')
+        parsed[key.upper()] = param_value.strip('"')
+    return name.upper(), parsed, value
+
+
+def _unescape(value):
+    return value.replace('\\n', '\n').replace('\\N', '\n').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+
+
+def _ics_datetime(value, params):
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        raise ImportRowError('Eventos de dia inteiro não são importados')
+    if value.endswith('Z'):
+        return to_brazil_timezone(pytz.utc.localize(datetime.strptime(value, '%Y%m%dT%H%M%SZ')))
+    naive = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    try:
+        tz = pytz.timezone(params['TZID']) if 'TZID' in params else BRAZIL_TZ
+    except pytz.UnknownTimeZoneError:
+        tz = BRAZIL_TZ
+    return to_brazil_timezone(tz.localize(naive))
+
+
+def _expand(event):
+    """Gera uma ocorrência por data do RRULE (menos as EXDATE), ou o próprio evento"""
+    start, end = event['start'], event['end']
+    if not event.get('rrule'):
+        yield event
+        return
+
+    rule = rrulestr(event['rrule'], dtstart=start)
+    horizon = start + timedelta(days=366)
+    excluded = set(event.get('exdates', ()))
+    for count, occurrence in enumerate(rule):
+        if count >= MAX_RRULE_OCCURRENCES or ('UNTIL' not in event['rrule'] and 'COUNT' not in event['rrule'] and occurrence > horizon):
+            break
+        occurrence = to_brazil_timezone(occurrence)
+        if occurrence in excluded:
+            continue
+        yield {**event, 'start': occurrence, 'end': occurrence + (end - start), 'rrule': None}
+
+
+def iter_ics_records(lines):
+    """
+    Lê um ICS evento a evento; séries com RRULE são expandidas em reuniões avulsas
+
+    Yields:
+        tuple: (número da linha do BEGIN:VEVENT, dicionário com os campos normalizados)
+    """
+    event, number = None, 0
+    for line_number, line in _unfold(lines):
+        name, params, value = _split_property(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event, number = {'participants': [], 'exdates': []}, line_number
+            continue
+        if event is None:
+            continue
+        if name == 'END' and value.upper() == 'VEVENT':
+            if 'error' in event or 'start' not in event:
+                event.setdefault('error', 'Evento sem DTSTART')
+                yield number, event
+            else:
+                event.setdefault('end', event['start'] + timedelta(hours=1))
+                for occurrence in _expand(event):
+                    yield number, occurrence
+            event = None
+            continue
+
+        try:
+            if name == 'SUMMARY':
+                event['title'] = _unescape(value)
+            elif name == 'DESCRIPTION':
+                event['description'] = _unescape(value)
+            elif name == 'LOCATION':
+                event['room'] = _unescape(value)
+            elif name == 'DTSTART':
+                event['start'] = _ics_datetime(value, params)
+            elif name == 'DTEND':
+                event['end'] = _ics_datetime(value, params)
+            elif name == 'RRULE':
+                event['rrule'] = value
+            elif name == 'EXDATE':
+                event['exdates'] += [_ics_datetime(v, params) for v in value.split(',')]
+            elif name in ('ATTENDEE', 'ORGANIZER'):
+                who = params.get('CN') or value.split(':', 1)[-1]
+                if name == 'ORGANIZER':
+                    event['creator'] = value.split(':', 1)[-1] if value.lower().startswith('mailto:') else who
+                else:
+                    event['participants'].append(who)
+            elif name == 'STATUS' and value.upper() == 'CANCELLED':
+                event['error'] = 'Evento cancelado'
+        except (ImportRowError, ValueError) as e:
+            event['error'] = str(e)
+
+
+# =============================================
+# IMPORTAÇÃO
+# =============================================
+def _naive_local(dt):
+    """Datetime no horário do Brasil sem timezone, para comparar com o que vem do banco"""
+    return to_brazil_timezone(ensure_timezone_aware(dt)).replace(tzinfo=None)
+
+
+class MeetingImporter:
+    """
+    Valida, verifica conflitos e insere reuniões em lotes
+
+    Uso:
+        importer = MeetingImporter(creator=current_user)
+        for line, record in iter_csv_records(stream):
+            importer.add(line, record)
+        report = importer.finish()
+    """
+
+    def __init__(self, creator, chunk_size=500, notify=True, dry_run=False, max_errors=1000):
+        self.default_creator_id = creator.id
+        self.chunk_size = chunk_size
+        self.notify = notify
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.rooms = get_room_lookup()
+        self.users = get_user_lookup()
+        self.room_names = dict(get_room_choices())
+        self.capacities = get_room_capacities()
+        self.usernames = {user_id: username for user_id, username, _ in self.users.values()}
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+        self.warnings = []
+        self._pending = []
+        self._digest = defaultdict(list)
+        # Na simulação nada é gravado: os horários aceitos valem para os lotes seguintes
+        self._simulated = []
+
+    def _reject(self, line, reason):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'linha': line, 'motivo': reason})
+
+    def add(self, line, record):
+        """Valida um registro e o enfileira; o lote é gravado a cada chunk_size registros"""
+        if record.get('error'):
+            return self._reject(line, record['error'])
+        if not record.get('title'):
+            return self._reject(line, 'Título vazio')
+        if record['end'] <= record['start']:
+            return self._reject(line, 'O término deve ser posterior ao início')
+
+        room_id = self.rooms.get((record.get('room') or '').strip().lower())
+        if room_id is None:
+            return self._reject(line, f'Sala desconhecida: "{record.get("room") or ""}"')
+
+        # Quem importa não participa das reuniões sem criador: só o organizador
+        # informado no arquivo ocupa a agenda e conta na lotação da sala
+        creator_id, organizer = self.default_creator_id, None
+        if record.get('creator'):
+            creator = self.users.get(record['creator'].lower())
+            if creator is None:
+                return self._reject(line, f'Criador desconhecido: "{record["creator"]}"')
+            creator_id, organizer = creator[0], creator[1]
+
+        participants = []
+        unknown = []
+        for name in record.get('participants', ()):
+            user = self.users.get(name.lower())
+            if user is None:
+                unknown.append(name)
+            elif user not in participants:
+                participants.append(user)
+        if unknown and len(self.warnings) < self.max_errors:
+            self.warnings.append({'linha': line, 'motivo': f'Participantes ignorados: {", ".join(unknown)}'})
+
+        people = {user[1] for user in participants} | ({organizer} if organizer else set())
+        capacity = self.capacities.get(room_id)
+        if capacity and len(people) > capacity:
+            return self._reject(
+                line, f'A sala {self.room_names.get(room_id, room_id)} comporta {capacity} pessoa(s); a reunião tem {len(people)}'
+            )
+
+        self._pending.append({
+            'line': line,
+            'title': record['title'][:80],
+            'description': record.get('description'),
+            'start_datetime': record['start'],
+            'end_datetime': record['end'],
+            'room_id': room_id,
+            'created_by': creator_id,
+            'participants': ', '.join(user[1] for user in participants),
+            'people': people,
+            'emails': [user[2] for user in participants if user[2]],
+        })
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def _busy_snapshot(self, rows):
+        """Salas e participantes ocupados no período do lote, incluindo os aceitos na simulação"""
+        start = min(row['start_datetime'] for row in rows)
+        end = max(row['end_datetime'] for row in rows)
+        snapshot = BusySnapshot(start, end, self.usernames)
+        local_start, local_end = _naive_local(start), _naive_local(end)
+        for placeholder, (room_id, meeting_start, meeting_end, people) in enumerate(self._simulated, start=1):
+            if meeting_start < local_end and meeting_end > local_start:
+                snapshot.add(-placeholder, room_id, meeting_start, meeting_end, people)
+        return snapshot
+
+    def flush(self):
+        """Verifica conflitos do lote em memória e insere as reuniões aceitas"""
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+
+        snapshot = self._busy_snapshot(rows)
+        accepted = []
+        for row in rows:
+            start, end = _naive_local(row['start_datetime']), _naive_local(row['end_datetime'])
+            if snapshot.room_conflicts(row['room_id'], start, end):
+                self._reject(row['line'], f'Conflito na sala {self.room_names.get(row["room_id"], row["room_id"])} às {start:%d/%m/%Y %H:%M}')
+                continue
+            busy = snapshot.busy_people(row['people'], start, end)
+            if busy:
+                self._reject(row['line'], f'Participantes com outra reunião às {start:%d/%m/%Y %H:%M}: {", ".join(busy)}')
+                continue
+            # Linhas aceitas ainda não têm id: usam um negativo para não colidir
+            snapshot.add(-(len(self._simulated) + len(accepted) + 1), row['room_id'], start, end, row['people'])
+            accepted.append(row)
+
+        if accepted and not self.dry_run:
+            now = get_brazil_now()
+            values = [{
+                'title': row['title'], 'description': row['description'],
+                'start_datetime': row['start_datetime'], 'end_datetime': row['end_datetime'],
+                'room_id': row['room_id'], 'created_by': row['created_by'],
+                'participants': row['participants'], 'is_recurring': False, 'created_at': now,
+            } for row in accepted]
+            ids = db.session.scalars(
+                insert(Meeting).returning(Meeting.id, sort_by_parameter_order=True), values
+            ).all()
+            log_inserted_meetings([{**value, 'id': meeting_id} for value, meeting_id in zip(values, ids)])
+            db.session.commit()
+        elif self.dry_run:
+            self._simulated += [
+                (row['room_id'], _naive_local(row['start_datetime']), _naive_local(row['end_datetime']), row['people'])
+                for row in accepted
+            ]
+
+        for row in accepted:
+            for email in row['emails']:
+                self._digest[email].append(row)
+        self.accepted += len(accepted)
+
+    def _send_digest(self):
+        messages = []
+        for email, rows in self._digest.items():
+            lines = [
+                f"- {_naive_local(r['start_datetime']):%d/%m/%Y %H:%M} {r['title']} ({self.room_names.get(r['room_id'], '')})"
+                for r in rows[:50]
+            ]
+            if len(rows) > 50:
+                lines.append(f"... e mais {len(rows) - 50} reunião(ões)")
+            body = "Você foi incluído nas seguintes reuniões importadas:\n\n" + "\n".join(lines)
+            messages.append((
+                f'{len(rows)} reunião(ões) importada(s) na sua agenda', [email],
+                f"{body}\n\nSistema de Reuniões - Monter Elétrica"
+            ))
+        return send_bulk_emails(messages)
+
+    def finish(self):
+        """
+        Grava o último lote, envia os resumos por e-mail e retorna o relatório
+
+        Returns:
+            dict: aceitas, rejeitadas, erros, avisos e e-mails enviados
+        """
+        self.flush()
+        emails_sent = 0
+        if not self.dry_run:
+            reminder_engine.invalidate()
+            if self.notify:
+                emails_sent = self._send_digest()
+        logging.info(f"Importação: {self.accepted} reunião(ões) aceitas, {self.rejected} rejeitadas")
+        return {
+            'aceitas': self.accepted,
+            'rejeitadas': self.rejected,
+            'erros': sorted(self.errors, key=lambda e: e['linha'] or 0),
+            'avisos': self.warnings,
+            'emails_enviados': emails_sent,
+            'simulacao': self.dry_run,
+        }
+
+
+def import_meetings(stream, file_format, creator, **options):
+    """
+    Importa um arquivo CSV ou ICS já aberto em modo texto
+
+    Args:
+        stream: Arquivo de texto (iterável por linhas)
+        file_format (str): 'csv' ou 'ics'
+        creator (User): Criador das reuniões sem criador informado
+        **options: chunk_size, notify, dry_run (ver MeetingImporter)
+
+    Returns:
+        dict: Relatório da importação
+    """
+    records = iter_ics_records(stream) if file_format == 'ics' else iter_csv_records(stream)
+    importer = MeetingImporter(creator, **options)
+    try:
+        for line, record in records:
+            importer.add(line, record)
+    except (csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        importer._reject(None, f'Arquivo inválido: {str(e)}')
+    return importer.finish()
@@ -0,0 +1,154 @@
+"""
+Logging estruturado e não bloqueante - AgendaMonter
+
+As requisições só enfileiram os registros (QueueHandler); a formatação em JSON
+e a escrita no stdout acontecem na thread do QueueListener. Eventos DEBUG de
+alta frequência podem ser amostrados com LOG_DEBUG_SAMPLE_RATE.
+
+Threads não sobrevivem ao fork: com preload_app o app é configurado no master
+do gunicorn, então cada processo filho sobe o seu próprio QueueListener.
+"""
+from flask import has_request_context, request
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+
+# Atributos padrão de LogRecord; o que sobrar veio de extra={...}
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em extra={...}"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Anexa método e caminho da requisição (roda na thread que gerou o registro)"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Deixa passar 1 a cada N registros DEBUG com a mesma mensagem-modelo
+
+    Registros INFO ou acima nunca são descartados.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if not self.every:
+            return False
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class _StructuredQueueHandler(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo
+
+    O QueueHandler padrão junta mensagem e traceback em uma string; aqui a
+    mensagem é apenas interpolada e o traceback vai em exc_text, para que o
+    JsonFormatter os mantenha em campos separados.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(app):
+    """
+    Troca os handlers do logger raiz por um QueueHandler com saída em JSON ou texto
+
+    Args:
+        app: Aplicação Flask (usa LOG_LEVEL, LOG_FORMAT e LOG_DEBUG_SAMPLE_RATE)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = app.config.get('LOG_LEVEL', 'INFO')
+    stream = logging.StreamHandler(sys.stdout)
+    if app.config.get('LOG_FORMAT', 'json') == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+
+    handler = _StructuredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(DebugSamplingFilter(app.config.get('LOG_DEBUG_SAMPLE_RATE', 1.0)))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def _restart_listener_after_fork():
+    # O filho herda a fila e os handlers, mas não a thread que os esvaziava
+    global _listener
+    if _listener is not None:
+        _listener = QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def stop_logging():
+    """Esvazia a fila e encerra a thread de escrita"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,320 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, insert, exists, func
+from sqlalchemy.orm import aliased
+from src.database import db
+from src.models.archive import (
+    MeetingArchive,
+    NotificationArchive,
+    MEETING_ARCHIVE_COLUMNS,
+    NOTIFICATION_ARCHIVE_COLUMNS
+)
+from src.models.calendar_change import MeetingChange
+from src.models.meeting import Meeting
+from src.models.notification import Notification
+from src.models.rate_limit import RateLimitCounter
+from src.models.reminder import MeetingReminder
+from src.models.statistics import MeetingStatsRollup
+from src.utils.timezone_utils import get_brazil_now
+import logging
+import time
+
+
+def month_expression(column):
+    """Expressão SQL 'YYYY-MM' compatível com SQLite e PostgreSQL"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def _expired_meeting_batch(cutoff, batch_size):
+    """
+    Seleciona um lote de reuniões encerradas antes de `cutoff`
+
+    Reuniões-pai que ainda têm ocorrências posteriores ao corte ficam de fora,
+    pois a série depende delas. Retorna (ids do lote, ids de todas as
+    ocorrências filhas, que já estão todas encerradas).
+    """
+    child = aliased(Meeting)
+    ids = db.session.execute(
+        select(Meeting.id).where(
+            Meeting.end_datetime < cutoff,
+            ~exists().where(
+                child.parent_meeting_id == Meeting.id,
+                child.end_datetime >= cutoff
+            )
+        ).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return [], []
+
+    child_ids = db.session.execute(
+        select(Meeting.id).where(Meeting.parent_meeting_id.in_(ids))
+    ).scalars().all()
+    return ids, list(set(ids) | set(child_ids))
+
+
+def _delete_meeting_batch(ids, all_ids, log_changes=True):
+    # log_changes=False: reuniões arquivadas não são canceladas nos feeds ICS
+    options = {'log_meeting_changes': log_changes}
+    db.session.execute(delete(MeetingReminder).where(MeetingReminder.meeting_id.in_(all_ids)))
+    db.session.execute(delete(Notification).where(Notification.meeting_id.in_(all_ids)))
+    db.session.execute(delete(Meeting).where(Meeting.parent_meeting_id.in_(ids)).execution_options(**options))
+    db.session.execute(delete(Meeting).where(Meeting.id.in_(ids)).execution_options(**options))
+
+
+def purge_expired_meetings(before=None, batch_size=500, max_batches=None):
+    """
+    Remove reuniões encerradas em lotes com DELETE em conjunto
+
+    Reuniões-pai que ainda têm ocorrências futuras são mantidas, pois a série
+    depende delas. As notificações das reuniões removidas são apagadas antes.
+
+    Args:
+        before (datetime, optional): Remove reuniões que terminaram antes disso (padrão: agora)
+        batch_size (int): Reuniões por lote
+        max_batches (int, optional): Limite de lotes por execução
+
+    Returns:
+        int: Número de reuniões removidas
+    """
+    cutoff = before or get_brazil_now()
+    deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids, all_ids = _expired_meeting_batch(cutoff, batch_size)
+        if not ids:
+            break
+
+        _delete_meeting_batch(ids, all_ids)
+        db.session.commit()
+
+        deleted += len(all_ids)
+        batches += 1
+
+    logging.info(f"{deleted} reuniões expiradas removidas em {batches} lote(s)")
+    return deleted
+
+
+def archive_expired_meetings(before, batch_size=500, max_batches=None):
+    """
+    Move reuniões encerradas e suas notificações para as tabelas de arquivo
+
+    Cada lote é copiado com INSERT ... SELECT e removido da tabela quente na
+    mesma transação.
+
+    Args:
+        before (datetime): Arquiva reuniões que terminaram antes disso
+        batch_size (int): Reuniões por lote
+        max_batches (int, optional): Limite de lotes por execução
+
+    Returns:
+        int: Número de reuniões arquivadas
+    """
+    meeting_columns = [getattr(Meeting, name) for name in MEETING_ARCHIVE_COLUMNS]
+    notification_columns = [getattr(Notification, name) for name in NOTIFICATION_ARCHIVE_COLUMNS]
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids, all_ids = _expired_meeting_batch(before, batch_size)
+        if not ids:
+            break
+
+        db.session.execute(
+            insert(MeetingArchive).from_select(
+                MEETING_ARCHIVE_COLUMNS,
+                select(*meeting_columns).where(Meeting.id.in_(all_ids))
+            )
+        )
+        db.session.execute(
+            insert(NotificationArchive).from_select(
+                NOTIFICATION_ARCHIVE_COLUMNS,
+                select(*notification_columns).where(Notification.meeting_id.in_(all_ids))
+            )
+        )
+        _delete_meeting_batch(ids, all_ids, log_changes=False)
+        db.session.commit()
+
+        archived += len(all_ids)
+        batches += 1
+
+    logging.info(f"{archived} reuniões arquivadas em {batches} lote(s)")
+    return archived
+
+
+def parse_retention_map(value):
+    """
+    Converte 'tipo=dias,tipo=dias' em dicionário
+
+    Args:
+        value (str): Ex: 'meeting_reminder=2,meeting_updated=30'
+
+    Returns:
+        dict: {notification_type: dias}
+    """
+    retention = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        notification_type, days = item.split('=', 1)
+        retention[notification_type.strip()] = int(days)
+    return retention
+
+
+def _delete_notifications_in_batches(condition, batch_size):
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(Notification.id).where(condition).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+    return deleted
+
+
+def prune_read_notifications(older_than_days=90, batch_size=1000, retention_by_type=None):
+    """
+    Remove notificações lidas mais antigas que o período de retenção
+
+    Args:
+        older_than_days (int): Retenção padrão em dias
+        batch_size (int): Notificações por lote
+        retention_by_type (dict, optional): Retenção específica por notification_type
+
+    Returns:
+        int: Número de notificações removidas
+    """
+    retention_by_type = retention_by_type or {}
+    now = datetime.utcnow()
+    deleted = 0
+
+    for notification_type, days in retention_by_type.items():
+        deleted += _delete_notifications_in_batches(
+            (Notification.is_read == True)
+            & (Notification.notification_type == notification_type)
+            & (Notification.created_at < now - timedelta(days=days)),
+            batch_size
+        )
+
+    # Demais tipos seguem a retenção padrão
+    condition = (Notification.is_read == True) & (Notification.created_at < now - timedelta(days=older_than_days))
+    if retention_by_type:
+        condition = condition & Notification.notification_type.notin_(list(retention_by_type))
+    deleted += _delete_notifications_in_batches(condition, batch_size)
+
+    logging.info(f"{deleted} notificações antigas removidas")
+    return deleted
+
+
+def compact_notifications(notification_types=('meeting_updated',), batch_size=1000,
+                          older_than_days=90, retention_by_type=None):
+    """
+    Mantém apenas a notificação mais recente por usuário e reunião
+
+    Várias edições da mesma reunião geram uma notificação cada; a mais nova
+    já descreve o estado atual, então as anteriores são removidas em lotes.
+    Só entram notificações já lidas e mais antigas que a retenção do tipo:
+    o usuário nunca perde uma notificação que ainda não viu.
+
+    Args:
+        notification_types (tuple): Tipos compactados
+        batch_size (int): Notificações por lote
+        older_than_days (int): Retenção padrão em dias
+        retention_by_type (dict, optional): Retenção específica por notification_type
+
+    Returns:
+        int: Número de notificações removidas
+    """
+    retention_by_type = retention_by_type or {}
+    now = datetime.utcnow()
+    newer = aliased(Notification)
+    deleted = 0
+
+    for notification_type in notification_types:
+        days = retention_by_type.get(notification_type, older_than_days)
+        deleted += _delete_notifications_in_batches(
+            (Notification.notification_type == notification_type)
+            & Notification.is_read.is_(True)
+            & (Notification.created_at < now - timedelta(days=days))
+            & exists().where(
+                newer.user_id == Notification.user_id,
+                newer.meeting_id == Notification.meeting_id,
+                newer.notification_type == Notification.notification_type,
+                newer.id > Notification.id
+            ),
+            batch_size
+        )
+
+    logging.info(f"{deleted} notificações repetidas compactadas")
+    return deleted
+
+
+def refresh_statistics_rollup():
+    """
+    Reconstrói a tabela meeting_stats_rollup com um único INSERT ... SELECT
+
+    Agrega a tabela quente e o arquivo, para que as estatísticas não percam
+    as reuniões arquivadas.
+
+    Returns:
+        int: Número de linhas agregadas
+    """
+    from src.utils.history_utils import meetings_source
+
+    source = meetings_source(include_archive=True)
+    month = month_expression(source.c.start_datetime)
+    aggregate = select(
+        month.label('month'),
+        source.c.room_id,
+        source.c.created_by,
+        func.count(source.c.id)
+    ).group_by(month, source.c.room_id, source.c.created_by)
+
+    db.session.execute(delete(MeetingStatsRollup))
+    db.session.execute(
+        insert(MeetingStatsRollup).from_select(
+            ['month', 'room_id', 'created_by', 'count'], aggregate
+        )
+    )
+    db.session.commit()
+
+    rows = db.session.query(func.count()).select_from(MeetingStatsRollup).scalar()
+    logging.info(f"Rollup de estatísticas atualizado: {rows} linha(s)")
+    return rows
+
+
+def prune_rate_limit_counters():
+    """Remove janelas de rate limiting que não influenciam mais nenhum limite"""
+    # Janelas guardam o timestamp de início; nenhum período configurado passa de um dia
+    result = db.session.execute(delete(RateLimitCounter).where(
+        RateLimitCounter.window < int(time.time()) - 2 * 86400
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def prune_meeting_changes(older_than_days=30):
+    """
+    Remove registros antigos de alteração dos feeds ICS
+
+    O registro mais recente é sempre mantido, para que os ids (tokens de
+    sincronização) nunca recomecem do zero. Clientes com token anterior ao
+    primeiro registro restante recebem o feed completo.
+
+    Returns:
+        int: Número de registros removidos
+    """
+    latest = db.session.query(func.max(MeetingChange.id)).scalar()
+    if latest is None:
+        return 0
+    result = db.session.execute(delete(MeetingChange).where(
+        MeetingChange.changed_at < datetime.utcnow() - timedelta(days=older_than_days),
+        MeetingChange.id < latest
+    ))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,352 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas
+
+Cada processo acumula contadores e histogramas em memória (um incremento é
+uma busca em dicionário sob uma trava). Com METRICS_DIR configurado, cada
+worker do gunicorn grava periodicamente um snapshot em METRICS_DIR/<pid>.json
+e o /metrics soma os snapshots de todos os workers, como o modo multiprocess
+do prometheus_client. Quando um worker sai, o master do gunicorn soma o
+arquivo dele em METRICS_DIR/totals.json e o apaga (child_exit), antes que
+o pid possa ser reaproveitado por outro worker.
+"""
+from bisect import bisect_left
+from flask import Response, request, g, abort
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = {}
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # contagens por bucket (+Inf no fim), soma
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+
+class Gauge(_Metric):
+    """Valor lido no momento da coleta por uma função (ex: estado do pool)"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def snapshot(self):
+        try:
+            value = self.function()
+        except Exception:
+            return []
+        return [] if value is None else [[[], value]]
+
+
+# =============================================
+# MÉTRICAS DA APLICAÇÃO
+# =============================================
+REQUEST_LATENCY = Histogram(
+    'agendamonter_request_duration_seconds', 'Latência das requisições por endpoint', ('endpoint', 'method')
+)
+REQUESTS = Counter(
+    'agendamonter_requests_total', 'Requisições por endpoint e status', ('endpoint', 'method', 'status')
+)
+CONFLICT_CHECKS = Counter(
+    'agendamonter_conflict_checks_total', 'Verificações de disponibilidade', ('kind', 'result')
+)
+RECURRENCES_CREATED = Counter(
+    'agendamonter_recurrences_created_total', 'Ocorrências de reuniões recorrentes criadas'
+)
+EMAILS = Counter(
+    'agendamonter_emails_total', 'E-mails enviados ou com falha', ('status',)
+)
+NOTIFICATIONS_CREATED = Counter(
+    'agendamonter_notifications_created_total', 'Notificações criadas', ('type',)
+)
+
+
+def _pool_gauge(attribute):
+    def read():
+        from src.database import db
+        pool = db.engine.pool
+        method = getattr(pool, attribute, None)
+        return method() if callable(method) else None
+    return read
+
+
+Gauge('agendamonter_db_pool_size', 'Tamanho configurado do pool de conexões', _pool_gauge('size'))
+Gauge('agendamonter_db_pool_checked_out', 'Conexões em uso', _pool_gauge('checkedout'))
+Gauge('agendamonter_db_pool_overflow', 'Conexões além do tamanho do pool', _pool_gauge('overflow'))
+
+
+# =============================================
+# COLETA ENTRE PROCESSOS
+# =============================================
+_directory = None
+_flush_interval = 10
+_next_flush = 0.0
+_TOTALS_FILE = 'totals.json'
+
+
+def flush():
+    """Grava o snapshot deste processo em METRICS_DIR (escrita atômica)"""
+    global _next_flush
+    _next_flush = time.monotonic() + _flush_interval
+    if not _directory:
+        return
+
+    data = {'pid': os.getpid(), 'written_at': time.time(), 'metrics': collect_local()}
+    try:
+        _write_json(os.path.join(_directory, f'{os.getpid()}.json'), data)
+    except OSError as e:
+        logging.error(f"Erro ao gravar métricas em {_directory}: {str(e)}")
+
+
+def _write_json(path, data):
+    temp = f'{path}.tmp'
+    with open(temp, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp, path)
+
+
+def _merge_sample(metric, target, key, value):
+    if metric.kind == 'counter':
+        target[key] = target.get(key, 0) + value
+    elif key in target:
+        target[key] = [[a + b for a, b in zip(target[key][0], value[0])], target[key][1] + value[1]]
+    else:
+        target[key] = value
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def retire_worker(directory, pid):
+    """
+    Soma o último snapshot de um worker encerrado em totals.json e apaga o arquivo dele
+
+    Chamado pelo master do gunicorn (child_exit) e, para workers que morreram
+    sem passar por ele, pela coleta. A trava de arquivo impede que o mesmo
+    snapshot seja somado duas vezes.
+
+    Args:
+        directory (str): METRICS_DIR
+        pid (int): Pid do worker encerrado
+    """
+    path = os.path.join(directory, f'{pid}.json')
+    totals_path = os.path.join(directory, _TOTALS_FILE)
+    try:
+        with open(os.path.join(directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return
+            except ValueError:
+                data = {}
+            try:
+                with open(totals_path) as f:
+                    totals = json.load(f).get('metrics', {})
+            except (OSError, ValueError):
+                totals = {}
+
+            for name, samples in data.get('metrics', {}).items():
+                metric = REGISTRY.get(name)
+                if metric is None or metric.kind == 'gauge':
+                    continue
+                target = {tuple(labels): value for labels, value in totals.get(name, [])}
+                for labels, value in samples:
+                    _merge_sample(metric, target, tuple(labels), value)
+                totals[name] = [[list(key), value] for key, value in target.items()]
+
+            _write_json(totals_path, {'metrics': totals})
+            os.remove(path)
+    except OSError as e:
+        logging.error(f"Erro ao consolidar métricas do worker {pid}: {str(e)}")
+
+
+def collect_local():
+    return {name: metric.snapshot() for name, metric in REGISTRY.items()}
+
+
+def collect():
+    """
+    Reúne as métricas de todos os processos
+
+    Contadores e histogramas são somados, inclusive os de workers já
+    encerrados (em totals.json), para que continuem monotônicos. Gauges só
+    valem para workers que gravaram recentemente e recebem o rótulo pid.
+
+    Returns:
+        dict: nome -> lista de [valores dos rótulos, valor]
+    """
+    if not _directory:
+        return collect_local()
+
+    flush()
+    # Workers que morreram sem child_exit (ex: fora do gunicorn)
+    for path in glob.glob(os.path.join(_directory, '*.json')):
+        pid = os.path.basename(path)[:-len('.json')]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            retire_worker(_directory, int(pid))
+
+    merged = {name: {} for name in REGISTRY}
+    stale = time.time() - 3 * _flush_interval
+    for path in glob.glob(os.path.join(_directory, '*.json')):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        for name, samples in data.get('metrics', {}).items():
+            metric = REGISTRY.get(name)
+            if metric is None:
+                continue
+            target = merged[name]
+            for labels, value in samples:
+                if metric.kind == 'gauge':
+                    if data.get('written_at', 0) >= stale:
+                        target[(str(data.get('pid')),)] = value
+                    continue
+                _merge_sample(metric, target, tuple(labels), value)
+
+    return {name: [[list(key), value] for key, value in samples.items()] for name, samples in merged.items()}
+
+
+def _labels(names, values, extra=None):
+    pairs = [(n, v) for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{n}="{v}"' for (n, _), v in zip(pairs, escaped)) + '}'
+
+
+def render(samples_by_name):
+    """Formata as métricas no formato de exposição texto do Prometheus"""
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        labelnames = metric.labelnames
+        if metric.kind == 'gauge' and _directory:
+            labelnames = ('pid',)
+
+        for values, value in samples_by_name.get(name, []):
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels(labelnames, values)} {value}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels(labelnames, values, ("le", le))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labelnames, values)} {total}')
+            lines.append(f'{name}_count{_labels(labelnames, values)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """
+    Registra a medição de latência por endpoint e a rota /metrics
+
+    Args:
+        app: Aplicação Flask
+    """
+    global _directory, _flush_interval
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    _directory = app.config.get('METRICS_DIR') or None
+    _flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 10)
+    if _directory:
+        os.makedirs(_directory, exist_ok=True)
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'not_found'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+            REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        if _directory and time.monotonic() >= _next_flush:
+            flush()
+        return response
+
+    if app.config.get('METRICS_REQUIRE_TOKEN') and not app.config.get('METRICS_TOKEN'):
+        logging.warning("METRICS_TOKEN não definido: /metrics fica bloqueado")
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if not token and app.config.get('METRICS_REQUIRE_TOKEN'):
+            abort(403)
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+        return Response(render(collect()), mimetype='text/plain; version=0.0.4')
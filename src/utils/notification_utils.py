@@ -1,7 +1,14 @@
+from datetime import datetime, timezone
+from sqlalchemy import update, select, func, or_, and_
+import base64
 from src.models.user import User
 from src.models.notification import Notification, db
+from src.utils.metrics_utils import NOTIFICATIONS_CREATED
 import logging
 
+# Máximo de IDs aceitos em uma única marcação em lote
+MAX_BULK_READ_IDS = 1000
+
 def create_meeting_notifications(meeting, action='created', participants_only=True):
     """
     Cria notificações para os participantes de uma reunião
@@ -61,6 +68,7 @@ def create_meeting_notifications(meeting, action='created', participants_only=Tr
                 notifications_created += 1
         
         db.session.commit()
+        NOTIFICATIONS_CREATED.inc(notifications_created, type=notification_type)
         logging.info(f"{notifications_created} notificações criadas para a reunião {meeting.title}")
         return notifications_created
         
@@ -94,6 +102,77 @@ def get_user_notifications(user_id, unread_only=False, limit=10):
         logging.error(f"Erro ao buscar notificações: {str(e)}")
         return []
 
+def encode_cursor(notification):
+    """
+    Gera o cursor opaco que aponta para depois de uma notificação
+
+    Args:
+        notification (Notification): Última notificação da página
+
+    Returns:
+        str: Cursor (created_at e id codificados em base64)
+    """
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor
+
+    Args:
+        cursor (str): Cursor recebido do cliente
+
+    Returns:
+        tuple: (created_at, id)
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, notification_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+def get_notifications_page(user_id, limit=10, cursor=None, notification_type=None, is_read=None):
+    """
+    Busca uma página de notificações por cursor (keyset em created_at, id)
+
+    Cada página custa uma consulta pelo índice (user_id, created_at),
+    independentemente de quão antiga ela seja.
+
+    Args:
+        user_id (int): ID do usuário
+        limit (int): Tamanho da página (já limitado pelo chamador)
+        cursor (str, optional): Cursor devolvido pela página anterior
+        notification_type (str, optional): Filtra pelo tipo
+        is_read (bool, optional): Filtra pelo estado de leitura
+
+    Returns:
+        tuple: (lista de notificações, cursor da próxima página ou None)
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    query = Notification.query.filter(Notification.user_id == user_id)
+    if notification_type:
+        query = query.filter(Notification.notification_type == notification_type)
+    if is_read is not None:
+        query = query.filter(Notification.is_read == is_read)
+    if cursor:
+        created_at, notification_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Notification.created_at < created_at,
+            and_(Notification.created_at == created_at, Notification.id < notification_id)
+        ))
+
+    # Um item a mais indica se existe próxima página
+    rows = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
 def mark_notification_as_read(notification_id, user_id):
     """
     Marca uma notificação como lida
@@ -122,6 +201,85 @@ def mark_notification_as_read(notification_id, user_id):
         logging.error(f"Erro ao marcar notificação como lida: {str(e)}")
         return False
 
+def mark_notifications_as_read(user_id, notification_ids=None, before=None):
+    """
+    Marca várias notificações como lidas com um único UPDATE
+
+    A contagem de não lidas é feita na mesma transação, antes do commit, de
+    modo que o valor devolvido reflete exatamente o estado após a marcação.
+
+    Args:
+        user_id (int): ID do usuário (para verificação de segurança)
+        notification_ids (list, optional): IDs das notificações
+        before (datetime, optional): Marca todas criadas até este instante (UTC)
+
+    Returns:
+        tuple: (notificações marcadas, não lidas restantes) ou None em caso de erro
+    """
+    if not notification_ids and before is None:
+        return 0, get_unread_count(user_id)
+
+    try:
+        stmt = update(Notification).where(
+            Notification.user_id == user_id,
+            Notification.is_read == False
+        )
+        if notification_ids:
+            stmt = stmt.where(Notification.id.in_(notification_ids))
+        if before is not None:
+            if before.tzinfo is not None:
+                # created_at é gravado em UTC sem timezone
+                before = before.astimezone(timezone.utc).replace(tzinfo=None)
+            stmt = stmt.where(Notification.created_at <= before)
+
+        updated = db.session.execute(
+            stmt.values(is_read=True).execution_options(synchronize_session=False)
+        ).rowcount
+        unread_count = db.session.execute(
+            select(func.count()).select_from(Notification).where(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            )
+        ).scalar()
+        db.session.commit()
+        return updated, unread_count
+
+    except Exception as e:
+        logging.error(f"Erro ao marcar notificações como lidas: {str(e)}")
+        db.session.rollback()
+        return None
+
+def parse_bulk_read_payload(data):
+    """
+    Valida o corpo da requisição de marcação em lote
+
+    Args:
+        data (dict): JSON com 'ids' (lista de inteiros) e/ou 'before' (ISO 8601)
+
+    Returns:
+        tuple: (ids, before, erro); erro é None quando o corpo é válido
+    """
+    if not isinstance(data, dict):
+        return None, None, 'Corpo JSON inválido'
+
+    ids = data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return None, None, "'ids' deve ser uma lista de inteiros"
+        if len(ids) > MAX_BULK_READ_IDS:
+            return None, None, f"Máximo de {MAX_BULK_READ_IDS} IDs por requisição"
+
+    before = data.get('before')
+    if before is not None:
+        try:
+            before = datetime.fromisoformat(str(before).replace('Z', '+00:00'))
+        except ValueError:
+            return None, None, "'before' deve ser uma data ISO 8601"
+
+    if not ids and before is None:
+        return None, None, "Informe 'ids' ou 'before'"
+    return ids, before, None
+
 def get_unread_count(user_id):
     """
     Retorna o número de notificações não lidas de um usuário
@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+import logging
+import threading
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+class PasswordHasherBusy(Exception):
+    """Levantada quando o pool de verificação de senhas está saturado"""
+
+
+def get_hash_method():
+    """Retorna o método de hash configurado (ex: 'scrypt:16384:8:1', 'pbkdf2:sha256:600000')"""
+    try:
+        return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD
+    except RuntimeError:
+        return DEFAULT_HASH_METHOD
+
+
+@lru_cache(maxsize=8)
+def _stored_prefix(method):
+    # O Werkzeug completa parâmetros omitidos (ex: 'pbkdf2' -> 'pbkdf2:sha256:1000000'),
+    # então geramos um hash uma vez para saber como o método aparece no banco
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password):
+    """
+    Gera o hash da senha com os parâmetros configurados
+
+    Args:
+        password (str): Senha em texto puro
+
+    Returns:
+        str: Hash no formato 'metodo$salt$hash'
+    """
+    return generate_password_hash(password, method=get_hash_method())
+
+
+def needs_rehash(password_hash):
+    """
+    Verifica se um hash armazenado usa parâmetros diferentes dos configurados
+
+    Args:
+        password_hash (str): Hash armazenado
+
+    Returns:
+        bool: True se o hash deve ser regenerado
+    """
+    if not password_hash or '$' not in password_hash:
+        return True
+    return password_hash.split('$', 1)[0] != _stored_prefix(get_hash_method())
+
+
+def _executor_class():
+    # Com o gevent, threading vira greenlets e o hash rodaria no mesmo thread do
+    # hub, travando o worker; o pool do gevent usa threads de verdade
+    try:
+        from gevent import monkey
+    except ImportError:
+        return ThreadPoolExecutor
+    if monkey.is_module_patched('threading'):
+        from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+        return GeventThreadPoolExecutor
+    return ThreadPoolExecutor
+
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+                queue = current_app.config.get('PASSWORD_HASH_QUEUE', 8)
+                _slots = threading.BoundedSemaphore(workers + queue)
+                _executor = _executor_class()(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor
+
+
+def verify_password(password_hash, password):
+    """
+    Verifica uma senha em um pool de threads limitado
+
+    O scrypt/pbkdf2 do hashlib libera o GIL, então outras requisições
+    continuam sendo atendidas enquanto o hash é calculado. Quando o pool e a
+    fila estão cheios, falha na hora em vez de prender o worker esperando vaga.
+
+    Args:
+        password_hash (str): Hash armazenado
+        password (str): Senha informada
+
+    Returns:
+        bool: True se a senha confere
+
+    Raises:
+        PasswordHasherBusy: Se não houver vaga no pool ou o hash passar do tempo limite
+    """
+    executor = _get_executor()
+    timeout = current_app.config.get('PASSWORD_VERIFY_TIMEOUT', 10)
+
+    if not _slots.acquire(blocking=False):
+        logging.warning("Pool de verificação de senhas saturado")
+        raise PasswordHasherBusy()
+
+    try:
+        future = executor.submit(check_password_hash, password_hash, password)
+    except Exception:
+        _slots.release()
+        raise
+
+    # A vaga só é liberada quando o hash termina, mesmo que o chamador desista
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logging.warning("Tempo limite excedido na verificação de senha")
+        raise PasswordHasherBusy()
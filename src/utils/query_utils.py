@@ -0,0 +1,169 @@
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import re
+import threading
+import time
+
+# Coletores ativos na thread (requisição atual e/ou count_queries)
+_local = threading.local()
+_installed = False
+
+_WHITESPACE = re.compile(r'\s+')
+# "IN (?, ?, ?)" e "IN (__[POSTCOMPILE_x])" viram "IN (?)" para agrupar consultas de mesmo formato
+_IN_LIST = re.compile(r'IN \((?:[^()]*)\)', re.IGNORECASE)
+
+
+def statement_shape(statement):
+    """
+    Normaliza um SQL para identificar consultas repetidas com parâmetros diferentes
+
+    Args:
+        statement (str): SQL como enviado ao driver
+
+    Returns:
+        str: SQL sem espaços extras e com listas IN colapsadas
+    """
+    return _IN_LIST.sub('IN (?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class QueryStats:
+    """Consultas executadas em um trecho (requisição ou bloco count_queries)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def duplicates(self, threshold=2):
+        """Formatos executados `threshold` vezes ou mais, do mais repetido ao menos"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def summary(self, duplicate_threshold=2, limit=3):
+        lines = [f"{self.count} consultas em {self.duration * 1000:.1f}ms"]
+        for shape, n in self.duplicates(duplicate_threshold)[:limit]:
+            lines.append(f"  {n}x {shape[:200]}")
+        return '\n'.join(lines)
+
+
+def _collectors():
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    return _local.collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    for stats in _collectors():
+        stats.record(statement, duration)
+
+
+def install_query_listeners():
+    """Registra os eventos de execução em todos os engines (uma vez por processo)"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _installed = True
+
+
+@contextmanager
+def count_queries():
+    """
+    Conta as consultas executadas dentro do bloco
+
+    Exemplo:
+        with count_queries() as stats:
+            client.get('/meetings/calendar')
+        print(stats.count, stats.duplicates())
+    """
+    install_query_listeners()
+    stats = QueryStats()
+    collectors = _collectors()
+    collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        collectors.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(max_count, duplicate_threshold=None):
+    """
+    Falha se o bloco executar mais de `max_count` consultas
+
+    Args:
+        max_count (int): Número máximo de consultas permitido
+        duplicate_threshold (int, optional): Falha também se algum formato
+            de consulta se repetir esse número de vezes (indício de N+1)
+
+    Raises:
+        AssertionError: Com o resumo das consultas repetidas
+    """
+    with count_queries() as stats:
+        yield stats
+
+    if stats.count > max_count:
+        raise AssertionError(f"Esperado no máximo {max_count} consultas; executadas {stats.summary()}")
+    if duplicate_threshold and stats.duplicates(duplicate_threshold):
+        raise AssertionError(f"Consultas repetidas (possível N+1): {stats.summary(duplicate_threshold)}")
+
+
+def init_query_profiler(app):
+    """
+    Ativa a contagem de consultas por requisição
+
+    Adiciona o cabeçalho Server-Timing e registra um aviso quando a requisição
+    passa de QUERY_COUNT_WARN consultas ou repete um mesmo formato de consulta
+    QUERY_DUPLICATE_WARN vezes ou mais.
+
+    Args:
+        app: Aplicação Flask
+    """
+    if not app.config.get('QUERY_PROFILING', True):
+        return
+    install_query_listeners()
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats()
+        _collectors().append(g.query_stats)
+
+    @app.teardown_request
+    def _stop_query_stats(exc=None):
+        stats = g.pop('query_stats', None)
+        if stats is not None and stats in _collectors():
+            _collectors().remove(stats)
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        if app.config.get('QUERY_SERVER_TIMING', True):
+            response.headers.add(
+                'Server-Timing', f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+            )
+
+        count_warn = app.config.get('QUERY_COUNT_WARN', 30)
+        duplicate_warn = app.config.get('QUERY_DUPLICATE_WARN', 5)
+        if stats.count > count_warn or stats.duplicates(duplicate_warn):
+            logging.warning(f"Consultas excessivas em {request.method} {request.path}: {stats.summary(duplicate_warn)}")
+        return response
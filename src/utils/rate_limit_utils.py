@@ -0,0 +1,248 @@
+from functools import wraps
+from flask import current_app, request, render_template, flash, jsonify
+from sqlalchemy import update, insert, delete
+from sqlalchemy.exc import IntegrityError
+from src.database import db
+from src.models.rate_limit import RateLimitCounter
+import logging
+import math
+import threading
+import time
+
+
+def parse_limit(value):
+    """
+    Converte um limite no formato 'quantidade/segundos'
+
+    Args:
+        value (str): Ex: '10/300' = 10 tentativas a cada 5 minutos
+
+    Returns:
+        tuple: (quantidade, segundos)
+    """
+    count, seconds = value.split('/', 1)
+    return int(count), int(seconds)
+
+
+class MemoryStore:
+    """Contadores por janela fixa em memória (um processo)"""
+
+    def __init__(self, max_keys=10000, prune_interval=60):
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+        self._prune_interval = prune_interval
+        self._pruned_at = 0
+
+    def get(self, key, window):
+        return self._counters.get((key, window), 0)
+
+    def incr(self, key, window):
+        with self._lock:
+            count = self._counters.get((key, window), 0) + 1
+            self._counters[(key, window)] = count
+            if len(self._counters) > self._max_keys:
+                self._prune(window)
+            return count
+
+    def decr(self, key, window):
+        with self._lock:
+            count = self._counters.get((key, window), 0)
+            if count > 1:
+                self._counters[(key, window)] = count - 1
+            else:
+                self._counters.pop((key, window), None)
+
+    def reset(self, key):
+        with self._lock:
+            for counter_key in [k for k in self._counters if k[0] == key]:
+                del self._counters[counter_key]
+
+    def _prune(self, window):
+        # Varredura completa no máximo a cada prune_interval segundos. Só as
+        # janelas atual e anterior importam; nenhum período passa de um dia
+        now = time.monotonic()
+        if now - self._pruned_at >= self._prune_interval:
+            self._pruned_at = now
+            for counter_key in [k for k in self._counters if k[1] < window - 2 * 86400]:
+                del self._counters[counter_key]
+        # Ainda acima do limite (muitos IPs na mesma janela): descarta as
+        # entradas mais antigas, na ordem de inserção
+        while len(self._counters) > self._max_keys:
+            del self._counters[next(iter(self._counters))]
+
+
+class DatabaseStore:
+    """Contadores por janela fixa na tabela rate_limit_counters (compartilhados entre workers)"""
+
+    def get(self, key, window):
+        with db.engine.connect() as conn:
+            count = conn.execute(
+                db.select(RateLimitCounter.count).where(
+                    RateLimitCounter.key == key,
+                    RateLimitCounter.window == window
+                )
+            ).scalar()
+        return count or 0
+
+    def _counter(self, key, window):
+        return (RateLimitCounter.key == key) & (RateLimitCounter.window == window)
+
+    def incr(self, key, window):
+        # Conexão própria para não interferir na sessão da requisição
+        with db.engine.begin() as conn:
+            increment = update(RateLimitCounter).where(
+                self._counter(key, window)
+            ).values(count=RateLimitCounter.count + 1)
+            if not conn.execute(increment).rowcount:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(insert(RateLimitCounter).values(key=key, window=window, count=1))
+                    return 1
+                except IntegrityError:
+                    # Outro worker inseriu a mesma janela ao mesmo tempo
+                    conn.execute(increment)
+            # A linha continua travada pelo UPDATE: a leitura vê o valor desta transação
+            return conn.execute(
+                db.select(RateLimitCounter.count).where(self._counter(key, window))
+            ).scalar()
+
+    def decr(self, key, window):
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(RateLimitCounter).where(
+                    self._counter(key, window), RateLimitCounter.count > 0
+                ).values(count=RateLimitCounter.count - 1)
+            )
+
+    def reset(self, key):
+        with db.engine.begin() as conn:
+            conn.execute(delete(RateLimitCounter).where(RateLimitCounter.key == key))
+
+    def prune(self, before_window):
+        with db.engine.begin() as conn:
+            conn.execute(delete(RateLimitCounter).where(RateLimitCounter.window < before_window))
+
+
+_memory_store = MemoryStore()
+_database_store = DatabaseStore()
+
+
+def get_store():
+    if current_app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'database':
+        return _database_store
+    return _memory_store
+
+
+def hit(key, limit, now=None):
+    """
+    Registra uma tentativa usando contador de janela deslizante
+
+    A estimativa é: anterior * (fração restante da janela anterior) + atual.
+    Usa duas entradas por chave, independente do volume de tentativas.
+
+    Args:
+        key (str): Chave do contador (ex: 'login:ip:1.2.3.4')
+        limit (tuple): (quantidade, segundos)
+        now (float, optional): Timestamp atual
+
+    Returns:
+        int: Segundos até liberar se o limite foi atingido, ou 0 se permitido
+    """
+    max_count, period = limit
+    now = now if now is not None else time.time()
+    store = get_store()
+
+    # Janelas são identificadas pelo timestamp de início, em segundos
+    window = int(now // period) * period
+    elapsed = (now % period) / period
+    previous = store.get(key, window - period)
+    # Conta a tentativa antes de decidir: o incremento é atômico, então
+    # requisições simultâneas não passam todas pela mesma vaga
+    current = store.incr(key, window) - 1
+    estimate = previous * (1 - elapsed) + current
+
+    if estimate >= max_count:
+        # Tentativas recusadas não contam
+        store.decr(key, window)
+        if current >= max_count or not previous:
+            retry_after = (1 - elapsed) * period
+        else:
+            # Tempo até a parte da janela anterior decair o suficiente
+            retry_after = (estimate - max_count) / previous * period
+        return max(1, math.ceil(retry_after))
+
+    return 0
+
+
+def reset(key):
+    """Zera o contador de uma chave (ex: após login bem-sucedido)"""
+    get_store().reset(key)
+
+
+def client_ip():
+    """
+    Retorna o IP do cliente
+
+    Atrás de proxies, o remote_addr já vem corrigido pelo ProxyFix a partir do
+    X-Forwarded-For, considerando apenas os PROXY_FIX_X_FOR saltos confiáveis;
+    valores que o próprio cliente põe no cabeçalho são ignorados.
+    """
+    return request.remote_addr or 'unknown'
+
+
+def _too_many_requests(retry_after, template, form_class):
+    message = f'Muitas tentativas. Tente novamente em {retry_after} segundos.'
+    if template and form_class:
+        flash(message, 'error')
+        response = current_app.make_response((render_template(template, form=form_class()), 429))
+    else:
+        response = jsonify({'error': message, 'retry_after': retry_after})
+        response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(scope, key_field=None, template=None, form_class=None):
+    """
+    Decorator de rate limiting por IP e por valor de um campo do formulário
+
+    Apenas requisições POST são contadas. Os limites vêm da configuração
+    RATE_LIMIT_<SCOPE>_IP e RATE_LIMIT_<SCOPE>_KEY.
+
+    Args:
+        scope (str): Nome do escopo (ex: 'login')
+        key_field (str, optional): Campo do formulário usado como segunda chave
+        template (str, optional): Template renderizado na resposta 429
+        form_class (type, optional): Formulário passado ao template
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            config = current_app.config
+            if request.method != 'POST' or not config.get('RATE_LIMIT_ENABLED', True):
+                return f(*args, **kwargs)
+
+            checks = [(f'{scope}:ip:{client_ip()}', config.get(f'RATE_LIMIT_{scope.upper()}_IP'))]
+            if key_field:
+                value = (request.form.get(key_field) or '').strip().lower()
+                if value:
+                    checks.append((f'{scope}:key:{value}', config.get(f'RATE_LIMIT_{scope.upper()}_KEY')))
+
+            for key, limit in checks:
+                if not limit:
+                    continue
+                retry_after = hit(key, parse_limit(limit))
+                if retry_after:
+                    logging.warning(f"Rate limit atingido para {key}")
+                    return _too_many_requests(retry_after, template, form_class)
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def reset_rate_limit(scope, value):
+    """Zera o contador por chave de um escopo (ex: username após login correto)"""
+    if value:
+        reset(f'{scope}:key:{value.strip().lower()}')
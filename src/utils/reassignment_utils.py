@@ -0,0 +1,139 @@
+"""
+Realocação em massa de reuniões quando uma sala fica indisponível - AgendaMonter
+
+As reuniões futuras da sala fechada são buscadas com uma consulta (índice
+em room_id, start_datetime) e as salas candidatas com outra. A alocação é
+gulosa, no estilo do particionamento de intervalos: as reuniões são
+percorridas por horário de início e cada uma vai para a menor sala livre
+que comporta o seu número de pessoas (best fit), deixando as salas grandes
+para as reuniões que precisam delas. A gravação reaproveita o motor de
+operações em lote: uma transação e um resumo por participante.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from src.database import db
+from src.models.meeting import Meeting
+from src.models.user import Room
+from src.utils.batch_utils import apply_batch
+from src.utils.timezone_utils import get_brazil_now, to_brazil_timezone, ensure_timezone_aware
+import logging
+
+
+def _local(dt):
+    return to_brazil_timezone(ensure_timezone_aware(dt)).replace(tzinfo=None)
+
+
+def _headcount(meeting):
+    """Participantes mais o organizador, se ele não estiver na lista"""
+    people = set(meeting.get_participants_list())
+    people.add(meeting.creator.username if meeting.creator else None)
+    people.discard(None)
+    return max(len(people), 1)
+
+
+def find_affected_meetings(room_id, start=None, end=None):
+    """
+    Reuniões futuras de uma sala no período, por horário de início
+
+    Args:
+        room_id (int): Sala que ficará indisponível
+        start (datetime, optional): Início do período (padrão: agora)
+        end (datetime, optional): Fim exclusivo do período (padrão: sem limite)
+
+    Returns:
+        list: Objetos Meeting
+    """
+    now = get_brazil_now()
+    start = max(start, now) if start is not None else now
+    query = Meeting.query.options(db.joinedload(Meeting.creator)).filter(
+        Meeting.room_id == room_id,
+        Meeting.start_datetime >= start
+    )
+    if end is not None:
+        query = query.filter(Meeting.start_datetime < end)
+    return query.order_by(Meeting.start_datetime, Meeting.id).all()
+
+
+def plan_reassignment(room_id, start=None, end=None):
+    """
+    Calcula para qual sala vai cada reunião afetada, sem gravar nada
+
+    Args:
+        room_id (int): Sala que ficará indisponível
+        start (datetime, optional): Início do período
+        end (datetime, optional): Fim exclusivo do período
+
+    Returns:
+        list: Um dicionário por reunião com meeting, headcount, room (Room ou None) e reason
+    """
+    meetings = find_affected_meetings(room_id, start, end)
+    if not meetings:
+        return []
+
+    candidates = sorted(
+        Room.query.filter(Room.is_active.is_(True), Room.id != room_id).all(),
+        key=lambda room: (room.capacity or 0, room.id)
+    )
+    window_start = min(m.start_datetime for m in meetings)
+    window_end = max(m.end_datetime for m in meetings)
+
+    # Ocupação atual das salas candidatas no período, ordenada por início
+    busy = defaultdict(list)
+    if candidates:
+        rows = db.session.query(Meeting.room_id, Meeting.start_datetime, Meeting.end_datetime).filter(
+            Meeting.room_id.in_([room.id for room in candidates]),
+            Meeting.start_datetime < window_end,
+            Meeting.end_datetime > window_start
+        ).all()
+        for candidate_id, meeting_start, meeting_end in rows:
+            busy[candidate_id].append((_local(meeting_start), _local(meeting_end)))
+        for intervals in busy.values():
+            intervals.sort()
+
+    def is_free(candidate_id, meeting_start, meeting_end):
+        intervals = busy[candidate_id]
+        limit = bisect_left(intervals, (meeting_end,))
+        return not any(interval_end > meeting_start for _, interval_end in intervals[:limit])
+
+    plan = []
+    for meeting in meetings:
+        headcount = _headcount(meeting)
+        meeting_start, meeting_end = _local(meeting.start_datetime), _local(meeting.end_datetime)
+        chosen, reason = None, None
+        fits = [room for room in candidates if (room.capacity or 0) >= headcount]
+        for room in fits:
+            if is_free(room.id, meeting_start, meeting_end):
+                chosen = room
+                break
+        if chosen is None:
+            reason = ('Nenhuma sala livre comporta a reunião' if fits
+                      else f'Nenhuma sala comporta {headcount} pessoa(s)')
+        else:
+            insort(busy[chosen.id], (meeting_start, meeting_end))
+        plan.append({'meeting': meeting, 'headcount': headcount, 'room': chosen, 'reason': reason})
+    return plan
+
+
+def apply_reassignment(room_id, user, start=None, end=None, notify=True):
+    """
+    Recalcula o plano e move as reuniões alocadas numa única transação
+
+    O plano é recalculado no momento de aplicar, para refletir reservas
+    feitas depois da pré-visualização; reuniões sem sala ficam onde estão.
+
+    Returns:
+        tuple: (plano aplicado, número de reuniões movidas)
+
+    Raises:
+        BatchError: Se a gravação encontrar conflito (nada é gravado)
+    """
+    plan = plan_reassignment(room_id, start, end)
+    operations = [{
+        'index': index, 'op': 'move', 'id': item['meeting'].id, 'room_id': item['room'].id,
+        'start': ensure_timezone_aware(item['meeting'].start_datetime),
+        'end': ensure_timezone_aware(item['meeting'].end_datetime),
+    } for index, item in enumerate(plan) if item['room'] is not None]
+    if operations:
+        apply_batch(operations, user, notify=notify)
+    logging.info(f"Realocação da sala {room_id}: {len(operations)} de {len(plan)} reunião(ões) movidas")
+    return plan, len(operations)
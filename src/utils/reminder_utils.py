@@ -0,0 +1,180 @@
+from datetime import timedelta
+from heapq import heappush, heappop
+from sqlalchemy import select, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from src.database import db
+from src.models.meeting import Meeting
+from src.models.notification import Notification
+from src.models.reminder import MeetingReminder
+from src.models.user import User
+from src.utils.email_utils import send_bulk_emails
+from src.utils.ics_utils import latest_change_id
+from src.utils.metrics_utils import NOTIFICATIONS_CREATED
+from src.utils.timezone_utils import get_brazil_now, ensure_timezone_aware, to_brazil_timezone
+import logging
+import threading
+
+
+class ReminderEngine:
+    """
+    Dispara lembretes "a reunião começa em N minutos"
+
+    Em vez de varrer todas as reuniões a cada minuto, carrega apenas as que
+    começam na próxima janela (consulta indexada por start_datetime, excluindo
+    as que já têm lembrete registrado) em um min-heap ordenado pelo horário de
+    disparo. A cada execução só o topo do heap é examinado; a janela é
+    recarregada periodicamente e sempre que o último id de meeting_changes
+    avança, o que capta reuniões criadas ou editadas por qualquer worker.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._queued = set()
+        self._next_reload = None
+        self._last_change_id = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Força a recarga da janela na próxima execução deste processo"""
+        self._next_reload = None
+
+    def load_window(self, now, lead, window):
+        """
+        Recarrega o heap com as reuniões que começam até now + lead + window
+
+        Args:
+            now (datetime): Horário atual (timezone do Brasil)
+            lead (timedelta): Antecedência do lembrete
+            window (timedelta): Tamanho da janela carregada além da antecedência
+        """
+        lead_minutes = int(lead.total_seconds() // 60)
+        rows = db.session.execute(
+            select(Meeting.id, Meeting.start_datetime).where(
+                Meeting.start_datetime >= now,
+                Meeting.start_datetime < now + lead + window,
+                ~exists().where(
+                    MeetingReminder.meeting_id == Meeting.id,
+                    MeetingReminder.lead_minutes == lead_minutes
+                )
+            ).order_by(Meeting.start_datetime)
+        ).all()
+
+        heap = []
+        for meeting_id, start in rows:
+            heappush(heap, (ensure_timezone_aware(start) - lead, meeting_id))
+        self._heap = heap
+        self._queued = {meeting_id for _, meeting_id in heap}
+
+    def pop_due(self, now):
+        """Remove e retorna os IDs de reuniões cujo lembrete já deve ser disparado"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, meeting_id = heappop(self._heap)
+            self._queued.discard(meeting_id)
+            due.append(meeting_id)
+        return due
+
+    def run(self, lead_minutes=15, window_minutes=60, reload_seconds=300, batch_size=50):
+        """
+        Executa um ciclo: recarrega a janela se necessário e dispara os lembretes vencidos
+
+        Returns:
+            int: Número de reuniões lembradas
+        """
+        with self._lock:
+            now = get_brazil_now()
+            lead = timedelta(minutes=lead_minutes)
+            # Outro worker pode ter criado ou editado reuniões desde a última carga
+            change_id = latest_change_id()
+            if self._next_reload is None or now >= self._next_reload or change_id != self._last_change_id:
+                self.load_window(now, lead, timedelta(minutes=window_minutes))
+                self._next_reload = now + timedelta(seconds=reload_seconds)
+                self._last_change_id = change_id
+
+            due = self.pop_due(now)
+            sent = 0
+            for start in range(0, len(due), batch_size):
+                sent += send_reminders(due[start:start + batch_size], lead_minutes, now)
+            return sent
+
+
+def _reminder_text(meeting, lead_minutes):
+    start = to_brazil_timezone(ensure_timezone_aware(meeting.start_datetime))
+    title = f'Lembrete: {meeting.title} começa em {lead_minutes} minutos'
+    message = f'A reunião "{meeting.title}" começa às {start.strftime("%H:%M")} na sala {meeting.room.name}.'
+    return title, message
+
+
+def send_reminders(meeting_ids, lead_minutes, now):
+    """
+    Dispara lembretes de um lote de reuniões
+
+    Registra os lembretes e cria as notificações na mesma transação, depois
+    envia os e-mails por uma única conexão SMTP. Reuniões que já têm
+    lembrete registrado (por outro worker ou antes de um reinício) são puladas.
+
+    Args:
+        meeting_ids (list): IDs das reuniões
+        lead_minutes (int): Antecedência do lembrete
+        now (datetime): Horário atual
+
+    Returns:
+        int: Número de reuniões lembradas
+    """
+    meetings = Meeting.query.options(joinedload(Meeting.room)).filter(Meeting.id.in_(meeting_ids)).all()
+    lead = timedelta(minutes=lead_minutes)
+
+    # A reunião pode ter sido editada depois de carregada no heap
+    meetings = [
+        m for m in meetings
+        if ensure_timezone_aware(m.start_datetime) - lead <= now < ensure_timezone_aware(m.start_datetime)
+    ]
+    if not meetings:
+        return 0
+
+    # Todos os participantes do lote em uma única consulta
+    names = {name for m in meetings for name in m.get_participants_list()}
+    creator_ids = {m.created_by for m in meetings}
+    users = User.query.filter(User.username.in_(names) | User.id.in_(creator_ids)).all()
+    users_by_name = {u.username: u for u in users}
+    users_by_id = {u.id: u for u in users}
+
+    reminded = []
+    emails = []
+    notifications_created = 0
+    for meeting in meetings:
+        try:
+            with db.session.begin_nested():
+                db.session.add(MeetingReminder(meeting_id=meeting.id, lead_minutes=lead_minutes))
+        except IntegrityError:
+            continue
+
+        recipients = {users_by_name[n] for n in meeting.get_participants_list() if n in users_by_name}
+        if meeting.created_by in users_by_id:
+            recipients.add(users_by_id[meeting.created_by])
+
+        title, message = _reminder_text(meeting, lead_minutes)
+        for user in recipients:
+            db.session.add(Notification(
+                user_id=user.id,
+                meeting_id=meeting.id,
+                title=title,
+                message=message,
+                notification_type='meeting_reminder'
+            ))
+            notifications_created += 1
+
+        addresses = sorted(u.email for u in recipients if u.email)
+        if addresses:
+            emails.append((title, addresses, f"{message}\n\nSistema de Reuniões - Monter Elétrica"))
+        reminded.append(meeting)
+
+    db.session.commit()
+    NOTIFICATIONS_CREATED.inc(notifications_created, type='meeting_reminder')
+    send_bulk_emails(emails)
+    logging.info(f"Lembretes enviados para {len(reminded)} reunião(ões)")
+    return len(reminded)
+
+
+reminder_engine = ReminderEngine()
@@ -0,0 +1,88 @@
+from bisect import bisect_left
+from src.models.user import User
+from src.utils.cache_utils import get_version
+import threading
+
+
+class UserPrefixIndex:
+    """
+    Índice de prefixos em memória para busca de usuários
+
+    Mantém um array ordenado de chaves (username e e-mail em minúsculas) e
+    responde buscas por prefixo com bisect: O(log n + página).
+    O índice é reconstruído apenas quando a versão 'users' do cache muda.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = []
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _rebuild(self, version):
+        rows = User.query.with_entities(User.id, User.username, User.email).all()
+        pairs = []
+        for user_id, username, email in rows:
+            username_key = (username.lower(), 0)
+            if email:
+                email_key = (email.lower(), 1)
+                pairs.append((username_key, user_id, username, email_key))
+                pairs.append((email_key, user_id, username, username_key))
+            else:
+                pairs.append((username_key, user_id, username, None))
+        pairs.sort()
+
+        self._keys = [key for (key, _), _, _, _ in pairs]
+        # Cada entrada guarda a outra chave do usuário (ou None)
+        self._entries = [(user_id, username, other, kind) for (_, kind), user_id, username, other in pairs]
+        self._version = version
+
+    def _ensure_fresh(self):
+        version = get_version('users')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._rebuild(version)
+
+    def search(self, prefix, limit=20, offset=0):
+        """
+        Busca usuários cujo username ou e-mail começa com o prefixo
+
+        Args:
+            prefix (str): Prefixo digitado
+            limit (int): Tamanho da página
+            offset (int): Posição inicial dentro do intervalo de resultados
+
+        Returns:
+            tuple: (lista de tuplas (id, username), próximo offset ou None)
+        """
+        self._ensure_fresh()
+        keys, entries = self._keys, self._entries
+
+        prefix = prefix.strip().lower()
+        position = bisect_left(keys, prefix) + offset
+        results = []
+
+        while position < len(keys) and keys[position].startswith(prefix):
+            user_id, username, other, kind = entries[position]
+            key = (keys[position], kind)
+            position += 1
+            # Se username e e-mail casam, o usuário só conta na primeira chave,
+            # em qualquer página: o offset continua apontando para o mesmo lugar
+            if other is not None and other[0].startswith(prefix) and other < key:
+                continue
+            results.append((user_id, username))
+            if len(results) >= limit:
+                break
+
+        has_more = position < len(keys) and keys[position].startswith(prefix)
+        next_offset = position - bisect_left(keys, prefix) if has_more else None
+        return results, next_offset
+
+
+user_index = UserPrefixIndex()
+
+
+def search_users(prefix, limit=20, offset=0):
+    """Atalho para buscar usuários no índice global do processo"""
+    return user_index.search(prefix, limit=limit, offset=offset)